@@ -0,0 +1,71 @@
+"""
+Filter + page latency of the Analytical Engine: the pandas mask/sort_values
+path the app used to run on every rerun vs the cached ListingIndex.
+
+    python benchmarks/bench_filter.py                     # 10k, 100k, 1M rows
+    python benchmarks/bench_filter.py --sizes 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+import storage
+from query import ListingIndex
+from bench_storage import synthetic_listings
+
+ITEMS = 12
+QUERY = dict(rent_range=(50000, 150000), size_range=(20, 100), max_age=35, min_floor=2,
+             layouts=['1K', '1DK', '1LDK', '2DK', '2LDK'], zero_key=False)
+
+def pandas_page(df, q, page=0):
+    mask = (
+        (df['total_rent'].between(*q['rent_range'])) &
+        (df['size_m2'].between(*q['size_range'])) &
+        (df['age'] <= q['max_age']) &
+        (df['floor'] >= q['min_floor']) &
+        (df['layout'].isin(q['layouts']))
+    )
+    df_filtered = df[mask].copy()
+    return df_filtered.sort_values('residual', ascending=True).iloc[page * ITEMS:(page + 1) * ITEMS]
+
+def index_page(index, q, page=0):
+    return index.query(**q).page('residual', page, ITEMS)
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"    {'rows':>9} {'build ms':>9} {'pandas ms':>10} {'index ms':>9} {'speedup':>8}")
+    for n in args.sizes:
+        df = storage.apply_schema(synthetic_listings(n))
+        df['residual'] = np.random.default_rng(1).normal(0, 8000, n)
+
+        start = time.perf_counter()
+        index = ListingIndex(df)
+        build = (time.perf_counter() - start) * 1000
+
+        a, b = pandas_page(df, QUERY), index_page(index, QUERY)
+        assert list(a['link']) == list(b['link']), "index page differs from pandas page"
+
+        slow = best_ms(lambda: pandas_page(df, QUERY), args.repeat)
+        fast = best_ms(lambda: index_page(index, QUERY), args.repeat)
+        print(f"    {n:>9,} {build:9.1f} {slow:10.2f} {fast:9.2f} {slow / fast:7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Parse benchmark: BeautifulSoup reference engine vs the lxml fast path.
+
+    python benchmarks/bench_parse.py --record 5   # save 5 live result pages as fixtures
+    python benchmarks/bench_parse.py              # verify + time both engines on the fixtures
+
+Without recorded fixtures, synthetic cassetteitem pages are used instead.
+Fails (exit 1) if the engines disagree on any page.
+"""
+import argparse
+import os
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import parsing
+from standin import FIXTURE_DIR, record_fixtures, load_fixtures, synthetic_page
+
+SYNTHETIC_PAGES = 20
+
+def time_engine(engine, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_rows = sum(len(parsing.parse_page(html, engine)) for _, html in pages)
+        best = min(best, time.perf_counter() - start)
+    return n_rows, best
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fixtures", default=FIXTURE_DIR)
+    ap.add_argument("--record", type=int, metavar="N", help="fetch N live pages into the fixture dir first")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.record: record_fixtures(args.record, args.fixtures)
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        print(f"[-] No fixtures in {args.fixtures} (--record N saves some), using {SYNTHETIC_PAGES} synthetic pages")
+        pages = [(f"synthetic_{seed}", synthetic_page(seed)) for seed in range(1, SYNTHETIC_PAGES + 1)]
+
+    engines = [e for e in ("bs4", "lxml") if e == "bs4" or parsing.etree is not None]
+    if "lxml" in engines:
+        mismatches = [name for name, html in pages if parsing.parse_page(html, "bs4") != parsing.parse_page(html, "lxml")]
+        if mismatches:
+            print(f"[!] Engines disagree on: {', '.join(mismatches)}")
+            return 1
+        print(f"[-] {len(pages)} pages: lxml output identical to bs4")
+    else:
+        print("[!] lxml not installed, timing bs4 only")
+
+    results = {}
+    for engine in engines:
+        n_rows, secs = time_engine(engine, pages, args.repeat)
+        results[engine] = n_rows / secs if secs else float("inf")
+        print(f"    {engine:<5} {n_rows:>6} rows  {secs * 1000:8.1f} ms  {results[engine]:>10,.0f} rows/sec")
+    if len(results) == 2: print(f"[-] Speedup: {results['lxml'] / results['bs4']:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
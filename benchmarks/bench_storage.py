@@ -0,0 +1,107 @@
+"""
+Storage benchmark: untyped CSV vs the typed Arrow (memory-mapped) and
+Parquet stores on a synthetic listings table.
+
+    python benchmarks/bench_storage.py            # 1M rows
+    python benchmarks/bench_storage.py --rows 100000
+
+Each load runs in a fresh process so its RSS delta is not polluted by the
+previous one.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+import pandas as pd
+import storage
+
+LAYOUTS = ['ワンルーム', '1K', '1DK', '1LDK', '2K', '2DK', '2LDK', '3LDK']
+
+def synthetic_listings(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    n_addr = max(1, n_rows // 20)
+    addresses = np.array([f"大阪府大阪市北区梅田{i % 9 + 1}-{i}" for i in range(n_addr)])
+    return pd.DataFrame({
+        'name': [f"OSAKA TOWER {i % 50000}" for i in range(n_rows)],
+        'address': addresses[rng.integers(0, n_addr, n_rows)],
+        'age': rng.integers(0, 60, n_rows),
+        'floor': rng.integers(1, 40, n_rows),
+        'layout': rng.choice(LAYOUTS, n_rows),
+        'size_m2': rng.uniform(15, 90, n_rows).round(2),
+        'total_rent': rng.integers(40, 300, n_rows) * 1000,
+        'key_money': rng.integers(0, 3, n_rows) * 50000,
+        'deposit': rng.integers(0, 3, n_rows) * 50000,
+        'image_url': [f"https://img01.suumo.com/{i}.jpg" for i in range(n_rows)],
+        'link': [f"https://suumo.jp/chintai/jnc_{i:012d}/" for i in range(n_rows)],
+        'lat': rng.uniform(34.6, 34.8, n_rows),
+        'lon': rng.uniform(135.4, 135.6, n_rows),
+    })
+
+def rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    return float("nan")
+
+def _load(path, out):
+    base = rss_mb()
+    start = time.perf_counter()
+    df = pd.read_csv(path) if path.endswith(".csv") else storage.load_listings(path)
+    secs = time.perf_counter() - start
+    out.put((secs, rss_mb() - base, df.memory_usage(deep=True).sum() / 2**20))
+
+def measure(path):
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_load, args=(path, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    if storage.pa is None:
+        print("[!] pyarrow not installed, nothing to compare against CSV")
+        return 1
+
+    print(f"[-] Building {args.rows:,} synthetic listings...")
+    df = synthetic_listings(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "csv (untyped)": os.path.join(tmp, "listings.csv"),
+            "arrow (mmap)": os.path.join(tmp, "listings.arrow"),
+            "parquet": os.path.join(tmp, "listings.parquet"),
+        }
+        df.to_csv(paths["csv (untyped)"], index=False)
+        storage.save_listings(df, paths["arrow (mmap)"])
+        storage.save_listings(df, paths["parquet"])
+        del df
+
+        print(f"    {'format':<15} {'file MB':>8} {'load s':>8} {'RSS +MB':>8} {'frame MB':>9}")
+        results = {}
+        for label, path in paths.items():
+            secs, rss, frame = results[label] = measure(path)
+            print(f"    {label:<15} {os.path.getsize(path) / 2**20:8.1f} {secs:8.2f} {rss:8.1f} {frame:9.1f}")
+
+    csv_secs, csv_rss, _ = results["csv (untyped)"]
+    arrow_secs, arrow_rss, _ = results["arrow (mmap)"]
+    print(f"[-] Arrow vs CSV: {csv_secs / arrow_secs:.1f}x faster load, {csv_rss - arrow_rss:.0f} MB less RSS")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
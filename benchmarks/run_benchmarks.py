@@ -0,0 +1,351 @@
+"""
+Offline benchmark suite. Runs the miner end to end against the local
+SUUMO/Nominatim stand-ins, then each hot path on its own, and writes one
+machine-readable JSON report per run.
+
+    python benchmarks/run_benchmarks.py                         # full suite
+    python benchmarks/run_benchmarks.py --quick                 # smaller sizes
+    python benchmarks/run_benchmarks.py --only parse filter
+    python benchmarks/run_benchmarks.py --compare data/benchmarks/<old>.json
+
+Metric names ending in `_per_s` are better when higher, everything else
+(`_s`, `_ms`, `_mb`) when lower; --compare uses that to flag regressions.
+Recorded fixtures (standin.py / bench_parse.py --record) are used when
+present, synthetic cassetteitem pages otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+import pandas as pd
+import fetcher
+import parsing
+import scraper
+import storage
+from geocache import GeocodeCache
+from metrics import load_report
+from standin import SuumoStandIn, FakeGeocoder, fixture_pages
+from bench_storage import synthetic_listings
+
+RESULTS_DIR = os.path.join(scraper.DATA_DIR, "benchmarks")
+
+def timed(fn, repeat=3):
+    """Best-of-`repeat` wall time in seconds, plus the last return value."""
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+# --- SUITES ---
+def bench_miner(cfg, areas=0):
+    pages, _ = fixture_pages(cfg['pages'])
+    geocoder = FakeGeocoder(delay=cfg['geocode_delay'])
+    with tempfile.TemporaryDirectory() as tmp, \
+            SuumoStandIn(pages, n_pages=cfg['pages'], latency=cfg['latency'], error_rate=cfg['error_rate']) as site:
+        patched = {
+            'BASE_URL': site.base_url,
+            'LISTINGS_FILE': storage.store_path(tmp),
+            'OUTPUT_FILE': os.path.join(tmp, "osaka_listings.csv"),
+            'GEOCODE_DB': os.path.join(tmp, "geocode_cache.sqlite"),
+            'CACHE_FILE': os.path.join(tmp, "address_cache.csv"),
+            'GAZETTEER_FILE': os.path.join(tmp, "gazetteer.csv"),
+            'THUMB_DIR': os.path.join(tmp, "thumbs"),
+            'METRICS_DIR': os.path.join(tmp, "metrics"),
+            'JOURNAL_DIR': os.path.join(tmp, "journal"),
+            'HISTORY_DB': os.path.join(tmp, "history.sqlite"),
+            'ARCHIVE_DIR': os.path.join(tmp, "archive"),
+            'make_geocoder': lambda: geocoder,
+        }
+        saved = {k: getattr(scraper, k) for k in patched}
+        saved_backoff = fetcher.BACKOFF_BASE
+        for k, v in patched.items(): setattr(scraper, k, v)
+        fetcher.BACKOFF_BASE = 0.05  # Keep injected 503s from dominating the run
+        try:
+            # Sharded runs crawl `areas` searches of cfg['pages'] pages each
+            shard_areas = [f"{site.base_url}&sc={k}" for k in range(areas)] or None
+            start = time.perf_counter()
+            df = scraper.run_osaka_miner(max_pages=cfg['pages'], rate_limit=cfg['rate'], fetch_images=False, areas=shard_areas)
+            secs = time.perf_counter() - start
+            run = load_report(patched['METRICS_DIR'], 'miner')
+            # Same pages again from the raw-page archive, no network
+            start = time.perf_counter()
+            replayed = scraper.replay_archive()
+            replay_s = time.perf_counter() - start
+        finally:
+            for k, v in saved.items(): setattr(scraper, k, v)
+            fetcher.BACKOFF_BASE = saved_backoff
+
+    return {
+        'wall_s': secs,
+        'rows': len(df),
+        'pages_per_s': cfg['pages'] * max(areas, 1) / secs,
+        'rows_per_s': len(df) / secs,
+        'http_requests': site.requests,
+        'geocode_calls': geocoder.calls,
+        'parse_failures': int(run['summary']['parse_failures']),
+        'crawl_s': run['phases']['crawl']['seconds'],
+        'replay_s': replay_s,
+        'replay_rows': len(replayed),
+    }
+
+def bench_parse(cfg):
+    pages, source = fixture_pages(cfg['pages'])
+    out = {'fixtures': source, 'pages': len(pages)}
+    for engine in ("bs4", "lxml"):
+        if engine == "lxml" and parsing.etree is None: continue
+        secs, rows = timed(lambda: sum(len(parsing.parse_page(html, engine)) for html in pages))
+        out[f'{engine}_rows_per_s'] = rows / secs
+    return out
+
+def bench_normalize(cfg):
+    samples = ["8.5万円", "５０００円", "-", "１２．３万円", "10万円", "", "築２３年", "ＯＳＡＫＡ　レジデンス"] * (cfg['calls'] // 8)
+    secs_money, _ = timed(lambda: [parsing.clean_money(s) for s in samples])
+    secs_norm, _ = timed(lambda: [parsing.normalize_japanese(s) for s in samples])
+    return {'clean_money_per_s': len(samples) / secs_money, 'normalize_per_s': len(samples) / secs_norm}
+
+def bench_geocache(cfg):
+    n = cfg['addresses']
+    addrs = [f"大阪府大阪市北区梅田{i % 9 + 1}丁目{i}-1" if i % 2 else f"大阪府大阪市区{i}町{i % 5 + 1}" for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeocodeCache(os.path.join(tmp, "geocode_cache.sqlite"))
+        start = time.perf_counter()
+        for i, a in enumerate(addrs):
+            if i % 10: cache.put(a, 34.7, 135.5, 'bench')
+            else: cache.put_failure(a, 'bench')
+        put_s = time.perf_counter() - start
+        known_s, _ = timed(lambda: [cache.is_known(a) for a in addrs])
+        many_s, _ = timed(lambda: cache.lookup_many(addrs))
+        cache.close()
+    return {'put_per_s': n / put_s, 'is_known_per_s': n / known_s, 'lookup_many_per_s': n / many_s}
+
+def bench_dataframe(cfg):
+    pages, _ = fixture_pages(cfg['pages'])
+    rows = [r for html in pages for r in parsing.parse_page(html)]
+    rows = (rows * (cfg['rows'] // max(len(rows), 1) + 1))[:cfg['rows']]
+    secs, _ = timed(lambda: storage.apply_schema(pd.DataFrame(rows)))
+    return {'rows': len(rows), 'build_rows_per_s': len(rows) / secs}
+
+def _valued_listings(n):
+    df = storage.apply_schema(synthetic_listings(n))
+    df['active'] = True
+    return df
+
+def bench_model(cfg):
+    from valuation import RentModel, add_valuation
+    df = _valued_listings(cfg['model_rows'])
+    fit_s, model = timed(lambda: RentModel.train(df), repeat=1)
+    predict_s, _ = timed(lambda: add_valuation(df.copy(), model))
+    return {'rows': len(df), 'fit_s': fit_s, 'predict_ms': predict_s * 1000}
+
+def bench_filter(cfg):
+    from query import ListingIndex
+    from bench_filter import QUERY, pandas_page, index_page
+    df = _valued_listings(cfg['filter_rows'])
+    df['residual'] = np.random.default_rng(1).normal(0, 8000, len(df))
+    build_s, index = timed(lambda: ListingIndex(df), repeat=1)
+    pandas_s, _ = timed(lambda: pandas_page(df, QUERY))
+    index_s, _ = timed(lambda: index_page(index, QUERY))
+    return {'rows': len(df), 'index_build_s': build_s, 'pandas_filter_page_ms': pandas_s * 1000,
+            'index_filter_page_ms': index_s * 1000}
+
+def bench_map(cfg):
+    from mapview import build_map
+    df = _valued_listings(cfg['map_rows'])
+    df['status'] = np.where(np.arange(len(df)) % 4 == 0, "Undervalued", "Fair Value")
+    secs, html = timed(lambda: build_map(df).get_root().render())
+    return {'rows': len(df), 'build_render_ms': secs * 1000, 'payload_mb': len(html.encode('utf-8')) / 2**20}
+
+def bench_spatial(cfg):
+    from spatial import SpatialIndex
+    df = _valued_listings(cfg['spatial_rows'])
+    build_s, spatial = timed(lambda: SpatialIndex(df), repeat=1)
+    features_s, _ = timed(spatial.neighborhood_features)
+    cards = np.random.default_rng(3).integers(0, len(df), 12)
+    comps_s, _ = timed(lambda: [spatial.comparables(int(p)) for p in cards])
+    return {'rows': len(df), 'build_s': build_s, 'features_s': features_s, 'comparables_page_ms': comps_s * 1000}
+
+def bench_history(cfg):
+    # A year of daily crawls: each day ~2% of units reprice, ~1% go, ~1% are new
+    from history import ListingHistory
+    rng = np.random.default_rng(2)
+    df = _valued_listings(cfg['history_rows'])
+    df['row_hash'] = df['total_rent'].astype(str)
+    next_id, record_s = len(df), 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite")
+        history = ListingHistory(path)
+        day0 = datetime(2025, 1, 1)
+        for day in range(cfg['history_days']):
+            n = len(df)
+            moved = rng.random(n) < 0.02
+            df.loc[moved, 'total_rent'] = (df.loc[moved, 'total_rent'] * rng.uniform(0.9, 1.05, moved.sum())).round(-3).astype('int32')
+            df['row_hash'] = df['total_rent'].astype(str)
+            df = df[rng.random(n) >= 0.01]
+            new = _valued_listings(n // 100)
+            new['link'] = [f"https://suumo.jp/chintai/jnc_{i:012d}/" for i in range(next_id, next_id + len(new))]
+            new['row_hash'] = new['total_rent'].astype(str)
+            next_id += len(new)
+            df = pd.concat([df, new], ignore_index=True)
+            start = time.perf_counter()
+            history.record_crawl(df, (day0 + pd.Timedelta(days=day)).isoformat(timespec='seconds'), complete=True)
+            record_s += time.perf_counter() - start
+        now = day0 + pd.Timedelta(days=cfg['history_days'])
+        links = df['link'].sample(50, random_state=0).tolist()
+        history_s, _ = timed(lambda: [history.price_history(l) for l in links])
+        drops_s, drops = timed(lambda: history.rent_drops(7, now=now))
+        history.close()
+        size_mb = os.path.getsize(path) / 2**20
+    return {'crawls': cfg['history_days'], 'rows': len(df), 'record_crawl_ms': record_s / cfg['history_days'] * 1000,
+            'price_history_ms': history_s / len(links) * 1000, 'rent_drops_7d_ms': drops_s * 1000,
+            'drops_7d': len(drops), 'db_mb': size_mb}
+
+def bench_dedup(cfg):
+    # ~10% of units re-listed by another agency: full-width name, floor
+    # suffix or extra spaces, and a slightly different rent
+    from dedup import mark_duplicates, collapse_duplicates
+    rng = np.random.default_rng(4)
+    base = _valued_listings(cfg['dedup_rows'])
+    copies = base.sample(frac=0.1, random_state=4).copy()
+    spellings = [lambda n: n.translate({c: c + 0xFEE0 for c in range(0x21, 0x7F)}), lambda n: n + " 3階",
+                 lambda n: n.replace(" ", "  ")]
+    copies['name'] = [spellings[i % 3](n) for i, n in enumerate(copies['name'])]
+    copies['total_rent'] = (copies['total_rent'] + rng.integers(-2, 3, len(copies)) * 1000).astype('int32')
+    copies['link'] = [f"https://suumo.jp/chintai/jnc_dup{i:09d}/" for i in range(len(copies))]
+    df = pd.concat([base, copies], ignore_index=True)
+    mark_s, _ = timed(lambda: mark_duplicates(df))
+    collapse_s, units = timed(lambda: collapse_duplicates(df))
+    # Recall: injected pairs sharing a canonical link; false merges: distinct units collapsed together
+    group = dict(zip(df['link'], df['dup_of']))
+    found = sum(group[a] == group[b] for a, b in zip(base.loc[copies.index, 'link'], copies['link']))
+    return {'rows': len(df), 'mark_rows_per_s': len(df) / mark_s, 'collapse_ms': collapse_s * 1000,
+            'units': len(units), 'recall': found / len(copies),
+            'false_merges': len(base) - base['link'].map(group).nunique()}
+
+# Fresh interpreter per measurement: streamlit itself is preloaded (the server
+# has it before any browser connects), then one AppTest run of the dashboard
+STARTUP_SCRIPT = """
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+print(json.dumps({'first_paint_s': time.perf_counter() - start, 'exceptions': len(at.exception),
+                  'heavy': [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+HEAVY_MODULES = ['xgboost', 'scipy.spatial', 'folium', 'streamlit_folium', 'requests', 'bs4', 'geopy', 'lxml']
+
+def bench_startup(cfg):
+    # Dashboard first paint on a new server process: empty store, new store
+    # (model trained) and the same store again (persisted predictions).
+    # src/ is copied so the app's DATA_DIR is a scratch directory.
+    import shutil
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(SRC_DIR, os.path.join(tmp, "src"), ignore=shutil.ignore_patterns("__pycache__"))
+        app = os.path.join(tmp, "src", "app.py")
+
+        def first_paint(case):
+            proc = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, app, *HEAVY_MODULES],
+                                  capture_output=True, text=True, check=True)
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            if result['exceptions']: raise RuntimeError(f"startup/{case}: app raised")
+            out[f'{case}_first_paint_s'] = result['first_paint_s']
+            out[f'{case}_heavy_modules'] = len(result['heavy'])
+            print(f"    {case}: heavy modules loaded {result['heavy']}")
+
+        first_paint('empty')
+        df = _valued_listings(cfg['startup_rows'])
+        df['image_url'] = None  # No thumbnail downloads
+        os.makedirs(os.path.join(tmp, "data"), exist_ok=True)
+        storage.save_listings(df, storage.store_path(os.path.join(tmp, "data")))
+        first_paint('new_store')
+        first_paint('warm')
+    out['rows'] = cfg['startup_rows']
+    return out
+
+SUITES = {
+    'miner': bench_miner, 'shards': lambda cfg: bench_miner(cfg, areas=cfg['areas']),
+    'parse': bench_parse, 'normalize': bench_normalize, 'geocache': bench_geocache,
+    'dataframe': bench_dataframe, 'model': bench_model, 'filter': bench_filter, 'map': bench_map,
+    'spatial': bench_spatial, 'history': bench_history, 'startup': bench_startup, 'dedup': bench_dedup,
+}
+
+FULL = dict(pages=20, areas=4, latency=0.05, error_rate=0.05, rate=20.0, geocode_delay=0.01, calls=200_000,
+            addresses=20_000, rows=200_000, model_rows=50_000, filter_rows=1_000_000, map_rows=20_000,
+            history_rows=20_000, history_days=365, spatial_rows=200_000, startup_rows=50_000, dedup_rows=200_000)
+QUICK = dict(FULL, pages=5, areas=2, calls=20_000, addresses=2_000, rows=20_000, model_rows=5_000,
+             filter_rows=50_000, map_rows=3_000, history_rows=2_000, history_days=90,
+             spatial_rows=20_000, startup_rows=5_000, dedup_rows=20_000)
+
+# --- REPORT ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def compare(report, baseline, threshold):
+    """Prints per-metric change vs `baseline`; returns the regressed metric names."""
+    regressions = []
+    for suite, metrics in report['results'].items():
+        for name, value in metrics.items():
+            old = baseline.get('results', {}).get(suite, {}).get(name)
+            # Counts (ints) describe the run, only float measurements are compared
+            if not isinstance(value, float) or not isinstance(old, (int, float)) or not old: continue
+            change = (value - old) / old
+            worse = -change if name.endswith('_per_s') else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            if flag: regressions.append(f"{suite}.{name}")
+            print(f"    {suite + '.' + name:<40} {old:>14.3f} -> {value:>14.3f} ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=list(SUITES))
+    ap.add_argument("--quick", action="store_true")
+    ap.add_argument("--out", help="report path (default data/benchmarks/<commit>-<time>.json)")
+    ap.add_argument("--compare", help="baseline report to diff against")
+    ap.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as a regression")
+    args = ap.parse_args()
+
+    cfg = QUICK if args.quick else FULL
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'config': cfg,
+        'results': {},
+    }
+    for name in args.only or SUITES:
+        print(f"[-] {name}...")
+        report['results'][name] = SUITES[name](cfg)
+        for metric, value in report['results'][name].items():
+            print(f"    {metric:<28} {value:,.3f}" if isinstance(value, float) else f"    {metric:<28} {value}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    print(f"[-] Report written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: baseline = json.load(f)
+        print(f"[-] Compared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+        if compare(report, baseline, args.threshold): return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Offline stand-ins for the benchmarks: recorded SUUMO fixture pages served
+from a local HTTP server (with injectable latency and errors) and a fake
+Nominatim geocoder. Nothing in here talks to the real sites except
+record_fixtures().
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import glob
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from scraper import BASE_URL, DATA_DIR
+from fetcher import fetch_pages
+
+FIXTURE_DIR = os.path.join(DATA_DIR, "fixtures")
+EMPTY_PAGE = "<html><body></body></html>"
+
+# --- FIXTURES ---
+def record_fixtures(n_pages, fixture_dir=FIXTURE_DIR):
+    """Saves the first `n_pages` live result pages (the only networked call here)."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    urls = [f"{BASE_URL}&page={page}" for page in range(1, n_pages + 1)]
+    for i, url, html in fetch_pages(urls):
+        if html is None:
+            print(f"[!] Page {i + 1} failed, skipped")
+            continue
+        path = os.path.join(fixture_dir, f"page_{i + 1:03d}.html")
+        with open(path, "w", encoding="utf-8") as f: f.write(html)
+        print(f"[-] Saved {path}")
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.html"))):
+        with open(path, encoding="utf-8") as f: pages.append((os.path.basename(path), f.read()))
+    return pages
+
+def synthetic_page(seed, buildings=30):
+    """
+    Stand-in result page in SUUMO's cassetteitem markup, for machines that
+    have no recorded fixtures. Only the elements parse_page() reads.
+    """
+    rng = random.Random(seed)
+    items = []
+    for b in range(buildings):
+        bid = seed * 1000 + b
+        units = []
+        for u in range(rng.randint(1, 6)):
+            units.append(
+                '<tr><td><input type="checkbox"></td>'
+                f'<td><img src="https://img01.suumo.com/blank.gif" rel="https://img01.suumo.com/front/gazo/bukken/{bid}_{u}.jpg"></td>'
+                f'<td>{rng.choice(["1階", "2階", "１０階", "B1階", "-"])}</td>'
+                f'<td><ul><li><span class="cassetteitem_price cassetteitem_price--rent"><span>{rng.randint(4, 20)}.{rng.randint(0, 9)}万円</span></span></li>'
+                f'<li><span class="cassetteitem_price cassetteitem_price--administration">{rng.choice(["5000円", "-", "１００００円"])}</span></li></ul></td>'
+                f'<td><ul><li><span class="cassetteitem_price cassetteitem_price--deposit">{rng.choice(["-", "5万円"])}</span></li>'
+                f'<li><span class="cassetteitem_price cassetteitem_price--gratuity">{rng.choice(["-", "10万円"])}</span></li></ul></td>'
+                f'<td><ul><li><span class="cassetteitem_madori">{rng.choice(["ワンルーム", "1K", "1LDK", "２ＤＫ"])}</span></li>'
+                f'<li><span class="cassetteitem_menseki">{rng.randint(15, 80)}.{rng.randint(0, 99)}m<sup>2</sup></span></li></ul></td>'
+                '<td>-</td><td>-</td>'
+                f'<td><a href="/chintai/jnc_{bid:09d}{u}/">詳細を見る</a></td></tr>')
+        items.append(
+            '<div class="cassetteitem">'
+            f'<div class="cassetteitem_content-title">ＯＳＡＫＡ　レジデンス {bid}</div>'
+            '<ul class="cassetteitem_detail">'
+            f'<li class="cassetteitem_detail-item cassetteitem_detail-col1">大阪府大阪市北区{rng.choice(["梅田", "中津", "天満"])}{rng.randint(1, 3)}</li>'
+            f'<li class="cassetteitem_detail-item cassetteitem_detail-col3"><div>{rng.choice(["新築", "築5年", "築２３年"])}</div></li></ul>'
+            f'<table class="cassetteitem_other"><tbody>{"".join(units)}</tbody></table></div>')
+    return f'<!DOCTYPE html><html><head><meta charset="UTF-8"></head><body>{"".join(items)}</body></html>'
+
+def fixture_pages(n_pages, fixture_dir=FIXTURE_DIR):
+    """(pages, source): recorded fixtures if any, synthetic ones otherwise."""
+    pages = [html for _, html in load_fixtures(fixture_dir)]
+    if pages: return pages, "recorded"
+    return [synthetic_page(seed) for seed in range(1, n_pages + 1)], "synthetic"
+
+# --- SUUMO STAND-IN ---
+class SuumoStandIn:
+    """
+    Local HTTP server answering `?...&page=N` with fixture page N (cycled,
+    links made unique per page). Pages past `n_pages` are empty, like the
+    end of a real result set. `latency` seconds are added to every response
+    and `error_rate` of them fail with 503; pages in `fail_pages` always 404.
+    """
+    def __init__(self, pages, n_pages=None, latency=0.0, error_rate=0.0, seed=0, fail_pages=()):
+        self.pages = pages
+        self.n_pages = n_pages or len(pages)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_pages = set(fail_pages)
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.served = []  # Page numbers requested, in arrival order
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/jj/chintai/ichiran/?ar=060"
+
+    def pager(self, n):
+        # SUUMO's pager: neighbouring pages plus the last one
+        shown = sorted({1, *range(max(1, n - 2), min(self.n_pages, n + 2) + 1), self.n_pages})
+        items = "".join(f"<li><span>{k}</span></li>" if k == n else f'<li><a href="?page={k}">{k}</a></li>' for k in shown)
+        return f'<div class="pagination pagination_set-nav"><ol class="pagination-parts">{items}</ol></div>'
+
+    def page(self, n):
+        if n > self.n_pages: return EMPTY_PAGE
+        html = self.pages[(n - 1) % len(self.pages)]
+        if n > len(self.pages): html = html.replace('href="/chintai/', f'href="/chintai/p{n}/')
+        return html.replace("</body>", self.pager(n) + "</body>", 1)
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.requests += 1
+                if standin.latency: time.sleep(standin.latency)
+                if standin.rng.random() < standin.error_rate:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                page = int(parse_qs(urlparse(self.path).query).get("page", ["1"])[0])
+                standin.served.append(page)
+                if page in standin.fail_pages:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = standin.page(page).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args): pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# --- NOMINATIM STAND-IN ---
+class FakeLocation:
+    def __init__(self, latitude, longitude):
+        self.latitude, self.longitude = latitude, longitude
+
+class FakeGeocoder:
+    """Deterministic geocode(query): a point near Osaka derived from the query hash."""
+    def __init__(self, delay=0.0, miss_rate=0.0):
+        self.delay = delay
+        self.miss_rate = miss_rate
+        self.calls = 0
+
+    def __call__(self, query):
+        self.calls += 1
+        if self.delay: time.sleep(self.delay)
+        h = int(hashlib.md5(query.encode("utf-8")).hexdigest(), 16)
+        if (h % 1000) / 1000 < self.miss_rate: return None
+        return FakeLocation(34.60 + (h % 2000) / 10000, 135.40 + (h // 2000 % 2000) / 10000)
@@ -1,11 +1,20 @@
+import time
+SCRIPT_START = time.perf_counter()  # Before the other imports, so cold start includes them
 import streamlit as st
 import pandas as pd
-import xgboost as xgb
-import folium
-from streamlit_folium import st_folium
 import os
-import time
-from scraper import run_osaka_miner
+import hashlib
+from storage import store_path, load_listings, import_csv, export_csv
+from valuation import dataset_version, load_predictions, apply_valuation
+from query import ListingIndex
+from spatial import load_neighborhoods, add_neighborhood_features
+from metrics import Metrics, load_report
+from jobs import JobQueue, spawn_worker
+from areas import AREAS, DEFAULT_AREAS
+from history import ListingHistory
+from dedup import collapse_duplicates
+import json
+from datetime import date
 
 # --- CONFIGURATION ---
 st.set_page_config(
@@ -54,14 +63,129 @@ st.markdown("""
 # Calculate path relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-DATA_PATH = os.path.join(PROJECT_ROOT, "data", "osaka_listings.csv")
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+DATA_PATH = store_path(DATA_DIR)
+LEGACY_CSV_PATH = os.path.join(DATA_DIR, "osaka_listings.csv")
+MODEL_DIR = os.path.join(DATA_DIR, "models")
+THUMB_DIR = os.path.join(DATA_DIR, "thumbs")
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+JOBS_DB = os.path.join(DATA_DIR, "jobs.sqlite")
+WORKER_LOG = os.path.join(DATA_DIR, "worker.log")
+JOB_POLL_SECONDS = 2
+HISTORY_DB = os.path.join(DATA_DIR, "history.sqlite")
+
+@st.cache_resource
+def get_metrics():
+    # One registry for the server process; cached functions record their
+    # cost only when they actually run (i.e. on a cache miss)
+    return Metrics('dashboard')
 
-@st.cache_data
+app_metrics = get_metrics()
+rerun_start = time.perf_counter()
+# Heavy modules (xgboost, scipy, folium, requests) load on first use: in
+# RentModel, SpatialIndex, get_map(), the map tab and thumbnail downloads. A
+# cold start only pays for them when the store is new or the map is opened.
+if app_metrics.phase_seconds('cold_start') == 0: app_metrics.add_time('imports', rerun_start - SCRIPT_START)
+
+@st.cache_resource(show_spinner="Loading listings...")
 def load_data():
-    if not os.path.exists(DATA_PATH): return pd.DataFrame()
-    return pd.read_csv(DATA_PATH)
+    # cache_resource: every rerun shares one frame instead of unpickling a
+    # copy (callers never modify it in place)
+    with app_metrics.phase('load_data'):
+        if not os.path.exists(DATA_PATH) and os.path.exists(LEGACY_CSV_PATH) and DATA_PATH != LEGACY_CSV_PATH:
+            import_csv(LEGACY_CSV_PATH, DATA_PATH)
+        df = load_listings(DATA_PATH)
+        if df.empty: return df, None
+        # Incremental crawls keep delisted units around, flagged inactive
+        if 'active' in df.columns: df = df[df['active'].astype(bool)].reset_index(drop=True)
+        # One row per unit, not per agency listing: the model, KPIs and cards all count units
+        with app_metrics.phase('dedup'): df = collapse_duplicates(df)
+        return df, dataset_version(DATA_PATH)
+
+@st.cache_resource(show_spinner="Indexing locations...")
+def get_spatial(version, _df):
+    # Neighborhood features (model inputs) and card comparables, built once
+    # per dataset version and saved with the model, so a restart skips scipy
+    spatial = load_neighborhoods(_df, version, MODEL_DIR, metrics=app_metrics)
+    return spatial, add_neighborhood_features(_df.copy(), spatial)
+
+@st.cache_resource(show_spinner="Training valuation model...")
+def get_predictions(version, _df):
+    # Keyed on the dataset version only: trained once per store content; the
+    # predictions are saved with the model, so restarts read them from disk
+    # without loading xgboost. _df is not hashed by Streamlit.
+    return load_predictions(_df, version, MODEL_DIR, metrics=app_metrics)
+
+@st.cache_resource(show_spinner="Indexing listings...")
+def get_index(version, _df, _predicted):
+    # Valuation is computed once for the whole dataset so the cached
+    # "Best Deal" order can be built alongside the filter bitmaps.
+    valued = apply_valuation(_df.copy(), _predicted) if _predicted is not None else _df
+    with app_metrics.phase('index_build'): return ListingIndex(valued)
+
+@st.cache_resource(max_entries=16, show_spinner="Rendering map...")
+def get_map(version, filter_key, _map_data):
+    # One map per (dataset version, filter selection): tab switches, paging
+    # and sort changes reuse it instead of rebuilding every marker
+    from mapview import build_map
+    with app_metrics.phase('map_build'): return build_map(_map_data)
+
+@st.cache_resource
+def get_thumbnails():
+    from thumbnails import ThumbnailCache
+    return ThumbnailCache(THUMB_DIR)
+
+@st.cache_resource
+def get_jobs():
+    return JobQueue(JOBS_DB)
+
+@st.cache_resource
+def get_history():
+    return ListingHistory(HISTORY_DB)
+
+@st.cache_data(max_entries=32)
+def history_drops(crawl_id, days, today):
+    # Keyed on the newest snapshot (and day): one query per crawl, not per rerun
+    with app_metrics.phase('history_query'): return get_history().rent_drops(days)
+
+@st.cache_data(max_entries=64)
+def history_prices(crawl_id, link):
+    with app_metrics.phase('history_query'): return get_history().price_history(link)
+
+jobs = get_jobs()
+
+df, data_version = load_data()
+
+# A crawl that finished since this session last loaded data triggers a reload
+if 'seen_job' not in st.session_state:
+    last = jobs.last_finished()
+    st.session_state.seen_job = last['id'] if last else None
+
+def render_job(job):
+    if job is None:
+        # Finished since this session last looked: reload the data (or say why not)
+        last = jobs.last_finished()
+        if last is not None and last['id'] != st.session_state.seen_job:
+            st.session_state.seen_job = last['id']
+            if last['status'] == 'done': load_data.clear()
+            else: st.session_state.job_error = f"Miner job #{last['id']} {last['status']}: {last['message']}"
+            st.rerun(scope="app")
+        return
+    label = "Queued" if job['status'] == 'queued' else "Mining"
+    st.progress(min(max(job['progress'], 0.0), 1.0), text=f"{label} #{job['id']}: {job['message'] or '...'}")
+    if st.button("✖ Cancel Job", key=f"cancel_{job['id']}"): jobs.cancel(job['id'])
+    if job['status'] == 'queued' and not jobs.worker_alive():
+        st.caption("No worker running: start one with `python src/worker.py run`")
 
-df = load_data()
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_poller():
+    render_job(jobs.active())
+
+def miner_status():
+    if 'job_error' in st.session_state: st.error(st.session_state.pop('job_error'))
+    # Only poll while a job is queued/running; idle sessions stay quiet
+    if jobs.active() is None: render_job(None)
+    else: job_poller()
 
 # --- TOP BAR ---
 c_title, c_kpi1, c_kpi2, c_kpi3 = st.columns([4, 1, 1, 1])
@@ -72,7 +196,11 @@ with c_title:
 if not df.empty:
     with c_kpi1: st.metric("Total Assets", len(df))
     with c_kpi2: st.metric("Avg Rent", f"¥{int(df['total_rent'].mean()):,}")
-    with c_kpi3: st.metric("Mapped", len(df.dropna(subset=['lat'])))
+    with c_kpi3:
+        st.metric("Mapped", len(df.dropna(subset=['lat'])))
+        if 'geo_source' in df.columns:
+            tiers = df['geo_source'].value_counts()
+            st.caption(" · ".join(f"{k}: {v / len(df):.0%}" for k, v in tiers.items()))
 
 # =========================================================
 # 1. CONTROL PANEL
@@ -82,18 +210,17 @@ with st.expander("🎛️  SYSTEM CONTROLS & FILTERS", expanded=True):
     
     with col_mine:
         st.markdown("**⛏️ Data Mining**")
-        pages_scan = st.slider("Scan Depth (Pages)", 1, 50, 2)
-        if st.button("🔴 EXECUTE MINER"):
-            status_box = st.empty()
-            prog_bar = st.progress(0)
-            try:
-                with st.spinner("Connecting to Japan Residential Database..."):
-                    new_df = run_osaka_miner(max_pages=pages_scan, status_placeholder=status_box, progress_bar=prog_bar)
-                st.success(f"Ingested {len(new_df)} units.")
-                time.sleep(1)
-                st.rerun()
-            except Exception as e:
-                st.error(f"Critical Failure: {e}")
+        pages_scan = st.slider("Scan Depth (Pages per Area)", 1, 50, 2)
+        areas = st.multiselect("Areas", list(AREAS), default=DEFAULT_AREAS, format_func=lambda c: f"{AREAS[c]} ({c})",
+                               help="Each area is crawled as its own shards, in parallel under one rate limit")
+        incremental = st.checkbox("Incremental Refresh", value=True, help="Only fetch new/changed listings, stop once caught up")
+        if st.button("🔴 EXECUTE MINER", disabled=not areas):
+            # The crawl runs in the headless worker (src/worker.py); this
+            # session only enqueues it and polls its progress
+            jobs.enqueue({'max_pages': pages_scan, 'incremental': incremental, 'areas': sorted(areas)})
+            if not jobs.worker_alive(): spawn_worker(JOBS_DB, WORKER_LOG)
+            st.rerun()
+        miner_status()
 
     if not df.empty:
         with col_filter1:
@@ -120,121 +247,196 @@ with st.expander("🎛️  SYSTEM CONTROLS & FILTERS", expanded=True):
 if df.empty:
     st.info("System Idle. Initialize Miner to begin data ingestion.")
 else:
-    mask = (
-        (df['total_rent'].between(rent_range[0], rent_range[1])) &
-        (df['size_m2'].between(size_range[0], size_range[1])) &
-        (df['age'] <= age_range) &
-        (df['floor'] >= min_floor) &
-        (df['layout'].isin(layouts))
-    )
-    df_filtered = df[mask].copy()
-    
-    if zero_key:
-        df_filtered = df_filtered[(df_filtered['key_money'] == 0) & (df_filtered['deposit'] == 0)]
+    # Model is trained once per dataset version; the index is built once per
+    # version too, so a rerun is a handful of bitmap ANDs
+    spatial, df = get_spatial(data_version, df)
+    predicted = get_predictions(data_version, df)
+    index = get_index(data_version, df, predicted)
+    with app_metrics.phase('query'):
+        result = index.query(rent_range, size_range, age_range, min_floor, layouts, zero_key)
+        df_filtered = result.frame()
 
     if df_filtered.empty:
         st.warning("No assets match criteria.")
     else:
-        df_filtered['layout_code'] = df_filtered['layout'].astype('category').cat.codes
-        features = ['size_m2', 'age', 'floor', 'layout_code']
-        target = 'total_rent'
-        ml_df = df_filtered.dropna(subset=features + [target])
-        
-        if len(ml_df) > 5:
-            model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100)
-            model.fit(ml_df[features], ml_df[target])
-            df_filtered['predicted_rent'] = model.predict(df_filtered[features].fillna(0))
-            df_filtered['residual'] = df_filtered['total_rent'] - df_filtered['predicted_rent']
-            
-            def get_status(row):
-                if row['residual'] < -5000: return "Undervalued"
-                if row['residual'] > 5000: return "Overpriced"
-                return "Fair Value"
-            df_filtered['status'] = df_filtered.apply(get_status, axis=1)
-
-        t_list, t_map, t_raw = st.tabs(["📋 List View", "🗺️ Full Map", "💾 Data Export"])
+        # Stateful tabs: only the open one is rendered, so the map (folium),
+        # history queries and CSV export cost nothing until they are viewed
+        t_list, t_map, t_hist, t_raw = st.tabs(["📋 List View", "🗺️ Full Map", "📈 Price History", "💾 Data Export"],
+                                               key="view", on_change="rerun")
 
         # --- TAB 1: LIST ---
         with t_list:
-            ITEMS = 12
-            if 'page' not in st.session_state: st.session_state.page = 0
+            if t_list.open:
+                ITEMS = 12
+                if 'page' not in st.session_state: st.session_state.page = 0
             
-            sort_opt = st.selectbox("Sort By", ["Best Deal (Arbitrage)", "Cheapest Rent", "Largest Size"], index=0)
-            if sort_opt == "Best Deal (Arbitrage)": df_view = df_filtered.sort_values('residual', ascending=True)
-            elif sort_opt == "Cheapest Rent": df_view = df_filtered.sort_values('total_rent', ascending=True)
-            else: df_view = df_filtered.sort_values('size_m2', ascending=False)
+                sort_opt = st.selectbox("Sort By", ["Best Deal (Arbitrage)", "Cheapest Rent", "Largest Size"], index=0)
+                if sort_opt == "Best Deal (Arbitrage)": sort_key = 'residual'
+                elif sort_opt == "Cheapest Rent": sort_key = 'cheapest'
+                else: sort_key = 'largest'
             
-            max_p = max(1, (len(df_view) // ITEMS) + 1)
-            if st.session_state.page >= max_p: st.session_state.page = max_p - 1
-            if st.session_state.page < 0: st.session_state.page = 0
+                max_p = max(1, (len(result) // ITEMS) + 1)
+                if st.session_state.page >= max_p: st.session_state.page = max_p - 1
+                if st.session_state.page < 0: st.session_state.page = 0
             
-            start = st.session_state.page * ITEMS
-            page_df = df_view.iloc[start : start + ITEMS]
+                start = st.session_state.page * ITEMS
+                page_df = result.page(sort_key, st.session_state.page, ITEMS)
             
-            st.markdown(f"**Showing {start+1}-{min(start+ITEMS, len(df_view))} of {len(df_view)}**")
+                st.markdown(f"**Showing {start+1}-{min(start+ITEMS, len(result))} of {len(result)}**")
+
+                # Cache this page's misses and warm the next page in the background
+                thumbs = get_thumbnails()
+                thumbs.prefetch(page_df['image_url'])
+                thumbs.prefetch(result.page(sort_key, st.session_state.page + 1, ITEMS)['image_url'])
             
-            for _, row in page_df.iterrows():
-                with st.container(border=True):
-                    c1, c2, c3, c4 = st.columns([1.2, 2.5, 1.5, 1])
-                    with c1:
-                        if pd.notna(row.get('image_url')) and row['image_url']: st.image(row['image_url'])
-                        else: st.markdown('<div style="height:160px; background:#333; color:#777; display:flex; align-items:center; justify-content:center; border-radius:4px;">No IMG</div>', unsafe_allow_html=True)
-                    with c2:
-                        st.subheader(row['name'])
-                        st.caption(f"📍 {row['address']}")
-                        tags_html = ""
-                        status = row.get('status')
-                        if status == "Undervalued": tags_html += f"<span class='tag tag-green'>💎 Save ¥{int(row['residual']*-1):,}</span>"
-                        elif status == "Overpriced": tags_html += "<span class='tag tag-red'>Overpriced</span>"
-                        if row['size_m2'] > 50: tags_html += "<span class='tag tag-blue'>Large</span>"
-                        st.markdown(tags_html, unsafe_allow_html=True)
-                        st.write(f"**{row['layout']}** | {row['size_m2']}m² | {row['floor']}F | {row['age']} yrs")
-                    with c3:
-                        st.metric("Rent", f"¥{int(row['total_rent']):,}")
-                        if 'residual' in row:
-                            val = int(row['residual']) * -1
-                            st.metric("Arbitrage", f"¥{val:,}", delta=val)
-                    with c4:
-                        st.write("")
-                        st.link_button("View ↗", row['link'])
-
-            b1, _, b2 = st.columns([1, 4, 1])
-            if b1.button("⬅️ Prev"): st.session_state.page -= 1; st.rerun()
-            if b2.button("Next ➡️"): st.session_state.page += 1; st.rerun()
+                for _, row in page_df.iterrows():
+                    with st.container(border=True):
+                        c1, c2, c3, c4 = st.columns([1.2, 2.5, 1.5, 1])
+                        with c1:
+                            # Local 180px thumbnail when cached, remote image otherwise
+                            if pd.notna(row.get('image_url')) and row['image_url']: st.image(thumbs.path_for(row['image_url']) or row['image_url'])
+                            else: st.markdown('<div style="height:160px; background:#333; color:#777; display:flex; align-items:center; justify-content:center; border-radius:4px;">No IMG</div>', unsafe_allow_html=True)
+                        with c2:
+                            st.subheader(row['name'])
+                            st.caption(f"📍 {row['address']}")
+                            tags_html = ""
+                            status = row.get('status')
+                            if status == "Undervalued": tags_html += f"<span class='tag tag-green'>💎 Save ¥{int(row['residual']*-1):,}</span>"
+                            elif status == "Overpriced": tags_html += "<span class='tag tag-red'>Overpriced</span>"
+                            if row['size_m2'] > 50: tags_html += "<span class='tag tag-blue'>Large</span>"
+                            if pd.notna(row.get('nbr_rent_m2')): tags_html += f"<span class='tag tag-blue'>Area ¥{int(row['nbr_rent_m2']):,}/m²</span>"
+                            if row.get('n_variants', 1) > 1: tags_html += f"<span class='tag tag-blue'>🔗 {row['n_variants']} agencies</span>"
+                            st.markdown(tags_html, unsafe_allow_html=True)
+                            st.write(f"**{row['layout']}** | {row['size_m2']}m² | {row['floor']}F | {row['age']} yrs")
+                            # Row labels are positions in the indexed frame, which the KD-tree shares
+                            comp_rows, comp_dist = spatial.comparables(row.name)
+                            if len(comp_rows):
+                                with st.expander(f"🏘️ {len(comp_rows)} comparables nearby"):
+                                    comps = index.df.iloc[comp_rows]
+                                    st.dataframe(pd.DataFrame({
+                                        'name': comps['name'].to_numpy(), 'layout': comps['layout'].astype(str).to_numpy(),
+                                        'size_m2': comps['size_m2'].to_numpy(), 'rent': comps['total_rent'].to_numpy(),
+                                        'yen_m2': (comps['total_rent'] / comps['size_m2']).round().to_numpy(),
+                                        'distance_m': comp_dist.round().astype(int), 'link': comps['link'].to_numpy(),
+                                    }), hide_index=True, width="stretch",
+                                        column_config={'link': st.column_config.LinkColumn("Link", display_text="↗")})
+                        with c3:
+                            st.metric("Rent", f"¥{int(row['total_rent']):,}")
+                            if 'residual' in row:
+                                val = int(row['residual']) * -1
+                                st.metric("Arbitrage", f"¥{val:,}", delta=val)
+                        with c4:
+                            st.write("")
+                            st.link_button("View ↗", row['link'])
+                            # Same unit through other agencies (the cheapest listing is the card)
+                            for i, link in enumerate(str(row.get('variant_links') or '').split()[1:], 2):
+                                st.markdown(f"[Listing {i} ↗]({link})")
+
+                b1, _, b2 = st.columns([1, 4, 1])
+                if b1.button("⬅️ Prev"): st.session_state.page -= 1; st.rerun()
+                if b2.button("Next ➡️"): st.session_state.page += 1; st.rerun()
 
         # --- TAB 2: MAP ---
         with t_map:
-            map_data = df_filtered.dropna(subset=['lat', 'lon'])
-            if map_data.empty: st.warning("No geospatial data.")
-            else:
-                center = [map_data['lat'].mean(), map_data['lon'].mean()]
-                m = folium.Map(location=center, zoom_start=12, tiles="CartoDB dark_matter")
-                from folium.plugins import MarkerCluster
-                marker_cluster = MarkerCluster().add_to(m)
-                
-                for _, row in map_data.iterrows():
-                    status = row.get('status', 'N/A')
-                    color = "green" if status == "Undervalued" else "red" if status == "Overpriced" else "gray"
-                    
-                    popup_html = f"""
-                    <div style="font-family:sans-serif; width:220px; color: black;">
-                        <b>{row['name']}</b><br>
-                        Rent: ¥{int(row['total_rent']):,}<br>
-                        Status: <span style='color:{color}; font-weight:bold;'>{status}</span><br>
-                        Size: {row['size_m2']} m²<br>
-                        <a href="{row['link']}" target="_blank">View Listing</a>
-                    </div>
-                    """
-                    tooltip_text = f"{row['name']} | ¥{int(row['total_rent']):,} | {status}"
-                    
-                    folium.CircleMarker(
-                        location=[row['lat'], row['lon']],
-                        radius=5, color=color, fill=True, fill_color=color, fill_opacity=0.8,
-                        popup=popup_html, tooltip=tooltip_text 
-                    ).add_to(marker_cluster)
-                st_folium(m, height=700, use_container_width=True)
+            if t_map.open:
+                map_data = df_filtered.dropna(subset=['lat', 'lon'])
+                if map_data.empty: st.warning("No geospatial data.")
+                else:
+                    filter_key = hashlib.sha1(result.mask.tobytes()).hexdigest()
+                    m = get_map(data_version, filter_key, map_data)
+                    from streamlit_folium import st_folium
+                    # No returned objects: panning/zooming must not trigger a rerun; width None fills the container
+                    st_folium(m, height=700, width=None, returned_objects=[])
+
+        # --- TAB 3: HISTORY ---
+        with t_hist:
+            if t_hist.open:
+                last_crawl = get_history().last_crawl()
+                if last_crawl is None: st.info("No snapshots yet. Every miner run records one.")
+                else:
+                    h1, h2, h3 = st.columns([1, 1, 2])
+                    days = h1.number_input("Rent dropped in the last N days", 1, 365, 7)
+                    only_filtered = h2.checkbox("Only current filter", value=True)
+                    h3.caption(f"Last snapshot {last_crawl[1]} (#{last_crawl[0]})")
+                    drops = history_drops(last_crawl[0], days, date.today().isoformat())
+                    if only_filtered and not drops.empty: drops = drops[drops['link'].isin(df_filtered['variant_links'].str.split().explode())]
+
+                    if drops.empty: st.caption("No rent drops in that window.")
+                    else:
+                        st.markdown(f"**{len(drops)} units cheaper than {days} days ago**")
+                        st.dataframe(drops.assign(drop_pct=drops['drop_pct'] * 100), hide_index=True, width="stretch",
+                                     column_config={'link': st.column_config.LinkColumn("Link"),
+                                                    'drop_pct': st.column_config.NumberColumn("Drop %", format="%.1f%%")})
+
+                    names = dict(zip(df_filtered['link'], df_filtered['name']))
+                    options = list(drops['link']) if not drops.empty else list(df_filtered['link'][:500])
+                    unit = st.selectbox("Unit", options, format_func=lambda l: f"{names.get(l, '')}  {l}")
+                    unit = st.text_input("...or listing URL", placeholder="https://suumo.jp/chintai/...") or unit
+                    if unit:
+                        prices = history_prices(last_crawl[0], unit)
+                        if prices.empty: st.caption("Not in the history.")
+                        else:
+                            # Versions are only stored on change; carry the last one up to the newest snapshot
+                            prices = pd.concat([prices, prices.tail(1).assign(ts=last_crawl[1])]).drop_duplicates('ts', keep='first')
+                            prices['ts'] = pd.to_datetime(prices['ts'])
+                            st.line_chart(prices.set_index('ts')[['total_rent']])
+                            st.dataframe(prices, hide_index=True, width="stretch")
 
         with t_raw:
-            st.markdown("### 💾 Export Data")
-            csv = df_filtered.to_csv(index=False).encode('utf-8')
-            st.download_button("Download CSV", data=csv, file_name="osaka_arbitrage_data.csv", mime="text/csv")
\ No newline at end of file
+            if t_raw.open:
+                st.markdown("### 💾 Export Data")
+                csv = export_csv(df_filtered).encode('utf-8')
+                st.download_button("Download CSV", data=csv, file_name="osaka_arbitrage_data.csv", mime="text/csv")
+
+# =========================================================
+# 3. DIAGNOSTICS
+# =========================================================
+app_metrics.add_time('rerun', time.perf_counter() - rerun_start)
+if 'first_paint' not in st.session_state:
+    # First complete run of a browser session; the first one in this server
+    # process is the cold start (module imports and cache builds included)
+    st.session_state.first_paint = time.perf_counter() - SCRIPT_START
+    if app_metrics.phase_seconds('cold_start') == 0: app_metrics.add_time('cold_start', st.session_state.first_paint)
+    app_metrics.add_time('first_paint', st.session_state.first_paint)
+
+def phase_table(report):
+    return pd.DataFrame([{'phase': k, 'seconds': round(v['seconds'], 3), 'calls': v['calls']}
+                         for k, v in report['phases'].items()])
+
+with st.expander("🩺 DIAGNOSTICS"):
+    miner_report = load_report(METRICS_DIR, 'miner')
+    d_miner, d_app = st.columns(2)
+
+    with d_miner:
+        st.markdown("**⛏️ Last Miner Run**")
+        if miner_report is None: st.caption("No miner run recorded yet.")
+        else:
+            summary = miner_report.get('summary', {})
+            k1, k2, k3 = st.columns(3)
+            k1.metric("Pages/s", f"{summary.get('pages_per_s', 0):.2f}")
+            k2.metric("Rows/s", f"{summary.get('rows_per_s', 0):.1f}")
+            k3.metric("Geocode Cache Hits", f"{summary.get('geocode_cache_hit_rate', 0):.0%}")
+            st.caption(f"{summary.get('pages', 0)} pages · {summary.get('rows', 0)} rows · "
+                       f"{summary.get('pages_failed', 0):g} failed pages · {summary.get('parse_failures', 0):g} parse failures · "
+                       f"{summary.get('duplicates', 0):g} cross-agency duplicates")
+            st.dataframe(phase_table(miner_report), hide_index=True, width="stretch")
+            for key in ('counters', 'histograms'):
+                table = pd.DataFrame(miner_report[key])
+                if table.empty: continue
+                table['labels'] = [", ".join(f"{k}={v}" for k, v in l.items()) for l in table['labels']]
+                st.dataframe(table, hide_index=True, width="stretch")
+            with open(os.path.join(METRICS_DIR, "miner.prom"), encoding="utf-8") as f:
+                st.download_button("Prometheus (miner.prom)", data=f.read(), file_name="miner.prom", mime="text/plain")
+
+    with d_app:
+        st.markdown("**🖥️ Dashboard Process**")
+        app_report = app_metrics.to_dict()
+        s1, s2, s3 = st.columns(3)
+        s1.metric("Cold Start", f"{app_metrics.phase_seconds('cold_start'):.2f}s")
+        s2.metric("Imports", f"{app_metrics.phase_seconds('imports'):.2f}s")
+        s3.metric("This Session's First Paint", f"{st.session_state.first_paint:.2f}s")
+        st.dataframe(phase_table(app_report), hide_index=True, width="stretch")
+        st.download_button("Run Report (JSON)", data=json.dumps(app_report, indent=2), file_name="dashboard_report.json", mime="application/json")
+        if st.button("Write dashboard.prom"):
+            app_metrics.write(METRICS_DIR)
+            st.caption(f"Written to {METRICS_DIR}")
@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import threading
+import gzip
+import time
+import os
+from parsing import parse_page_counted, row_hash
+from pipeline import record_parse, process_pool
+from metrics import NULL_METRICS
+
+# --- ARCHIVE CONFIG ---
+COMPRESS_LEVEL = 6
+
+class ResponseArchive:
+    """
+    Raw result pages as fetched, for re-parsing without the network.
+    Bodies are stored once per content hash as <root>/blobs/ab/<sha256>.html.gz
+    (identical pages across crawls cost nothing); every fetch gets a row in
+    <root>/index.sqlite with url, run, time, status, size, encoding and
+    latency. Safe to share between fetch threads; crawler processes open
+    their own instance on the same root.
+    """
+    def __init__(self, root, run=None):
+        self.root = root
+        self.run = run  # Miner run timestamp the fetches belong to
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False,
+                                    isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                run TEXT,
+                fetched_at REAL NOT NULL,
+                status INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                encoding TEXT,
+                elapsed REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_url ON responses (url, fetched_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_run ON responses (run)")
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest + ".html.gz")
+
+    def put(self, url, content, encoding=None, status=200, elapsed=None):
+        """Archives one raw response body (bytes); returns its content hash."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f: f.write(gzip.compress(content, COMPRESS_LEVEL))
+            os.replace(tmp, path)
+        with self.lock:
+            self.conn.execute("""INSERT INTO responses (url, run, fetched_at, status, digest, bytes, encoding, elapsed)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                              (url, self.run, time.time(), status, digest, len(content), encoding, elapsed))
+        return digest
+
+    def read(self, digest, encoding=None):
+        """Decoded page text, as fetch_page() returned it."""
+        with open(self.blob_path(digest), "rb") as f: content = gzip.decompress(f.read())
+        return content.decode(encoding or "utf-8", errors="replace")
+
+    def runs(self):
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT DISTINCT run FROM responses WHERE run IS NOT NULL ORDER BY run")]
+
+    def entries(self, run=None):
+        """(url, run, digest, encoding) of archived 200 responses, oldest first; one run or all."""
+        sql = "SELECT url, run, digest, encoding FROM responses WHERE status = 200"
+        args = ()
+        if run is not None: sql, args = sql + " AND run = ?", (run,)
+        with self.lock:
+            return self.conn.execute(sql + " ORDER BY fetched_at, id", args).fetchall()
+
+    def stats(self):
+        with self.lock:
+            responses, pages, raw = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT digest), SUM(bytes) FROM responses").fetchone()
+        stored = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(os.path.join(self.root, "blobs")) for f in files)
+        return {'responses': responses, 'unique_pages': pages, 'raw_bytes': raw or 0, 'stored_bytes': stored}
+
+    def close(self):
+        self.conn.close()
+
+# --- REPLAY ---
+def _parse_blob(root, digest, encoding):
+    # Pool side: reads the blob itself so only the digest crosses the process boundary
+    try:
+        with open(os.path.join(root, "blobs", digest[:2], digest + ".html.gz"), "rb") as f:
+            html = gzip.decompress(f.read()).decode(encoding or "utf-8", errors="replace")
+        return parse_page_counted(html)
+    except Exception as e:
+        print(f"Error replaying {digest}: {e}")
+        return None
+
+def _record(metrics, result):
+    if result is None:
+        metrics.inc('pages_failed', {'stage': 'parse'})
+        return []
+    return record_parse(metrics, result)
+
+def replay_rows(archive, run=None, workers=1, metrics=NULL_METRICS):
+    """
+    Re-parses the archived pages of `run` (default: every run) with a pool
+    of `workers` parser processes, no network. Each distinct page body is
+    parsed once. Returns {link: row} where the newest fetch of a listing
+    wins, and each row carries row_hash plus first_seen/last_seen from the
+    runs it was archived in.
+    """
+    entries = archive.entries(run)
+    blobs = list(dict.fromkeys((digest, encoding) for _, _, digest, encoding in entries))
+    parsed = {}
+    if workers > 1 and len(blobs) > 1:
+        with process_pool(workers) as pool:
+            results = pool.map(_parse_blob, [archive.root] * len(blobs), *zip(*blobs), chunksize=max(1, len(blobs) // (workers * 4)))
+            for blob, result in zip(blobs, results): parsed[blob] = _record(metrics, result)
+    else:
+        for blob in blobs: parsed[blob] = _record(metrics, _parse_blob(archive.root, *blob))
+
+    rows, seen = {}, {}
+    for url, run_ts, digest, encoding in entries:
+        for r in parsed[(digest, encoding)]:
+            link = r['link']
+            first, _ = seen.get(link, (run_ts, None))
+            seen[link] = (first, run_ts)
+            rows[link] = r
+    for link, r in rows.items():
+        r = rows[link] = dict(r)
+        r['row_hash'] = row_hash(r)
+        r['first_seen'], r['last_seen'] = seen[link]
+    return rows
@@ -0,0 +1,26 @@
+# --- AREA CONFIG ---
+# No crawler imports here: the dashboard lists areas without loading the fetch/parse stack
+
+# `areas` is the ta=/sc= part of the query
+SEARCH_URL = "https://suumo.jp/jj/chintai/ichiran/FR301FC001/?ar=060&bs=040&{areas}&cb=0.0&ct=9999999&et=9999999&cn=9999999&mb=0&mt=9999999&shkr1=03&shkr2=03&shkr3=03&shkr4=03&fw2=&srch_navi=1"
+
+# SUUMO `sc` codes (JIS municipality codes) for the selectable areas
+AREAS = {
+    '27102': "都島区", '27103': "福島区", '27104': "此花区", '27106': "西区", '27107': "港区",
+    '27108': "大正区", '27109': "天王寺区", '27111': "浪速区", '27113': "西淀川区", '27114': "東淀川区",
+    '27115': "東成区", '27116': "生野区", '27117': "旭区", '27118': "城東区", '27119': "阿倍野区",
+    '27120': "住吉区", '27121': "東住吉区", '27122': "西成区", '27123': "淀川区", '27124': "鶴見区",
+    '27125': "住之江区", '27126': "平野区", '27127': "北区", '27128': "中央区",
+    '27141': "堺市堺区", '27142': "堺市中区", '27143': "堺市東区", '27144': "堺市西区",
+    '27145': "堺市南区", '27146': "堺市北区", '27147': "堺市美原区",
+    '27203': "豊中市", '27204': "池田市", '27205': "吹田市", '27207': "高槻市", '27210': "枚方市",
+    '27211': "茨木市", '27212': "八尾市", '27215': "寝屋川市", '27220': "箕面市", '27227': "東大阪市",
+    '28202': "尼崎市", '28204': "西宮市",
+}
+DEFAULT_AREAS = ['27128', '27102']  # The two wards the original BASE_URL covers
+
+def search_url(area):
+    """An area code ('27128') or a full SUUMO search URL -> search URL."""
+    area = str(area)
+    if area.startswith("http"): return area
+    return SEARCH_URL.format(areas=f"ta={area[:2]}&sc={area}")
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import unicodedata
+import difflib
+import re
+from geocache import normalize_address
+
+# --- DEDUP CONFIG ---
+SIZE_STEP = 1.0         # m² grid of the blocking key; agencies copy the floor area give or take rounding
+NAME_SIMILARITY = 0.85  # SequenceMatcher ratio above which two names are one building
+MAX_BLOCK = 200         # Larger blocks (bad addresses) only merge identical names
+
+# Room/floor suffixes and decoration agencies add to the building name
+NAME_SUFFIX_RE = re.compile(r'[\s(（\[【]*(?<!\d)(\d+階(建)?|\d+f|\d+号室|\d+号棟?)[)）\]】]?\s*$')
+NAME_NOISE_RE = re.compile(r'[\s・･\-‐－〜~()（）\[\]【】「」『』/／,，.。、!！?？★☆◆◇■□]+')
+DIGITS_RE = re.compile(r'\d+')
+
+def normalize_name(name):
+    """'メゾン梅田 (3階)', 'ﾒｿﾞﾝ梅田' and 'メゾン 梅田' all map to 'メゾン梅田'."""
+    if name is None or pd.isna(name): return ""
+    text = unicodedata.normalize('NFKC', str(name)).lower().strip()
+    # Suffixes go before the separators do, so 'タワー12 3階' keeps its 12
+    while True:
+        trimmed = NAME_SUFFIX_RE.sub('', text)
+        if trimmed == text or not trimmed: break
+        text = trimmed
+    return NAME_NOISE_RE.sub('', text)
+
+def names_match(a, b):
+    """
+    Same building under two agencies' spellings. Numbers must agree
+    exactly: '第2メゾン' and 'OSAKA TOWER 12' are different buildings
+    however similar the rest reads.
+    """
+    if a == b: return bool(a)
+    if not a or not b or DIGITS_RE.findall(a) != DIGITS_RE.findall(b): return False
+    if len(a) >= 3 and len(b) >= 3 and (a in b or b in a): return True
+    m = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return m.real_quick_ratio() >= NAME_SIMILARITY and m.quick_ratio() >= NAME_SIMILARITY and m.ratio() >= NAME_SIMILARITY
+
+def block_keys(df, offset=0.0):
+    """
+    Blocking key per row: chome-level address | floor | layout | size on a
+    SIZE_STEP grid shifted by `offset` steps; NaN if incomplete.
+    """
+    address = df['address'].astype(object)
+    address = address.map({a: normalize_address(a) for a in address.dropna().unique()}).fillna("")  # Once per distinct address
+    size = np.floor(pd.to_numeric(df['size_m2'], errors='coerce') / SIZE_STEP + offset)
+    keys = address + "|" + df['floor'].astype(str) + "|" + df['layout'].astype(str) + "|" + size.astype(str)
+    return keys.where((address != "") & size.notna() & df['layout'].notna())
+
+def _blocks(keys):
+    """Row positions of every block with 2+ members."""
+    codes, _ = pd.factorize(keys)  # -1: no key
+    sizes = np.bincount(codes[codes >= 0], minlength=1)
+    shared = np.flatnonzero((codes >= 0) & (sizes[np.maximum(codes, 0)] > 1))
+    if not len(shared): return []
+    shared = shared[np.argsort(codes[shared], kind='stable')]
+    return np.split(shared, np.flatnonzero(np.diff(codes[shared])) + 1)
+
+def find_duplicates(df):
+    """
+    Canonical link of every row (its own link unless it is a variant).
+    Rows are only compared within their block, so the cost is linear in
+    the row count plus the (small) pairwise work inside each block. Sizes
+    are blocked on two grids half a step apart, so 25.4 and 25.6 m² share
+    a block in one of them. Matching names are clustered transitively;
+    each cluster's canonical row is its cheapest, the first listed on ties.
+    """
+    links = df['link'].astype(str).to_numpy(dtype=object)
+    rent = pd.to_numeric(df['total_rent'], errors='coerce').fillna(np.inf).to_numpy()
+    names = df['name'].to_numpy(dtype=object, na_value=None)
+    normalized = {}  # position -> normalize_name(), for rows that share a block
+    parent = list(range(len(df)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = root(i), root(j)
+        if i != j: parent[max(i, j)] = min(i, j)
+
+    for offset in (0.0, 0.5):
+        for rows in _blocks(block_keys(df, offset)):
+            for r in rows:
+                if r not in normalized: normalized[r] = normalize_name(names[r])
+            if len(rows) > MAX_BLOCK:
+                first = {}
+                for r in rows:
+                    if normalized[r]: union(first.setdefault(normalized[r], r), r)
+                continue
+            for a in range(len(rows)):
+                for b in range(a + 1, len(rows)):
+                    i, j = rows[a], rows[b]
+                    if root(i) != root(j) and names_match(normalized[i], normalized[j]): union(i, j)
+
+    clusters = {}
+    for r in normalized: clusters.setdefault(root(r), []).append(r)
+    canonical = links.copy()
+    for members in clusters.values():
+        if len(members) < 2: continue
+        best = min(members, key=lambda r: (rent[r], r))
+        canonical[members] = links[best]
+    return canonical
+
+def mark_duplicates(df):
+    """Sets `dup_of` (canonical link) in place; only active listings are matched."""
+    active = df['active'].astype(bool).to_numpy() if 'active' in df.columns else np.ones(len(df), dtype=bool)
+    dup_of = df['link'].astype(str).to_numpy(dtype=object)
+    dup_of[active] = find_duplicates(df[active])
+    df['dup_of'] = dup_of
+    return int((dup_of != df['link'].astype(str).to_numpy()).sum())
+
+def collapse_duplicates(df):
+    """
+    One row per physical unit: the canonical listing, with `variant_links`
+    (every agency's link, canonical first, space separated), `n_variants`
+    and the minimum rent of the group. Uses the stored `dup_of` when the
+    miner has set it.
+    """
+    if df.empty: return df
+    # Object arrays: hashing/iterating Arrow-backed strings row by row is ~5x slower
+    links = df['link'].astype(str).to_numpy(dtype=object)
+    dup_of = df['dup_of'].astype(str).to_numpy(dtype=object) if 'dup_of' in df.columns else find_duplicates(df).astype(object)
+    is_canonical = dup_of == links
+    # A canonical row that went inactive leaves its variants without one; they stand alone
+    is_canonical |= pd.Index(links[is_canonical]).get_indexer(dup_of) < 0
+
+    variants = {}
+    for link, canon in zip(links[~is_canonical], dup_of[~is_canonical]): variants.setdefault(canon, []).append(link)
+    out = df[is_canonical].reset_index(drop=True)
+    groups = [[link] + variants.get(link, []) for link in links[is_canonical]]
+    out['variant_links'] = [" ".join(g) for g in groups]
+    out['n_variants'] = np.array([len(g) for g in groups], dtype='int16')
+    return out
@@ -0,0 +1,138 @@
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+import threading
+import time
+import random
+from metrics import NULL_METRICS
+
+# --- FETCH CONFIG ---
+MAX_WORKERS = 4            # Max in-flight requests against the host
+REQUESTS_PER_SECOND = 0.5  # Global budget for the host (shared by all workers)
+MAX_RETRIES = 3            # Extra attempts for non-200 / network errors
+BACKOFF_BASE = 5           # Seconds, doubled on every retry (5, 10, 20...)
+TIMEOUT = 20
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
+]
+
+def get_header():
+    return {"User-Agent": random.choice(USER_AGENTS), "Referer": "https://suumo.jp/"}
+
+class RateBudget:
+    """
+    Requests-per-second budget shared by every worker hitting the same host.
+    Each call to wait() reserves the next free slot, so N workers together
+    never exceed `rate` requests per second (jitter only spreads them out).
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, jitter=0.25):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.jitter = jitter
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval * random.uniform(1, 1 + self.jitter)
+        delay = slot - time.monotonic()
+        if delay > 0: time.sleep(delay)
+
+class SharedRateBudget(RateBudget):
+    """
+    RateBudget for worker processes: the next free slot lives in shared
+    memory, so every process (and thread) reserving from it together stays
+    within `rate`. Hand it to children through a pool initializer.
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, jitter=0.25, ctx=None):
+        super().__init__(rate, jitter)
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.shared_slot = ctx.Value('d', 0.0)
+        self.lock = self.shared_slot.get_lock()
+
+    def wait(self):
+        # time.monotonic() is system-wide, so slots compare across processes
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.shared_slot.value)
+            self.shared_slot.value = slot + self.interval * random.uniform(1, 1 + self.jitter)
+        delay = slot - time.monotonic()
+        if delay > 0: time.sleep(delay)
+
+def make_session(pool_size=MAX_WORKERS):
+    # One pooled keep-alive connection per worker, reused for every page
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_page(session, url, budget, retries=MAX_RETRIES, metrics=NULL_METRICS, archive=None):
+    """
+    Returns the decoded page text, or None once all retries are spent.
+    With a ResponseArchive, successful raw responses are archived too.
+    """
+    for attempt in range(retries + 1):
+        if attempt:
+            backoff = BACKOFF_BASE * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            metrics.inc('http_retries')
+            metrics.inc('backoff_seconds', n=backoff)
+            time.sleep(backoff)
+        waited = time.perf_counter()
+        budget.wait()
+        start = time.perf_counter()
+        metrics.observe('rate_wait_seconds', start - waited)
+        try:
+            res = session.get(url, headers=get_header(), timeout=TIMEOUT)
+        except requests.RequestException as e:
+            metrics.observe('http_request_seconds', time.perf_counter() - start, {'status': 'error'})
+            metrics.inc('http_requests', {'status': 'error'})
+            print(f"Fetch error {url} (attempt {attempt + 1}): {e}")
+            continue
+
+        status = str(res.status_code)
+        metrics.observe('http_request_seconds', time.perf_counter() - start, {'status': status})
+        metrics.inc('http_requests', {'status': status})
+        if res.status_code == 200:
+            metrics.inc('http_bytes', n=len(res.content))
+            res.encoding = res.apparent_encoding
+            if archive is not None:
+                try:
+                    archive.put(url, res.content, res.encoding, res.status_code, time.perf_counter() - start)
+                except Exception as e:  # The crawl goes on without its archive copy
+                    print(f"Archive error {url}: {e}")
+            return res.text
+        # 4xx other than throttling will not get better by retrying
+        if 400 <= res.status_code < 500 and res.status_code != 429: break
+        print(f"HTTP {res.status_code} {url} (attempt {attempt + 1})")
+    metrics.inc('pages_failed', {'stage': 'fetch'})
+    return None
+
+def fetch_pages(urls, workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, session=None, budget=None, metrics=NULL_METRICS,
+                archive=None):
+    """
+    Fetches `urls` concurrently under one shared rate budget.
+    Yields (index, url, text) in completion order; text is None on failure.
+    Pass `session`/`budget` to keep connections and pacing across batches,
+    a Metrics registry to record request latency and status codes, and a
+    ResponseArchive to keep the raw pages.
+    """
+    if budget is None: budget = RateBudget(rate)
+    own_session = session is None
+    if own_session: session = make_session(workers)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(fetch_page, session, url, budget, metrics=metrics, archive=archive): (i, url) for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            i, url = futures[future]
+            yield i, url, future.result()
+    finally:
+        # Consumer may stop early: drop the queued pages instead of fetching them
+        pool.shutdown(wait=True, cancel_futures=True)
+        if own_session: session.close()
@@ -0,0 +1,87 @@
+import csv
+import os
+from geocache import normalize_address
+
+# Column names of the MLIT 位置参照情報 (大字・町丁目レベル) CSV export
+MLIT_COLUMNS = ('都道府県名', '市区町村名', '大字_町丁目名', '緯度', '経度')
+
+class Gazetteer:
+    """
+    Offline first-tier geocoder: town/chome centroids held in a character
+    trie keyed by normalize_address(). A lookup walks the address once and
+    returns the deepest entry that is a whole-token prefix of it, so
+    '大阪府大阪市北区梅田1' hits the chome centroid and '大阪府大阪市北区梅田'
+    falls back to the town centroid (mean of its chome).
+
+    Accepts either a plain `address,lat,lon` CSV or the MLIT 位置参照情報
+    town/chome CSV, e.g. the Osaka prefecture (27) file.
+    """
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    @classmethod
+    def from_csv(cls, path):
+        gazetteer = cls()
+        towns = {}
+        with open(path, encoding=cls._sniff_encoding(path), newline='') as f:
+            reader = csv.DictReader(f)
+            mlit = all(c in reader.fieldnames for c in MLIT_COLUMNS)
+            for r in reader:
+                try:
+                    if mlit:
+                        addr = r['都道府県名'] + r['市区町村名'] + r['大字_町丁目名']
+                        lat, lon = float(r['緯度']), float(r['経度'])
+                    else:
+                        addr, lat, lon = r['address'], float(r['lat']), float(r['lon'])
+                except (KeyError, TypeError, ValueError): continue
+
+                key = normalize_address(addr)
+                gazetteer.add(key, lat, lon)
+                # Collect chome under their town to derive a town centroid
+                town = key.rstrip('0123456789')
+                if town != key: towns.setdefault(town, []).append((lat, lon))
+
+        for town, points in towns.items():
+            if gazetteer.get_exact(town) is None:
+                gazetteer.add(town, sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+        return gazetteer
+
+    @staticmethod
+    def _sniff_encoding(path):
+        # MLIT ships Shift_JIS; user-made files are usually UTF-8
+        with open(path, 'rb') as f: head = f.read(4096)
+        try:
+            head.decode('utf-8')
+            return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'cp932'
+
+    def add(self, key, lat, lon):
+        node = self.root
+        for ch in key: node = node.setdefault(ch, {})
+        if None not in node: self.size += 1
+        node[None] = (lat, lon)
+
+    def get_exact(self, key):
+        node = self.root
+        for ch in key:
+            node = node.get(ch)
+            if node is None: return None
+        return node.get(None)
+
+    def lookup(self, addr):
+        """(lat, lon) of the most specific entry covering `addr`, or None."""
+        key = normalize_address(addr)
+        node, best = self.root, None
+        for i, ch in enumerate(key):
+            node = node.get(ch)
+            if node is None: break
+            # Only accept token boundaries: '本庄' must not match '本庄東1', '梅田1' not '梅田12'
+            if None in node and (i + 1 == len(key) or ch.isdigit() != key[i + 1].isdigit()):
+                best = node[None]
+        return best
+
+def load_gazetteer(path):
+    if not path or not os.path.exists(path): return None
+    return Gazetteer.from_csv(path)
@@ -0,0 +1,112 @@
+import sqlite3
+import csv
+import threading
+import unicodedata
+import time
+import re
+import os
+
+# --- GEOCODE CACHE CONFIG ---
+NEGATIVE_TTL = 7 * 24 * 3600  # Failed lookups are retried after a week
+
+KANJI_DIGITS = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+KANJI_CHOME_RE = re.compile(r'([一二三四五六七八九十]+)丁目')
+CHOME_RE = re.compile(r'^(.*?\D)(\d+)(?=丁目|-|番|$)')
+SPACE_RE = re.compile(r'\s+')
+
+def _kanji_to_int(kanji):
+    # Enough for chome numbers (一 .. 九十九)
+    if '十' not in kanji: return KANJI_DIGITS.get(kanji, 0)
+    tens, _, ones = kanji.partition('十')
+    return KANJI_DIGITS.get(tens, 1) * 10 + KANJI_DIGITS.get(ones, 0)
+
+def normalize_address(addr):
+    """
+    Canonical cache key: NFKC, no whitespace, trimmed to chome level.
+    '大阪府大阪市北区梅田１丁目2-3', '大阪府大阪市北区梅田一丁目' and
+    '大阪府大阪市北区梅田1' all map to '大阪府大阪市北区梅田1'.
+    """
+    if not addr: return ""
+    text = SPACE_RE.sub('', unicodedata.normalize('NFKC', str(addr)))
+    text = KANJI_CHOME_RE.sub(lambda m: f"{_kanji_to_int(m.group(1))}丁目", text)
+    match = CHOME_RE.match(text)
+    return match.group(1) + match.group(2) if match else text
+
+def geocode_query(key):
+    # Nominatim resolves '梅田1丁目' far better than a bare '梅田1'
+    query = key + "丁目" if key[-1:].isdigit() else key
+    return query if "大阪" in query else f"Osaka, {query}"
+
+class GeocodeCache:
+    """
+    SQLite-backed geocode cache keyed by normalize_address(). Every write is
+    a single-row upsert, and failed lookups are stored too (lat/lon NULL) so
+    they are not retried until NEGATIVE_TTL has passed. Safe to share
+    between the crawl thread and the geocoder thread.
+    """
+    UPSERT = "INSERT OR REPLACE INTO geocode (key, lat, lon, updated_at, source) VALUES (?, ?, ?, ?, ?)"
+
+    def __init__(self, path, legacy_csv=None):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                key TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                updated_at REAL NOT NULL,
+                source TEXT
+            )""")
+        # Caches created before tiered geocoding have no source column
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(geocode)")]
+        if 'source' not in columns: self.conn.execute("ALTER TABLE geocode ADD COLUMN source TEXT")
+        if legacy_csv and os.path.exists(legacy_csv) and not self.size(): self.import_csv(legacy_csv)
+
+    def import_csv(self, path):
+        """One-off migration from the old address_cache.csv (address,lat,lon)."""
+        now = time.time()
+        with open(path, encoding='utf-8') as f:
+            rows = [(normalize_address(r[0]), float(r[1]), float(r[2]), now, 'nominatim')
+                    for r in list(csv.reader(f))[1:] if len(r) >= 3 and r[1] and r[2]]
+        with self.lock:
+            self.conn.executemany(self.UPSERT, rows)
+
+    def size(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def _row(self, key):
+        with self.lock:
+            return self.conn.execute("SELECT lat, lon, updated_at, source FROM geocode WHERE key = ?", (key,)).fetchone()
+
+    def is_known(self, addr):
+        """True for a cached hit or a failure that is still within its TTL."""
+        row = self._row(normalize_address(addr))
+        if row is None: return False
+        return row[0] is not None or time.time() - row[2] < NEGATIVE_TTL
+
+    def get(self, addr):
+        """Returns {'lat', 'lon', 'source'} or None (never looked up, or failed)."""
+        row = self._row(normalize_address(addr))
+        if row is None or row[0] is None: return None
+        return {'lat': row[0], 'lon': row[1], 'source': row[3]}
+
+    def put(self, addr, lat, lon, source):
+        with self.lock:
+            self.conn.execute(self.UPSERT, (normalize_address(addr), lat, lon, time.time(), source))
+
+    def put_failure(self, addr, source):
+        self.put(addr, None, None, source)
+
+    def lookup_many(self, addrs):
+        """Bulk {address: {'lat', 'lon', 'source'}} for the hits among `addrs`."""
+        coords = {}
+        for addr in set(addrs):
+            hit = self.get(addr)
+            if hit: coords[addr] = hit
+        return coords
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,178 @@
+import pandas as pd
+import sqlite3
+import threading
+import os
+from datetime import datetime, timedelta
+
+# Price fields kept per version; other changes only bump the row hash
+PRICE_FIELDS = ('total_rent', 'key_money', 'deposit')
+STATIC_FIELDS = ('name', 'address', 'layout', 'size_m2', 'floor')
+
+def _value(v):
+    # numpy scalars / pandas NA -> what sqlite3 can bind
+    if v is None or pd.isna(v): return None
+    return v.item() if hasattr(v, 'item') else v
+
+class ListingHistory:
+    """
+    Time series of the listings store, one snapshot per crawl, in SQLite.
+    A listing gets a `versions` row only when it first appears, when its
+    row hash changes or when it goes/returns; unchanged listings cost
+    nothing per crawl beyond bumping `listings.last_crawl`. Versions are
+    keyed (link, crawl_id), so one unit's history is an index range scan
+    and "what changed since crawl N" uses the crawl_id index.
+
+      crawls    id, ts (the miner's run timestamp), listed, changed
+      listings  link -> static fields + current row_hash/rent/status/area
+      versions  (link, crawl_id) -> rent, key money, deposit, status
+    """
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL UNIQUE,
+                listed INTEGER NOT NULL DEFAULT 0,
+                changed INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                link TEXT PRIMARY KEY,
+                name TEXT,
+                address TEXT,
+                layout TEXT,
+                size_m2 REAL,
+                floor INTEGER,
+                row_hash TEXT,
+                total_rent INTEGER,
+                status TEXT NOT NULL,
+                first_crawl INTEGER NOT NULL,
+                last_crawl INTEGER NOT NULL,
+                area TEXT
+            )""")
+        # Histories created before sharded crawls have no area column
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(listings)")]
+        if 'area' not in columns: self.conn.execute("ALTER TABLE listings ADD COLUMN area TEXT")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS versions (
+                link TEXT NOT NULL,
+                crawl_id INTEGER NOT NULL,
+                total_rent INTEGER,
+                key_money INTEGER,
+                deposit INTEGER,
+                status TEXT NOT NULL,
+                PRIMARY KEY (link, crawl_id)
+            ) WITHOUT ROWID""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS versions_crawl ON versions (crawl_id)")
+
+    # --- WRITE ---
+    def record_crawl(self, df, ts, complete=False):
+        """
+        Snapshots the saved listings frame `df` as crawl `ts`. Rows with
+        active=False are recorded as gone; listed links missing from `df`
+        only when the crawl was `complete` (walked to the end of the results
+        with no failed pages), since a partial one says nothing about them.
+        Sharded crawls pass the set of areas they completed instead; only
+        missing links of those areas are gone. Returns the changed count.
+        """
+        now_listed = df['active'].astype(bool) if 'active' in df.columns else pd.Series(True, index=df.index)
+        areas = df['area'] if 'area' in df.columns else pd.Series(None, index=df.index)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR IGNORE INTO crawls (ts) VALUES (?)", (ts,))
+                crawl_id = self.conn.execute("SELECT id FROM crawls WHERE ts = ?", (ts,)).fetchone()[0]
+                current = {link: (h, status) for link, h, status in
+                           self.conn.execute("SELECT link, row_hash, status FROM listings")}
+                area_of = dict(self.conn.execute("SELECT link, area FROM listings")) if isinstance(complete, set) else {}
+
+                versions, upserts, seen = [], [], []
+                for row, listed, area in zip(df.itertuples(index=False), now_listed, areas):
+                    status = 'listed' if listed else 'gone'
+                    link, h, area = row.link, row.row_hash, _value(area)
+                    if listed: seen.append((crawl_id, area, link))
+                    if current.pop(link, None) == (h, status): continue
+                    prices = [_value(getattr(row, f)) for f in PRICE_FIELDS]
+                    versions.append((link, crawl_id, *prices, status))
+                    upserts.append((link, *[_value(getattr(row, f)) for f in STATIC_FIELDS], h, prices[0], status,
+                                    crawl_id, crawl_id, area))
+                # Still listed here but no longer in the store at all
+                dropped = [link for link, (h, status) in current.items() if status == 'listed'] if complete else []
+                if isinstance(complete, set): dropped = [link for link in dropped if area_of[link] in complete]
+                versions += [(link, crawl_id, None, None, None, 'gone') for link in dropped]
+                self.conn.executemany("UPDATE listings SET status = 'gone' WHERE link = ?", [(l,) for l in dropped])
+
+                self.conn.executemany("INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?)", versions)
+                self.conn.executemany("""
+                    INSERT INTO listings (link, name, address, layout, size_m2, floor, row_hash, total_rent, status,
+                                          first_crawl, last_crawl, area)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (link) DO UPDATE SET name = excluded.name, address = excluded.address,
+                        layout = excluded.layout, size_m2 = excluded.size_m2, floor = excluded.floor,
+                        row_hash = excluded.row_hash, total_rent = COALESCE(excluded.total_rent, total_rent),
+                        status = excluded.status, area = COALESCE(excluded.area, area)""", upserts)
+                self.conn.executemany("UPDATE listings SET last_crawl = ?, area = COALESCE(?, area) WHERE link = ?", seen)
+                self.conn.execute("UPDATE crawls SET listed = ?, changed = ? WHERE id = ?", (len(seen), len(versions), crawl_id))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(versions)
+
+    # --- QUERIES ---
+    def _frame(self, sql, args=()):
+        with self.lock:
+            cur = self.conn.execute(sql, args)
+            return pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+    def last_crawl(self):
+        """(id, ts) of the newest snapshot, or None."""
+        with self.lock:
+            return self.conn.execute("SELECT id, ts FROM crawls ORDER BY id DESC LIMIT 1").fetchone()
+
+    def crawls(self):
+        return self._frame("SELECT id, ts, listed, changed FROM crawls ORDER BY id")
+
+    def price_history(self, link):
+        """Every recorded version of one unit: ts, rents, status (gaps mean unchanged)."""
+        return self._frame("""SELECT c.ts, v.total_rent, v.key_money, v.deposit, v.status
+                              FROM versions v JOIN crawls c ON c.id = v.crawl_id
+                              WHERE v.link = ? ORDER BY v.crawl_id""", (link,))
+
+    def rent_drops(self, days, now=None, min_drop=1):
+        """
+        Listed units whose rent went down in a crawl of the last `days`
+        days: old_rent (before the first drop in the window), new_rent
+        (current), drop, drop_pct and the last change's timestamp.
+        """
+        cutoff = ((now or datetime.now()) - timedelta(days=days)).isoformat(timespec='seconds')
+        with self.lock:
+            first = self.conn.execute("SELECT MIN(id) FROM crawls WHERE ts >= ?", (cutoff,)).fetchone()[0]
+        if first is None: return pd.DataFrame()
+
+        # Versions in the window come off versions_crawl; each one's previous
+        # listed rent is a single (link, crawl_id) index seek
+        events = self._frame("""
+            SELECT * FROM (
+                SELECT v.link, s.name, s.address, s.layout, s.size_m2, s.floor,
+                       (SELECT p.total_rent FROM versions p
+                        WHERE p.link = v.link AND p.crawl_id < v.crawl_id AND p.status = 'listed'
+                        ORDER BY p.crawl_id DESC LIMIT 1) AS old_rent,
+                       v.total_rent AS rent, s.total_rent AS new_rent, c.ts AS changed_at, v.crawl_id
+                FROM versions v JOIN crawls c ON c.id = v.crawl_id JOIN listings s ON s.link = v.link
+                WHERE v.crawl_id >= ? AND v.status = 'listed' AND s.status = 'listed')
+            WHERE rent < old_rent
+            ORDER BY crawl_id""", (first,)).drop(columns=['rent', 'crawl_id'])
+        if events.empty: return events
+
+        out = events.groupby('link', sort=False).agg({**{c: 'first' for c in events.columns[1:-1]}, 'changed_at': 'last'}).reset_index()
+        out['drop'] = out['old_rent'] - out['new_rent']
+        out = out[out['drop'] >= min_drop]
+        out['drop_pct'] = out['drop'] / out['old_rent']
+        return out.sort_values('drop_pct', ascending=False).reset_index(drop=True)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,239 @@
+import subprocess
+import sqlite3
+import threading
+import json
+import time
+import sys
+import os
+
+# --- JOB QUEUE CONFIG ---
+STALE_AFTER = 120      # Seconds without a heartbeat before a running job is requeued
+WORKER_ALIVE = 30      # Seconds without a heartbeat before a worker counts as gone
+MAX_ATTEMPTS = 3       # Requeues after a crash before a job is marked failed
+PROGRESS_INTERVAL = 0.5  # Min seconds between progress writes
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+ACTIVE = ('queued', 'running')
+
+class JobCancelled(Exception):
+    pass
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+class JobQueue:
+    """
+    Local crawl queue shared by the dashboard and the headless worker(s)
+    through one SQLite file. Jobs are claimed atomically, report progress
+    and heartbeats while they run, and are put back in the queue when their
+    worker dies. Enqueuing parameters that match a queued/running job
+    returns that job, so every dashboard session watches the same crawl.
+    Schedules enqueue a job every `every_s` seconds.
+    """
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                source TEXT
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS schedules (
+                name TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                every_s REAL NOT NULL,
+                next_run REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS workers (pid INTEGER PRIMARY KEY, heartbeat REAL NOT NULL)")
+
+    def _write(self, sql, args=()):
+        with self.lock: return self.conn.execute(sql, args)
+
+    # --- JOBS ---
+    def enqueue(self, params, source="dashboard"):
+        """Queues a crawl with run_osaka_miner kwargs `params`; returns the job id."""
+        key = _params_key(params)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT id FROM jobs WHERE params = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+                                        (key,) + ACTIVE).fetchone()
+                if row is None:
+                    row = (self.conn.execute("INSERT INTO jobs (params, status, created_at, source) VALUES (?, 'queued', ?, ?)",
+                                             (key, time.time(), source)).lastrowid,)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return row[0]
+
+    def claim(self):
+        """Atomically moves the oldest queued job to running; returns it or None."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+                if row is not None:
+                    self.conn.execute("""UPDATE jobs SET status = 'running', started_at = ?, heartbeat = ?,
+                                         attempts = attempts + 1 WHERE id = ?""", (now, now, row[0]))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def _job(self, row):
+        if row is None: return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def active(self):
+        """The job currently running (or next in line), or None."""
+        with self.lock:
+            row = self.conn.execute("""SELECT * FROM jobs WHERE status IN (?, ?)
+                                       ORDER BY status = 'running' DESC, id LIMIT 1""", ACTIVE).fetchone()
+        return self._job(row)
+
+    def last_finished(self):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT 1").fetchone()
+        return self._job(row)
+
+    def recent(self, limit=10):
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(r) for r in rows]
+
+    def update(self, job_id, progress=None, message=None):
+        """Progress/heartbeat from the running job; raises JobCancelled if a cancel was requested."""
+        with self.lock:
+            self.conn.execute("""UPDATE jobs SET heartbeat = ?, progress = COALESCE(?, progress),
+                                 message = COALESCE(?, message) WHERE id = ?""",
+                              (time.time(), progress, message, job_id))
+            cancelled = self.conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        if cancelled: raise JobCancelled(f"Job {job_id} cancelled")
+
+    def touch(self, job_id):
+        """Heartbeat only; keeps a job that is busy between progress updates from looking dead."""
+        self._write("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, status, message=None, result=None):
+        self._write("""UPDATE jobs SET status = ?, finished_at = ?, heartbeat = ?, message = COALESCE(?, message),
+                       result = ?, progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ?""",
+                    (status, time.time(), time.time(), message, json.dumps(result) if result is not None else None,
+                     status, job_id))
+
+    def release(self, job_id, message=None):
+        """Puts an interrupted job back in the queue (worker shutting down)."""
+        self._write("UPDATE jobs SET status = 'queued', message = ? WHERE id = ? AND status = 'running'",
+                    (message, job_id))
+
+    def cancel(self, job_id):
+        """Queued jobs are dropped at once; running ones stop at their next progress update."""
+        self._write("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                    (time.time(), job_id))
+        self._write("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+
+    def requeue_stale(self, stale_after=STALE_AFTER):
+        """Jobs whose worker stopped heartbeating are resumed (up to MAX_ATTEMPTS runs)."""
+        cutoff = time.time() - stale_after
+        with self.lock:
+            self.conn.execute("""UPDATE jobs SET status = 'failed', finished_at = ?, message = 'worker lost too often'
+                                 WHERE status = 'running' AND heartbeat < ? AND attempts >= ?""",
+                              (time.time(), cutoff, MAX_ATTEMPTS))
+            return self.conn.execute("""UPDATE jobs SET status = 'queued', message = 'resumed after worker loss'
+                                        WHERE status = 'running' AND heartbeat < ?""", (cutoff,)).rowcount
+
+    # --- SCHEDULES ---
+    def schedule(self, name, params, every_s, first_run=None):
+        self._write("INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?)",
+                    (name, _params_key(params), every_s, first_run if first_run is not None else time.time()))
+
+    def unschedule(self, name):
+        return self._write("DELETE FROM schedules WHERE name = ?", (name,)).rowcount
+
+    def schedules(self):
+        with self.lock:
+            return [dict(r, params=json.loads(r['params'])) for r in self.conn.execute("SELECT * FROM schedules ORDER BY name")]
+
+    def enqueue_due(self, now=None):
+        """Enqueues every schedule whose next_run has passed; returns the job ids."""
+        now = now or time.time()
+        with self.lock:
+            due = self.conn.execute("SELECT * FROM schedules WHERE next_run <= ?", (now,)).fetchall()
+        ids = []
+        for s in due:
+            ids.append(self.enqueue(json.loads(s['params']), source=f"schedule:{s['name']}"))
+            # Missed runs (worker was down) collapse into this one
+            next_run = s['next_run'] + s['every_s']
+            if next_run <= now: next_run = now + s['every_s']
+            self._write("UPDATE schedules SET next_run = ? WHERE name = ?", (next_run, s['name']))
+        return ids
+
+    # --- WORKERS ---
+    def worker_heartbeat(self, pid):
+        self._write("INSERT OR REPLACE INTO workers VALUES (?, ?)", (pid, time.time()))
+
+    def worker_exit(self, pid):
+        self._write("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def worker_alive(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM workers WHERE heartbeat > ?", (time.time() - WORKER_ALIVE,)).fetchone() is not None
+
+    def close(self):
+        self.conn.close()
+
+class JobProgress:
+    """
+    Stands in for the Streamlit status placeholder and progress bar that
+    run_osaka_miner reports to, writing both into the job row instead.
+    """
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.last_write = 0.0
+
+    def text(self, message):
+        self.queue.update(self.job_id, message=message)
+
+    info = text
+
+    def progress(self, value):
+        # The miner reports per page and every 0.5s while geocoding
+        now = time.monotonic()
+        if now - self.last_write < PROGRESS_INTERVAL and value < 1: return
+        self.last_write = now
+        self.queue.update(self.job_id, progress=float(value))
+
+def spawn_worker(db_path, log_path, idle_exit=300):
+    """Starts a detached headless worker that exits after `idle_exit` idle seconds."""
+    # The child keeps its own copy of the log descriptor; the dashboard's is closed at once
+    with open(log_path, "a", encoding="utf-8") as log:
+        return subprocess.Popen([sys.executable, WORKER_SCRIPT, "--db", db_path, "run", "--idle-exit", str(idle_exit)],
+                                stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True)
@@ -0,0 +1,137 @@
+import pandas as pd
+import hashlib
+import shutil
+import json
+import time
+import os
+from datetime import datetime
+import storage
+
+# --- JOURNAL CONFIG ---
+JOURNAL_MAX_AGE = 24 * 3600  # Older interrupted crawls are restarted, not resumed
+CHUNK_ROWS = 20_000          # Rows per typed frame when reading the journal back
+
+def crawl_signature(params):
+    """Crawls with the same search parameters share (and resume) one journal."""
+    return hashlib.sha1(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+class CrawlJournal:
+    """
+    Crash-safe record of one crawl, under <root>/<signature>/:
+
+      pages.jsonl      append-only, one fsynced line per parsed page:
+                       {"key": [search, page], "state": ..., "count": ..., "rows": [...]}
+                       Each line is also that page's checkpoint entry.
+      checkpoint.json  run params and start time, written once
+
+    Recording a page costs one append whatever the crawl depth, and its
+    rows leave memory as soon as it is recorded. Opening a journal whose
+    checkpoint is younger than `max_age` resumes it: completed() lists the
+    pages that need no refetch, last_pages() where each search stopped, and
+    a torn last line from a crash is cut off. discard() once the crawl's
+    results are saved.
+    """
+    def __init__(self, root, params, max_age=JOURNAL_MAX_AGE):
+        self.dir = os.path.join(root, crawl_signature(params))
+        self.pages_file = os.path.join(self.dir, "pages.jsonl")
+        self.checkpoint_file = os.path.join(self.dir, "checkpoint.json")
+        self.params = params
+        self.pages = {}  # (search, page) -> {'state', 'count', 'rows'}
+        self.resumed = False
+
+        checkpoint = self._load_checkpoint()
+        if checkpoint and time.time() - checkpoint['created'] < max_age:
+            self.now, self.created = checkpoint['now'], checkpoint['created']
+            self._replay()
+            self.resumed = bool(self.pages)
+        else:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            os.makedirs(self.dir)
+            self.now, self.created = datetime.now().isoformat(timespec='seconds'), time.time()
+            self._write_checkpoint()
+        self.file = open(self.pages_file, "a", encoding="utf-8")
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, encoding="utf-8") as f: checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return checkpoint if checkpoint.get('params') == self.params else None
+
+    def _lines(self):
+        """Yields (end_offset, entry) for every complete line of pages.jsonl."""
+        if not os.path.exists(self.pages_file): return
+        offset = 0
+        with open(self.pages_file, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"): return
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    return
+                offset += len(line)
+                yield offset, entry
+
+    def _replay(self):
+        good = 0
+        for good, entry in self._lines():
+            self.pages[tuple(entry['key'])] = {'state': entry['state'], 'count': entry['count'], 'rows': len(entry['rows'])}
+        if os.path.exists(self.pages_file) and os.path.getsize(self.pages_file) > good:
+            with open(self.pages_file, "r+b") as f: f.truncate(good)
+
+    def _write_checkpoint(self):
+        tmp = self.checkpoint_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'params': self.params, 'now': self.now, 'created': self.created}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_file)
+
+    def record(self, search, page, rows, state, count=None):
+        """Durably appends one parsed page; the appended line is its checkpoint."""
+        entry = {'key': [search, page], 'state': state, 'count': count, 'rows': rows}
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pages[(search, page)] = {'state': state, 'count': count, 'rows': len(rows)}
+
+    def completed(self):
+        return dict(self.pages)
+
+    def last_pages(self):
+        """Per search, the last page of its unbroken run from page 1 (pages finish out of order)."""
+        last = {}
+        for search, page in sorted(self.pages):
+            if page == last.get(search, 0) + 1: last[search] = page
+        return last
+
+    def state(self, search, page):
+        info = self.pages.get((search, page))
+        return info['state'] if info else None
+
+    @property
+    def rows(self):
+        return sum(info['rows'] for info in self.pages.values())
+
+    def frames(self, chunk_rows=CHUNK_ROWS):
+        """
+        Reads the journal back as typed DataFrames of ~`chunk_rows` rows,
+        with `_search`/`_page` columns for restoring the site's order. Only
+        one chunk is ever held as row dicts; the caller decides whether the
+        typed chunks are kept.
+        """
+        chunk = []
+        for _, entry in self._lines():
+            search, page = entry['key']
+            chunk += [dict(r, _search=search, _page=page) for r in entry['rows']]
+            if len(chunk) >= chunk_rows:
+                yield storage.apply_schema(pd.DataFrame(chunk))
+                chunk = []
+        if chunk: yield storage.apply_schema(pd.DataFrame(chunk))
+
+    def close(self):
+        if not self.file.closed: self.file.close()
+
+    def discard(self):
+        self.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,124 @@
+import folium
+from folium.plugins import FastMarkerCluster
+from branca.element import MacroElement
+from jinja2 import Template
+import numpy as np
+
+# --- MAP CONFIG ---
+GRID_THRESHOLD = 2000  # Above this many points, low zooms show grid cells
+GRID_DEG = 0.01        # Cell size (~1km at Osaka's latitude)
+DETAIL_ZOOM = 14       # Individual markers from this zoom level on
+STATUS_COLORS = {"Undervalued": "green", "Overpriced": "red"}
+
+# Runs in the browser once per point. The popup is a function, so its HTML
+# is only built when a marker is actually clicked.
+MARKER_CALLBACK = """
+function (row) {
+    function esc(s) { return String(s).replace(/[&<>"']/g, function (c) { return '&#' + c.charCodeAt(0) + ';'; }); }
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: row[2], fill: true, fillColor: row[2], fillOpacity: 0.8
+    });
+    marker.bindTooltip(esc(row[3]) + ' | ¥' + row[4].toLocaleString() + ' | ' + row[5]);
+    marker.bindPopup(function () {
+        return '<div style="font-family:sans-serif; width:220px; color: black;">' +
+            '<b>' + esc(row[3]) + '</b><br>' +
+            'Rent: ¥' + row[4].toLocaleString() + '<br>' +
+            "Status: <span style='color:" + row[2] + "; font-weight:bold;'>" + row[5] + '</span><br>' +
+            'Size: ' + row[6] + ' m²<br>' +
+            '<a href="' + esc(row[7]) + '" target="_blank">View Listing</a></div>';
+    });
+    return marker;
+}
+"""
+
+class ZoomSwitch(MacroElement):
+    """Shows `coarse` below `zoom` and `detail` from `zoom` on."""
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var map = {{ this._parent.get_name() }};
+            var coarse = {{ this.coarse.get_name() }}, detail = {{ this.detail.get_name() }};
+            function sync() {
+                var zoomedIn = map.getZoom() >= {{ this.zoom }};
+                var show = zoomedIn ? detail : coarse, hide = zoomedIn ? coarse : detail;
+                if (map.hasLayer(hide)) map.removeLayer(hide);
+                if (!map.hasLayer(show)) map.addLayer(show);
+            }
+            map.on('zoomend', sync);
+            sync();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, coarse, detail, zoom):
+        super().__init__()
+        self._name = "ZoomSwitch"
+        self.coarse, self.detail, self.zoom = coarse, detail, zoom
+
+def marker_payload(map_data):
+    """One row per listing for MARKER_CALLBACK, built column-wise (no iterrows)."""
+    if 'status' in map_data.columns: status_list = map_data['status'].fillna('N/A').astype(str).tolist()
+    else: status_list = ['N/A'] * len(map_data)
+    colors = [STATUS_COLORS.get(s, "gray") for s in status_list]
+    return list(map(list, zip(
+        map_data['lat'].astype(float).round(6).tolist(),
+        map_data['lon'].astype(float).round(6).tolist(),
+        colors,
+        map_data['name'].astype(str).tolist(),
+        map_data['total_rent'].astype(int).tolist(),
+        status_list,
+        map_data['size_m2'].astype(float).round(2).tolist(),
+        map_data['link'].astype(str).tolist(),
+    )))
+
+def grid_cells(map_data, cell_deg=GRID_DEG):
+    """Server-side aggregation: one GeoJSON point per occupied grid cell."""
+    lat = map_data['lat'].to_numpy(dtype='float64')
+    lon = map_data['lon'].to_numpy(dtype='float64')
+    cells = map_data.assign(
+        _row=np.floor(lat / cell_deg).astype(np.int64), _col=np.floor(lon / cell_deg).astype(np.int64),
+        _lat=lat, _lon=lon,
+        _deal=(map_data['status'] == "Undervalued") if 'status' in map_data.columns else False,
+    ).groupby(['_row', '_col']).agg(
+        count=('_lat', 'size'), lat=('_lat', 'mean'), lon=('_lon', 'mean'),
+        median_rent=('total_rent', 'median'), deals=('_deal', 'sum'),
+    )
+    top = max(int(cells['count'].max()), 1)
+    features = [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [round(c_lon, 6), round(c_lat, 6)]},
+        "properties": {
+            "count": int(count), "median_rent": f"¥{int(rent):,}", "deals": int(deals),
+            "radius": round(4 + 16 * (count / top) ** 0.5, 1),
+            "color": "green" if deals * 3 >= count else "#66b3ff",
+        },
+    } for count, c_lat, c_lon, rent, deals in zip(cells['count'], cells['lat'], cells['lon'], cells['median_rent'], cells['deals'])]
+    return {"type": "FeatureCollection", "features": features}
+
+def build_map(map_data, grid_threshold=GRID_THRESHOLD):
+    """
+    Full Map tab. All markers go out as a single FastMarkerCluster payload
+    with lazy popups; large selections additionally get a grid-aggregated
+    layer that replaces the markers below DETAIL_ZOOM.
+    """
+    center = [float(map_data['lat'].mean()), float(map_data['lon'].mean())]
+    m = folium.Map(location=center, zoom_start=12, tiles="CartoDB dark_matter")
+    points = FastMarkerCluster(marker_payload(map_data), callback=MARKER_CALLBACK)
+
+    if len(map_data) <= grid_threshold:
+        points.add_to(m)
+        return m
+
+    grid = folium.GeoJson(
+        grid_cells(map_data),
+        name="Grid",
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.6, weight=1),
+        style_function=lambda f: {"radius": f["properties"]["radius"], "color": f["properties"]["color"],
+                                  "fillColor": f["properties"]["color"]},
+        tooltip=folium.GeoJsonTooltip(fields=["count", "median_rent", "deals"],
+                                      aliases=["Listings", "Median rent", "Undervalued"]),
+    )
+    grid.add_to(m)
+    points.add_to(m)
+    ZoomSwitch(grid, points, DETAIL_ZOOM).add_to(m)
+    return m
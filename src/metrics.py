@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from collections import defaultdict
+import threading
+import bisect
+import json
+import time
+import os
+
+# --- METRICS CONFIG ---
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound below which a `q` share of observations fall."""
+        if not self.count: return 0.0
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target: return bound
+        return float("inf")
+
+class Metrics:
+    """
+    Thread-safe registry for one miner run or one dashboard process:
+    labelled counters, phase timers and latency histograms. Exports as a
+    Prometheus text file and as a JSON run report.
+    """
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.phases = defaultdict(lambda: [0.0, 0])  # name -> [seconds, calls]
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, labels=None, n=1):
+        with self.lock: self.counters[_key(name, labels)] += n
+
+    def observe(self, name, value, labels=None):
+        with self.lock:
+            key = _key(name, labels)
+            if key not in self.histograms: self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            self.phases[name][0] += seconds
+            self.phases[name][1] += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Picklable raw state, for folding a worker process's metrics into the parent's."""
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'phases': {k: list(v) for k, v in self.phases.items()},
+                'histograms': {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in self.histograms.items()},
+            }
+
+    def merge(self, snap):
+        with self.lock:
+            for key, value in snap['counters'].items(): self.counters[key] += value
+            for name, (seconds, calls) in snap['phases'].items():
+                self.phases[name][0] += seconds
+                self.phases[name][1] += calls
+            for key, (buckets, counts, total, count) in snap['histograms'].items():
+                h = self.histograms.setdefault(key, Histogram(buckets))
+                h.counts = [a + b for a, b in zip(h.counts, counts)]
+                h.sum += total
+                h.count += count
+
+    def count(self, name, **labels):
+        with self.lock:
+            return sum(v for (n, l), v in self.counters.items() if n == name and all(dict(l).get(k) == v2 for k, v2 in labels.items()))
+
+    def phase_seconds(self, name):
+        with self.lock: return self.phases[name][0] if name in self.phases else 0.0
+
+    def to_prometheus(self):
+        ns = self.namespace
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{ns}_{name}_total{_fmt_labels(labels)} {value:g}")
+            for name, (seconds, calls) in sorted(self.phases.items()):
+                lines.append(f'{ns}_phase_seconds_total{{phase="{name}"}} {seconds:.6f}')
+                lines.append(f'{ns}_phase_calls_total{{phase="{name}"}} {calls}')
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{ns}_{name}_bucket{_fmt_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{ns}_{name}_sum{_fmt_labels(labels)} {h.sum:.6f}")
+                lines.append(f"{ns}_{name}_count{_fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'namespace': self.namespace,
+                'started': self.started,
+                'duration_s': time.time() - self.started,
+                'phases': {name: {'seconds': s, 'calls': c} for name, (s, c) in self.phases.items()},
+                'counters': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self.counters.items())],
+                'histograms': [{
+                    'name': n, 'labels': dict(l), 'count': h.count, 'sum': h.sum,
+                    'p50': h.quantile(0.5), 'p90': h.quantile(0.9), 'p99': h.quantile(0.99),
+                } for (n, l), h in sorted(self.histograms.items())],
+            }
+
+    def write(self, directory, summary=None):
+        """Writes <namespace>.prom and <namespace>_report.json (atomically)."""
+        os.makedirs(directory, exist_ok=True)
+        report = self.to_dict()
+        if summary: report['summary'] = summary
+        for name, text in ((f"{self.namespace}.prom", self.to_prometheus()),
+                           (f"{self.namespace}_report.json", json.dumps(report, indent=2, ensure_ascii=False))):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", "w", encoding="utf-8") as f: f.write(text)
+            os.replace(path + ".tmp", path)
+        return report
+
+class NullMetrics(Metrics):
+    """Default sink when a caller does not collect metrics."""
+    def __init__(self):
+        super().__init__("null")
+
+    def inc(self, name, labels=None, n=1): pass
+    def observe(self, name, value, labels=None): pass
+    def add_time(self, name, seconds): pass
+    def merge(self, snap): pass
+
+NULL_METRICS = NullMetrics()
+
+def load_report(directory, namespace):
+    path = os.path.join(directory, f"{namespace}_report.json")
+    if not os.path.exists(path): return None
+    with open(path, encoding="utf-8") as f: return json.load(f)
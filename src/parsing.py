@@ -0,0 +1,247 @@
+from bs4 import BeautifulSoup
+from collections import Counter
+import hashlib
+import re
+import time
+import unicodedata
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, BeautifulSoup is the fallback engine
+    etree = None
+
+# --- PARSER CONFIG ---
+ENGINE = "lxml" if etree is not None else "bs4"
+
+NUM_RE = re.compile(r'(\d+)')
+DECIMAL_RE = re.compile(r'(\d+\.?\d*)')
+PAGINATION_RE = re.compile(r'class="pagination-parts"(.*?)</ol>', re.S)
+PAGE_LINK_RE = re.compile(r'>\s*(\d+)\s*<')
+
+# Columns that come from the listing page; `link` is the primary key
+SCRAPED_FIELDS = ['name', 'address', 'age', 'floor', 'layout', 'size_m2',
+                  'total_rent', 'key_money', 'deposit', 'image_url']
+
+def normalize_japanese(text):
+    if not text: return ""
+    return unicodedata.normalize('NFKC', text).strip()
+
+def clean_money(text):
+    text = normalize_japanese(text)
+    if text == '-' or text == '': return 0
+    try:
+        match = DECIMAL_RE.search(text)
+        if match:
+            val = float(match.group(1))
+            if '万' in text: return int(val * 10000)
+            return int(val)
+    except:
+        return 0
+    return 0
+
+def parse_age(age_text):
+    if '新築' in age_text: return 0
+    age_match = NUM_RE.search(age_text)
+    return int(age_match.group(1)) if age_match else 0
+
+def parse_floor(floor_text):
+    floor_match = NUM_RE.search(floor_text)
+    return int(floor_match.group(1)) if floor_match else 1
+
+def _failed(failures, field):
+    # Dropped building/unit, tallied by the field that broke it
+    if failures is not None: failures[field] += 1
+
+def row_hash(row):
+    raw = "|".join(str(row[c]) for c in SCRAPED_FIELDS)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+def page_is_known(rows, known_hashes):
+    return bool(rows) and all(known_hashes.get(r['link']) == r['row_hash'] for r in rows)
+
+def page_state(rows, known_hashes=None):
+    """'empty' (past the last result page), 'known' (incremental catch-up point) or 'new'."""
+    if not rows: return 'empty'
+    if known_hashes and page_is_known(rows, known_hashes): return 'known'
+    return 'new'
+
+def parse_page_count(html):
+    """Last page number from the result pager, or None if the page has none."""
+    match = PAGINATION_RE.search(html or "")
+    if not match: return None
+    numbers = [int(n) for n in PAGE_LINK_RE.findall(match.group(1))]
+    return max(numbers) if numbers else None
+
+def make_row(name, address, age, img_url, floor, rent, admin, key_money, deposit, size, layout, link):
+    return {
+        'name': name, 'address': address, 'age': age, 'floor': floor,
+        'layout': layout, 'size_m2': size, 'total_rent': rent + admin,
+        'key_money': key_money, 'deposit': deposit, 'image_url': img_url, 'link': link
+    }
+
+# --- REFERENCE ENGINE (BeautifulSoup) ---
+def parse_page_bs4(html, failures=None):
+    rows = []
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for item in soup.find_all('div', class_='cassetteitem'):
+        field = 'name'
+        try:
+            name = normalize_japanese(item.find('div', class_='cassetteitem_content-title').text)
+            field = 'address'
+            address = normalize_japanese(item.find('li', class_='cassetteitem_detail-col1').text)
+            field = 'age'
+            age = parse_age(normalize_japanese(item.find('li', class_='cassetteitem_detail-col3').text))
+        except Exception:
+            _failed(failures, field)
+            continue
+
+        tbody = item.find('table', class_='cassetteitem_other')
+        if not tbody:
+            _failed(failures, 'table')
+            continue
+
+        for row in tbody.find_all('tr'):
+            tds = row.find_all('td')
+            if len(tds) < 9: continue
+
+            field = 'image'
+            try:
+                img_tag = tds[1].find('img')
+                img_url = img_tag.get('rel') if img_tag and img_tag.get('rel') else (img_tag.get('src') if img_tag else "")
+
+                field = 'floor'
+                floor = parse_floor(normalize_japanese(tds[2].text))
+
+                field = 'rent'
+                rent = clean_money(tds[3].find('span', class_='cassetteitem_price--rent').text)
+                admin = clean_money(tds[3].find('span', class_='cassetteitem_price--administration').text)
+
+                field = 'deposit'
+                key_money = clean_money(tds[4].find('span', class_='cassetteitem_price--gratuity').text)
+                deposit = clean_money(tds[4].find('span', class_='cassetteitem_price--deposit').text)
+
+                field = 'size'
+                size_raw = normalize_japanese(tds[5].find('span', class_='cassetteitem_menseki').text)
+                size = float(DECIMAL_RE.search(size_raw).group(1))
+                field = 'layout'
+                layout = normalize_japanese(tds[5].find('span', class_='cassetteitem_madori').text)
+
+                field = 'link'
+                link = "https://suumo.jp" + tds[8].find('a')['href']
+
+                rows.append(make_row(name, address, age, img_url, floor, rent, admin, key_money, deposit, size, layout, link))
+            except Exception:
+                _failed(failures, field)
+
+    return rows
+
+# --- FAST ENGINE (lxml, precompiled XPath) ---
+def _has_class(name):
+    # Same token match as BeautifulSoup's class_= lookup
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+if etree is not None:
+    HTML_PARSER = etree.HTMLParser(encoding='utf-8')
+    X_ITEMS = etree.XPath(f"//div[{_has_class('cassetteitem')}]")
+    X_TITLE = etree.XPath(f".//div[{_has_class('cassetteitem_content-title')}]")
+    X_ADDRESS = etree.XPath(f".//li[{_has_class('cassetteitem_detail-col1')}]")
+    X_AGE = etree.XPath(f".//li[{_has_class('cassetteitem_detail-col3')}]")
+    X_TABLE = etree.XPath(f".//table[{_has_class('cassetteitem_other')}]")
+    X_ROWS = etree.XPath(".//tr")
+    X_CELLS = etree.XPath(".//td")
+    X_IMG = etree.XPath(".//img")
+    X_RENT = etree.XPath(f".//span[{_has_class('cassetteitem_price--rent')}]")
+    X_ADMIN = etree.XPath(f".//span[{_has_class('cassetteitem_price--administration')}]")
+    X_GRATUITY = etree.XPath(f".//span[{_has_class('cassetteitem_price--gratuity')}]")
+    X_DEPOSIT = etree.XPath(f".//span[{_has_class('cassetteitem_price--deposit')}]")
+    X_SIZE = etree.XPath(f".//span[{_has_class('cassetteitem_menseki')}]")
+    X_LAYOUT = etree.XPath(f".//span[{_has_class('cassetteitem_madori')}]")
+    X_LINK = etree.XPath(".//a")
+
+def _text(el):
+    # Equivalent of bs4's Tag.text once script/style have been stripped
+    return "".join(el.itertext())
+
+def _first_text(xpath, el):
+    return _text(xpath(el)[0])
+
+def parse_page_lxml(html, failures=None):
+    rows = []
+    if not html: return rows
+    root = etree.fromstring(html.encode('utf-8'), HTML_PARSER)
+    if root is None: return rows
+    # bs4's .text skips script/style contents (tails are kept)
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+
+    for item in X_ITEMS(root):
+        field = 'name'
+        try:
+            name = normalize_japanese(_first_text(X_TITLE, item))
+            field = 'address'
+            address = normalize_japanese(_first_text(X_ADDRESS, item))
+            field = 'age'
+            age = parse_age(normalize_japanese(_first_text(X_AGE, item)))
+        except Exception:
+            _failed(failures, field)
+            continue
+
+        tables = X_TABLE(item)
+        if not tables:
+            _failed(failures, 'table')
+            continue
+
+        for row in X_ROWS(tables[0]):
+            tds = X_CELLS(row)
+            if len(tds) < 9: continue
+
+            field = 'image'
+            try:
+                imgs = X_IMG(tds[1])
+                img_tag = imgs[0] if imgs else None
+                img_url = img_tag.get('rel') if img_tag is not None and img_tag.get('rel') else (img_tag.get('src') if img_tag is not None else "")
+
+                field = 'floor'
+                floor = parse_floor(normalize_japanese(_text(tds[2])))
+
+                field = 'rent'
+                rent = clean_money(_first_text(X_RENT, tds[3]))
+                admin = clean_money(_first_text(X_ADMIN, tds[3]))
+
+                field = 'deposit'
+                key_money = clean_money(_first_text(X_GRATUITY, tds[4]))
+                deposit = clean_money(_first_text(X_DEPOSIT, tds[4]))
+
+                field = 'size'
+                size_raw = normalize_japanese(_first_text(X_SIZE, tds[5]))
+                size = float(DECIMAL_RE.search(size_raw).group(1))
+                field = 'layout'
+                layout = normalize_japanese(_first_text(X_LAYOUT, tds[5]))
+
+                field = 'link'
+                link = "https://suumo.jp" + X_LINK(tds[8])[0].attrib['href']
+
+                rows.append(make_row(name, address, age, img_url, floor, rent, admin, key_money, deposit, size, layout, link))
+            except Exception:
+                _failed(failures, field)
+
+    return rows
+
+ENGINES = {"bs4": parse_page_bs4, "lxml": parse_page_lxml}
+
+def parse_page(html, engine=None, failures=None):
+    """
+    Extracts one row per unit from a SUUMO result page (cassetteitem layout).
+    Buildings/units that fail to parse are skipped; pass a Counter as
+    `failures` to tally them by the field that broke.
+    """
+    engine = engine or ENGINE
+    if engine == "lxml" and etree is None: engine = "bs4"
+    return ENGINES[engine](html, failures)
+
+def parse_page_counted(html):
+    """Worker entry point: (rows, failures by field, parse seconds), all picklable."""
+    start = time.perf_counter()
+    failures = Counter()
+    rows = parse_page(html, failures=failures)
+    return rows, dict(failures), time.perf_counter() - start
@@ -0,0 +1,158 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import threading
+import queue
+import time
+import os
+from collections import Counter
+from parsing import parse_page_counted
+from geocache import normalize_address, geocode_query
+from metrics import NULL_METRICS
+
+# --- PIPELINE CONFIG ---
+PARSE_WORKERS = min(4, os.cpu_count() or 1)  # Processes, parsing is CPU bound (GIL)
+
+def process_pool(workers, **kwargs):
+    """
+    ProcessPoolExecutor for parse and crawl workers. Always spawn: forking a
+    process that runs Streamlit/HTTP threads is unsafe.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), **kwargs)
+
+def record_parse(metrics, result):
+    """Books a parse_page_counted() result into `metrics`; returns the rows."""
+    rows, failures, seconds = result
+    metrics.add_time('parse', seconds)
+    metrics.inc('pages_parsed')
+    metrics.inc('rows_parsed', n=len(rows))
+    for field, n in failures.items(): metrics.inc('parse_failures', {'field': field}, n)
+    return rows
+
+class ParseStage:
+    """
+    Parser worker pool. Fetched pages stream in, parsed rows stream out as
+    soon as each page is done, so parsing overlaps with the fetches still
+    in flight. workers <= 1 parses inline in the calling thread.
+    Parse time, rows and per-field parse failures go to `metrics`.
+    """
+    def __init__(self, workers=PARSE_WORKERS, metrics=NULL_METRICS):
+        self.metrics = metrics
+        self.pool = None
+        if workers > 1:
+            self.pool = process_pool(workers)
+
+    def stream(self, fetched, offset=0, page_numbers=None):
+        """
+        Consumes (i, url, html) from fetch_pages, yields (page, rows); rows is
+        None on failure. Page numbers are offset + i + 1, or page_numbers[i].
+        """
+        pending = {}
+        for i, url, html in fetched:
+            page = page_numbers[i] if page_numbers else offset + i + 1
+            if html is None:
+                print(f"Error page {page}: gave up after retries")
+                yield page, None
+                continue
+            if self.pool is None:
+                yield page, self._parse(page, html)
+                continue
+
+            pending[self.pool.submit(parse_page_counted, html)] = page
+            for future in [f for f in pending if f.done()]:
+                yield pending.pop(future), self._result(future)
+
+        for future in as_completed(list(pending)):
+            yield pending.pop(future), self._result(future)
+
+    def _parse(self, page, html):
+        try:
+            return record_parse(self.metrics, parse_page_counted(html))
+        except Exception as e:
+            self.metrics.inc('pages_failed', {'stage': 'parse'})
+            print(f"Error page {page}: {e}")
+            return None
+
+    def _result(self, future):
+        try:
+            return record_parse(self.metrics, future.result())
+        except Exception as e:
+            self.metrics.inc('pages_failed', {'stage': 'parse'})
+            print(f"Error parsing page: {e}")
+            return None
+
+    def close(self):
+        if self.pool is not None: self.pool.shutdown(wait=True, cancel_futures=True)
+
+class GeocodeStage(threading.Thread):
+    """
+    Background geocoder. Addresses are queued the moment the parser first
+    sees them, so the rate-limited lookups run while pages are still being
+    fetched instead of after the whole crawl. Addresses that share a
+    chome-level cache key are looked up once; hits and still-fresh failures
+    in the GeocodeCache never reach the queue, and the offline gazetteer
+    (when given) resolves inline so only its misses go to Nominatim.
+    `resolved` counts new resolutions per tier and `metrics` gets every
+    lookup outcome. Only the calling thread touches Streamlit; this thread
+    just updates the counters.
+    """
+    def __init__(self, cache, geocode, gazetteer=None, metrics=NULL_METRICS):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.cache = cache
+        self.geocode = geocode
+        self.gazetteer = gazetteer
+        self.queue = queue.Queue()
+        self.seen = set()
+        self.total = 0
+        self.done = 0
+        self.new_entries = 0
+        self.resolved = Counter()
+
+    def submit(self, addr):
+        key = normalize_address(addr)
+        if key in self.seen: return
+        self.seen.add(key)
+        if self.cache.is_known(key):
+            self.metrics.inc('geocode_lookups', {'tier': 'cache', 'result': 'hit'})
+            return
+        self.metrics.inc('geocode_lookups', {'tier': 'cache', 'result': 'miss'})
+
+        # Tier 1: in-memory gazetteer, microseconds, no rate limit
+        hit = self.gazetteer.lookup(key) if self.gazetteer else None
+        if hit:
+            self.cache.put(key, hit[0], hit[1], 'gazetteer')
+            self.resolved['gazetteer'] += 1
+            self.metrics.inc('geocode_lookups', {'tier': 'gazetteer', 'result': 'hit'})
+            return
+        if self.gazetteer: self.metrics.inc('geocode_lookups', {'tier': 'gazetteer', 'result': 'miss'})
+
+        # Tier 2: Nominatim, rate limited, on the background thread
+        self.total += 1
+        self.queue.put(key)
+
+    def run(self):
+        while True:
+            key = self.queue.get()
+            if key is None: break
+            start = time.perf_counter()
+            try:
+                loc = self.geocode(geocode_query(key))
+                if loc:
+                    self.cache.put(key, loc.latitude, loc.longitude, 'nominatim')
+                    self.new_entries += 1
+                    self.resolved['nominatim'] += 1
+                    result = 'hit'
+                else:
+                    self.cache.put_failure(key, 'nominatim')
+                    result = 'miss'
+            except Exception as e:
+                # Network errors are not cached, only definite "not found"
+                print(f"Geocode error {key}: {e}")
+                result = 'error'
+            self.metrics.observe('geocode_seconds', time.perf_counter() - start)
+            self.metrics.inc('geocode_lookups', {'tier': 'nominatim', 'result': result})
+            self.done += 1
+
+    def finish(self):
+        """No more addresses are coming; the thread exits once the queue drains."""
+        self.queue.put(None)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# --- QUERY CONFIG ---
+RANGE_COLUMNS = ['total_rent', 'size_m2', 'age', 'floor']
+
+# Sort options of the list view: column, ascending
+SORTS = {
+    'residual': ('residual', True),
+    'cheapest': ('total_rent', True),
+    'largest': ('size_m2', False),
+}
+
+def _argsort(values, ascending):
+    # Stable, NaN last in both directions (same as sort_values)
+    return np.argsort(values if ascending else -values, kind='stable')
+
+class ListingIndex:
+    """
+    Read-only query layer over one dataset version, built once and cached.
+
+    Numeric filters resolve through a pre-sorted order per column
+    (searchsorted -> slice -> bitmap), layouts and the zero key money flag
+    are precomputed bitmaps, and a filter combination is the AND of those.
+    The list view pages through cached sort orders instead of re-sorting
+    the filtered frame on every rerun.
+    """
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.n = len(self.df)
+
+        self.sorted_order, self.sorted_values = {}, {}
+        for col in RANGE_COLUMNS:
+            values = self.df[col].to_numpy(dtype='float64', na_value=np.nan)
+            order = _argsort(values, True)
+            self.sorted_order[col], self.sorted_values[col] = order, values[order]
+
+        layouts = pd.Categorical(self.df['layout'])
+        codes = layouts.codes
+        self.layout_bits = {str(layout): codes == code for code, layout in enumerate(layouts.categories)}
+        self.zero_key_bits = ((self.df['key_money'] == 0) & (self.df['deposit'] == 0)).to_numpy()
+
+        self.sort_orders = {}
+        for key, (col, ascending) in SORTS.items():
+            if col in self.df.columns:
+                self.sort_orders[key] = _argsort(self.df[col].to_numpy(dtype='float64', na_value=np.nan), ascending)
+
+    def range_bits(self, col, lo=-np.inf, hi=np.inf):
+        """Bitmap of rows with lo <= col <= hi (NaN never matches)."""
+        values = self.sorted_values[col]
+        start, stop = np.searchsorted(values, lo, 'left'), np.searchsorted(values, hi, 'right')
+        bits = np.zeros(self.n, dtype=bool)
+        bits[self.sorted_order[col][start:stop]] = True
+        return bits
+
+    def layouts_bits(self, layouts):
+        bits = np.zeros(self.n, dtype=bool)
+        for layout in layouts:
+            if layout in self.layout_bits: bits |= self.layout_bits[layout]
+        return bits
+
+    def query(self, rent_range, size_range, max_age, min_floor, layouts, zero_key=False):
+        mask = self.range_bits('total_rent', *rent_range)
+        mask &= self.range_bits('size_m2', *size_range)
+        mask &= self.range_bits('age', hi=max_age)
+        mask &= self.range_bits('floor', lo=min_floor)
+        mask &= self.layouts_bits(layouts)
+        if zero_key: mask &= self.zero_key_bits
+        return QueryResult(self, mask)
+
+class QueryResult:
+    def __init__(self, index, mask):
+        self.index = index
+        self.mask = mask
+        self.count = int(mask.sum())
+
+    def __len__(self):
+        return self.count
+
+    def frame(self):
+        """Full filtered frame (map / export); the list view should use page()."""
+        return self.index.df[self.mask]
+
+    def page(self, sort_key, page, items):
+        """Rows [page*items, (page+1)*items) of the filtered set in `sort_key` order."""
+        order = self.index.sort_orders.get(sort_key)
+        if order is None: order = np.arange(self.index.n)
+        stop = (page + 1) * items
+        # Walk the cached order only as far as this page needs
+        picked, step = [], max(stop * 4, 4096)
+        for chunk in range(0, self.index.n, step):
+            block = order[chunk:chunk + step]
+            picked.extend(block[self.mask[block]])
+            if len(picked) >= stop: break
+        return self.index.df.iloc[picked[page * items:stop]]
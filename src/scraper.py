@@ -1,13 +1,23 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
 import random
-import re
-import unicodedata
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
 import os
+import time
+from parsing import row_hash, page_state
+from fetcher import fetch_pages, make_session, RateBudget, MAX_WORKERS, REQUESTS_PER_SECOND
+from pipeline import ParseStage, GeocodeStage, PARSE_WORKERS
+from shards import crawl_shards, SHARD_WORKERS
+from areas import SEARCH_URL
+from geocache import GeocodeCache
+from gazetteer import load_gazetteer
+from thumbnails import ThumbnailCache
+from metrics import Metrics
+from journal import CrawlJournal
+from history import ListingHistory
+from archive import ResponseArchive, replay_rows
+from dedup import mark_duplicates
+import storage
 
 # --- PATH CONFIGURATION (FIXED) ---
 # 1. Get the absolute path of this script (src/scraper.py)
@@ -17,159 +27,327 @@ PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 # 3. Define the Data Directory inside the project (OsakaRent/data)
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 
-OUTPUT_FILE = os.path.join(DATA_DIR, "osaka_listings.csv")
-CACHE_FILE = os.path.join(DATA_DIR, "address_cache.csv")
-
-# Make sure the directory exists
-os.makedirs(DATA_DIR, exist_ok=True)
+OUTPUT_FILE = os.path.join(DATA_DIR, "osaka_listings.csv")  # Legacy CSV, imported into LISTINGS_FILE once
+LISTINGS_FILE = storage.store_path(DATA_DIR)
+CACHE_FILE = os.path.join(DATA_DIR, "address_cache.csv")  # Legacy, imported into GEOCODE_DB once
+GEOCODE_DB = os.path.join(DATA_DIR, "geocode_cache.sqlite")
+# Optional town/chome centroid CSV (address,lat,lon or MLIT 位置参照情報 format)
+GAZETTEER_FILE = os.path.join(DATA_DIR, "gazetteer.csv")
+THUMB_DIR = os.path.join(DATA_DIR, "thumbs")
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")  # miner.prom + miner_report.json of the last run
+JOURNAL_DIR = os.path.join(DATA_DIR, "journal")  # Pages of unfinished crawls, for resume
+HISTORY_DB = os.path.join(DATA_DIR, "history.sqlite")  # One snapshot (as deltas) per crawl
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")  # Raw result pages, for replay_archive()
 
 # --- SCRAPER CONFIG ---
-BASE_URL = "https://suumo.jp/jj/chintai/ichiran/FR301FC001/?ar=060&bs=040&ta=27&sc=27128&sc=27102&cb=0.0&ct=9999999&et=9999999&cn=9999999&mb=0&mt=9999999&shkr1=03&shkr2=03&shkr3=03&shkr4=03&fw2=&srch_navi=1"
+BASE_URL = SEARCH_URL.format(areas="ta=27&sc=27128&sc=27102")  # Single search used when no areas are given
+NEWEST_FIRST = "&po1=09"  # SUUMO sort: 新着順, needed for incremental early stop
 
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
-]
+# --- SMART GEOCODING CACHE ---
+def load_cache():
+    return GeocodeCache(GEOCODE_DB, legacy_csv=CACHE_FILE)
 
-def get_header():
-    return {"User-Agent": random.choice(USER_AGENTS), "Referer": "https://suumo.jp/"}
+# --- INCREMENTAL STORE ---
+def load_listings():
+    if not os.path.exists(LISTINGS_FILE) and os.path.exists(OUTPUT_FILE) and LISTINGS_FILE != OUTPUT_FILE:
+        storage.import_csv(OUTPUT_FILE, LISTINGS_FILE)
+    df = storage.load_listings(LISTINGS_FILE)
+    if 'row_hash' not in df.columns: return pd.DataFrame()  # pre-incremental file: full rebuild
+    return df.drop_duplicates('link', keep='last')
 
-def normalize_japanese(text):
-    if not text: return ""
-    return unicodedata.normalize('NFKC', text).strip()
+def merge_listings(existing, fresh, now, reached_end):
+    """
+    Upserts `fresh` into `existing` keyed by link. Seen rows keep their
+    `first_seen` and take the fresh fields and `last_seen`.
+    Listings we did not see are marked gone only when the crawl reached the
+    end of the result set - an early stop says nothing about older pages.
+    Sharded crawls pass the set of areas they walked to the end instead;
+    only listings of those areas can be gone.
+    """
+    if existing.empty: return fresh
 
-def clean_money(text):
-    text = normalize_japanese(text)
-    if text == '-' or text == '': return 0
-    try:
-        match = re.search(r'(\d+\.?\d*)', text)
-        if match:
-            val = float(match.group(1))
-            if '万' in text: return int(val * 10000)
-            return int(val)
-    except:
-        return 0
-    return 0
+    old = existing.set_index('link')
+    new = fresh.set_index('link')
 
-# --- SMART GEOCODING CACHE ---
-def load_cache():
-    if os.path.exists(CACHE_FILE):
-        return pd.read_csv(CACHE_FILE, index_col=0).to_dict(orient='index')
-    return {}
-
-def save_cache(cache_dict):
-    df = pd.DataFrame.from_dict(cache_dict, orient='index')
-    df.to_csv(CACHE_FILE)
-
-def run_osaka_miner(max_pages=5, status_placeholder=None, progress_bar=None):
-    # 1. SCRAPING PHASE
-    data = []
-    if status_placeholder: status_placeholder.info(f"⛏️  Initializing Deep Scrape ({max_pages} Pages)...")
-    
-    for page in range(1, max_pages + 1):
-        url = f"{BASE_URL}&page={page}"
-        
-        # UI Feedback
-        if status_placeholder: status_placeholder.text(f"Scanning Page {page}/{max_pages}...")
-        if progress_bar: progress_bar.progress((page / max_pages) * 0.4) 
-        
-        try:
-            time.sleep(random.uniform(2, 5))
-            res = requests.get(url, headers=get_header(), timeout=20)
-            res.encoding = res.apparent_encoding
-            
-            if res.status_code != 200:
-                time.sleep(10)
-                continue
-
-            soup = BeautifulSoup(res.text, 'html.parser')
-            items = soup.find_all('div', class_='cassetteitem')
-
-            for item in items:
-                try:
-                    name = normalize_japanese(item.find('div', class_='cassetteitem_content-title').text)
-                    address = normalize_japanese(item.find('li', class_='cassetteitem_detail-col1').text)
-                    age_text = normalize_japanese(item.find('li', class_='cassetteitem_detail-col3').text)
-                    age = 0
-                    if '新築' not in age_text:
-                        age_match = re.search(r'(\d+)', age_text)
-                        age = int(age_match.group(1)) if age_match else 0
-                except: continue
-
-                tbody = item.find('table', class_='cassetteitem_other')
-                if not tbody: continue
-                
-                for row in tbody.find_all('tr'):
-                    tds = row.find_all('td')
-                    if len(tds) < 9: continue
-                    
-                    try:
-                        img_tag = tds[1].find('img')
-                        img_url = img_tag.get('rel') if img_tag and img_tag.get('rel') else (img_tag.get('src') if img_tag else "")
-                        
-                        floor_text = normalize_japanese(tds[2].text)
-                        floor = int(re.search(r'(\d+)', floor_text).group(1)) if re.search(r'(\d+)', floor_text) else 1
-                        
-                        rent = clean_money(tds[3].find('span', class_='cassetteitem_price--rent').text)
-                        admin = clean_money(tds[3].find('span', class_='cassetteitem_price--administration').text)
-                        
-                        key_money = clean_money(tds[4].find('span', class_='cassetteitem_price--gratuity').text)
-                        deposit = clean_money(tds[4].find('span', class_='cassetteitem_price--deposit').text)
-                        
-                        size_raw = normalize_japanese(tds[5].find('span', class_='cassetteitem_menseki').text)
-                        size = float(re.search(r'(\d+\.?\d*)', size_raw).group(1))
-                        layout = normalize_japanese(tds[5].find('span', class_='cassetteitem_madori').text)
-                        
-                        link = "https://suumo.jp" + tds[8].find('a')['href']
-
-                        data.append({
-                            'name': name, 'address': address, 'age': age, 'floor': floor,
-                            'layout': layout, 'size_m2': size, 'total_rent': rent + admin,
-                            'key_money': key_money, 'deposit': deposit, 'image_url': img_url, 'link': link
-                        })
-                    except: continue
-
-        except Exception as e:
-            print(f"Error page {page}: {e}")
-
-    # 2. GEOCODING PHASE
-    df = pd.DataFrame(data)
-    if df.empty: return df
-
-    df.to_csv(OUTPUT_FILE, index=False)
-    
-    unique_addresses = df['address'].unique()
-    cache = load_cache()
-    
+    seen = old.index.intersection(new.index)
+    new.loc[seen, 'first_seen'] = old.loc[seen, 'first_seen']
+
+    rest = old.drop(index=seen)
+    if reached_end:
+        active = rest['active'].astype(bool)
+        if isinstance(reached_end, set):
+            active &= rest['area'].isin(reached_end) if 'area' in rest.columns else False
+        gone = rest.index[active]
+        rest.loc[gone, 'active'] = False
+        rest.loc[gone, 'gone_at'] = now
+
+    return pd.concat([new, rest]).reset_index()
+
+def run_summary(metrics, pages, rows):
+    """Headline rates for the run report (the raw counters are alongside)."""
+    crawl_s = metrics.phase_seconds('crawl')
+    cache_hits = metrics.count('geocode_lookups', tier='cache', result='hit')
+    lookups = cache_hits + metrics.count('geocode_lookups', tier='cache', result='miss')
+    nominatim = metrics.count('geocode_lookups', tier='nominatim')
+    return {
+        'pages': pages,
+        'rows': rows,
+        'pages_per_s': pages / crawl_s if crawl_s else 0.0,
+        'rows_per_s': rows / crawl_s if crawl_s else 0.0,
+        'parse_failures': metrics.count('parse_failures'),
+        'pages_failed': metrics.count('pages_failed'),
+        'duplicates': metrics.count('duplicates'),
+        'geocode_cache_hit_rate': cache_hits / lookups if lookups else 0.0,
+        'geocode_nominatim_failure_rate': (metrics.count('geocode_lookups', tier='nominatim', result='miss')
+                                           + metrics.count('geocode_lookups', tier='nominatim', result='error')) / nominatim if nominatim else 0.0,
+    }
+
+def make_geocoder():
     geolocator = Nominatim(user_agent=f"osaka_pro_miner_{random.randint(10000,99999)}")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1.2)
-    
-    total_addr = len(unique_addresses)
-    if status_placeholder: status_placeholder.info(f"🗺️  Mapping {total_addr} locations...")
+    return RateLimiter(geolocator.geocode, min_delay_seconds=1.2)
 
-    new_cache_entries = 0
-    
-    for i, addr in enumerate(unique_addresses):
-        if progress_bar: progress_bar.progress(0.4 + (i / total_addr) * 0.6)
-
-        if addr in cache: continue
-        
-        try:
-            query = f"Osaka, {addr}" if "大阪" not in addr else addr
-            loc = geocode(query)
-            if loc:
-                cache[addr] = {'lat': loc.latitude, 'lon': loc.longitude}
-                new_cache_entries += 1
-                if new_cache_entries % 10 == 0: save_cache(cache)
-        except: pass
-
-    if new_cache_entries > 0: save_cache(cache)
-
-    df['lat'] = df['address'].map(lambda x: cache.get(x, {}).get('lat', None))
-    df['lon'] = df['address'].map(lambda x: cache.get(x, {}).get('lon', None))
+def run_osaka_miner(max_pages=5, status_placeholder=None, progress_bar=None,
+                    workers=MAX_WORKERS, rate_limit=REQUESTS_PER_SECOND, incremental=False,
+                    parse_workers=PARSE_WORKERS, fetch_images=True, areas=None, shard_workers=SHARD_WORKERS,
+                    archive_responses=True):
+    # Streaming pipeline: fetch (threads) -> parse (process pool) -> geocode
+    # (background thread). Pages are fetched concurrently (`workers` in flight)
+    # under one shared `rate_limit` requests/sec budget; each page is parsed as
+    # soon as it lands and new addresses start geocoding on first sight.
+    # Incremental mode walks newest-first in batches of `workers` pages and
+    # stops at the first page whose listings are all already stored unchanged.
+    # With `areas` (codes or search URLs) the crawl is sharded instead: area x
+    # page-range shards run in `shard_workers` crawler processes that share
+    # the `rate_limit` budget, and their rows are merged here by link. A full
+    # crawl of some areas replaces only those areas' rows in the store.
+    # Parsed pages go straight to a CrawlJournal on disk, not memory, so the
+    # crawl itself runs in flat memory; the merge then holds this run's rows
+    # once as a typed frame, since the store is saved as one table. A crawl
+    # interrupted by a crash or restart resumes from its completed pages
+    # when run again with the same parameters. Raw pages are kept in
+    # ARCHIVE_DIR (archive_responses) so replay_archive() can re-parse them.
+    # The same unit listed by several agencies is tagged with its canonical
+    # link (dup_of) for the dashboard to collapse. Every run is snapshotted
+    # (as deltas) into HISTORY_DB and writes its phase timings and counters
+    # to METRICS_DIR.
+    os.makedirs(DATA_DIR, exist_ok=True)  # Not at import time: importing for the paths has no side effects
+    metrics = Metrics('miner')
+    base_url = BASE_URL + NEWEST_FIRST if incremental else BASE_URL
+    journal = CrawlJournal(JOURNAL_DIR, {'search': [str(a) for a in areas] if areas else base_url,
+                                         'max_pages': max_pages, 'incremental': bool(incremental)})
+    now = journal.now
+    archive = ResponseArchive(ARCHIVE_DIR, run=now) if archive_responses else None
+    with metrics.phase('load'):
+        # A sharded full crawl only replaces the rows of its own areas, so it needs the store too
+        existing = load_listings() if incremental or areas else pd.DataFrame()
+        # Only listed rows: a relisted unit matching its old 'gone' row is news, not the catch-up point
+        listed = existing[existing['active'].astype(bool)] if 'active' in existing.columns else existing
+        known_hashes = dict(zip(listed['link'], listed['row_hash'])) if incremental and not existing.empty else {}
+
+        cache = load_cache()
+        geocoder = GeocodeStage(cache, make_geocoder(), load_gazetteer(GAZETTEER_FILE), metrics=metrics)
+    geocoder.start()
+    parser = ParseStage(parse_workers, metrics=metrics)
+
+    if status_placeholder:
+        if journal.resumed: status_placeholder.info(f"⛏️  Resuming Deep Scrape ({len(journal.pages)} pages already on disk)...")
+        else: status_placeholder.info(f"⛏️  Initializing Deep Scrape ({max_pages} Pages)...")
+
+    urls = [f"{base_url}&page={page}" for page in range(1, max_pages + 1)]
+    batch = workers if incremental else max_pages
+    session, budget = make_session(workers), RateBudget(rate_limit)
+    done = len(journal.pages)
+    total_pages = max_pages * (len(areas) if areas else 1)
+    reached_end = stopped = False
+    failed = set()  # Single-search pages that could not be fetched or parsed
+
+    def on_page(search, page, rows, count=None):
+        nonlocal done
+        done += 1
+
+        # UI Feedback
+        if status_placeholder: status_placeholder.text(f"Scanning Page {done}/{total_pages}... (mapped {geocoder.done}/{geocoder.total})")
+        if progress_bar: progress_bar.progress(min(done / total_pages, 1.0) * 0.4)
+
+        if rows is None:
+            failed.add(page)
+            return
+        journal.record(search, page, rows, page_state(rows, known_hashes), count)
+        for r in rows: geocoder.submit(r['address'])
+
+    # 1. SCRAPING PHASE (geocoding already running behind it)
+    crawl_start = time.perf_counter()
+    fetched = None
+    try:
+        if areas:
+            reached_end = crawl_shards(areas, max_pages, incremental, known_hashes, shard_workers, rate_limit,
+                                       NEWEST_FIRST if incremental else "", metrics, on_page, journal.completed(), archive)
+        else:
+            for start in range(0, max_pages, batch):
+                batch_pages = range(start + 1, min(start + batch, max_pages) + 1)
+                todo = [page for page in batch_pages if journal.state(0, page) is None]
+                if todo:
+                    fetched = fetch_pages([urls[page - 1] for page in todo], workers=workers, session=session, budget=budget,
+                                          metrics=metrics, archive=archive)
+                    for page, rows in parser.stream(fetched, page_numbers=todo):
+                        for r in rows or []: r['row_hash'] = row_hash(r)
+                        on_page(0, page, rows)
+
+                ended = None
+                for page in batch_pages:
+                    state = journal.state(0, page)
+                    if state == 'empty': ended = page; break
+                    if state == 'known': stopped = True; break
+                if ended:
+                    # Unseen listings are only gone if every page before the end came through
+                    reached_end = not any(p < ended for p in failed)
+                if ended or stopped:
+                    if incremental and status_placeholder: status_placeholder.text(f"Caught up at page {page}, stopping early.")
+                    break
+    except BaseException:
+        # The journal stays on disk; the next run with these parameters resumes it
+        journal.close()
+        geocoder.finish()
+        raise
+    finally:
+        # Cancels the queued fetches and waits out the in-flight ones, which still use the session and archive
+        if fetched is not None: fetched.close()
+        session.close()
+        parser.close()
+        if archive is not None: archive.close()
+        metrics.add_time('crawl', time.perf_counter() - crawl_start)
+
+    rows = journal.rows
+    metrics.inc('rows_scraped', n=rows)
+
+    if not rows:
+        journal.discard()
+        geocoder.finish()
+        geocoder.join()
+        cache.close()
+        metrics.write(METRICS_DIR, run_summary(metrics, done, 0))
+        return existing
+    with metrics.phase('merge'):
+        # Typed chunks, never every row as dicts. Pages complete out of
+        # order; keep the site's listing order
+        df = pd.concat(journal.frames(), ignore_index=True)
+        df = df.sort_values(['_search', '_page'], kind='stable').drop(columns=['_search', '_page'])
+        df = df.drop_duplicates('link')
+        df['first_seen'] = now
+        df['last_seen'] = now
+        df['active'] = True
+        df['gone_at'] = None
+        if incremental: df = merge_listings(existing, df, now, reached_end)
+        elif areas and not existing.empty:
+            kept = existing[~existing['area'].isin(areas)] if 'area' in existing.columns else existing
+            df = pd.concat([df, kept[~kept['link'].isin(df['link'])]], ignore_index=True)
+    with metrics.phase('dedup'):
+        # Same unit through several agencies: rows stay per link, tagged with the canonical one
+        metrics.inc('duplicates', n=mark_duplicates(df))
+
+    with metrics.phase('save'):
+        storage.save_listings(df, LISTINGS_FILE)
+
+    # 2. GEOCODING PHASE: drain what is left in the geocoder queue
+    active = df['active'].astype(bool)
+    for addr in df.loc[active, 'address'].unique(): geocoder.submit(addr)
+    geocoder.finish()
+
+    # 3. IMAGE PHASE: card thumbnails, downloaded once while geocoding drains
+    if fetch_images:
+        if status_placeholder: status_placeholder.info("🖼️  Caching listing thumbnails...")
+        with metrics.phase('images'):
+            metrics.inc('images_fetched', n=ThumbnailCache(THUMB_DIR).fetch_many(df.loc[active, 'image_url']))
+    if status_placeholder: status_placeholder.info(f"🗺️  Mapping {geocoder.total - geocoder.done} remaining locations...")
+    with metrics.phase('geocode_drain'):
+        while geocoder.is_alive():
+            geocoder.join(0.5)
+            if progress_bar: progress_bar.progress(0.4 + (geocoder.done / max(geocoder.total, 1)) * 0.6)
+
+    with metrics.phase('join'):
+        coords = cache.lookup_many(df['address'])
+        cache.close()
+        df['lat'] = df['address'].map(lambda x: coords.get(x, {}).get('lat', None))
+        df['lon'] = df['address'].map(lambda x: coords.get(x, {}).get('lon', None))
+        # Which tier resolved each row, for coverage reporting
+        df['geo_source'] = df['address'].map(lambda x: coords.get(x, {}).get('source', None))
+    if status_placeholder and geocoder.resolved:
+        status_placeholder.info("🗺️  New locations by tier: " + ", ".join(f"{k} {v}" for k, v in geocoder.resolved.items()))
     
-    df.to_csv(OUTPUT_FILE, index=False)
+    with metrics.phase('save'):
+        df = storage.save_listings(df, LISTINGS_FILE)
+    with metrics.phase('history'):
+        # Same `now` on a resumed run, so a retry records the same snapshot; links
+        # missing from the store only count as gone where the crawl reached the end
+        history = ListingHistory(HISTORY_DB)
+        metrics.inc('history_versions', n=history.record_crawl(df, now, complete=reached_end))
+        history.close()
+    journal.discard()
+    metrics.write(METRICS_DIR, run_summary(metrics, done, rows))
     
     if progress_bar: progress_bar.progress(1.0)
-    return df
\ No newline at end of file
+    return df
+
+def _earliest(a, b):
+    # ISO timestamps compare as strings; a missing side loses
+    b = b.fillna(a)
+    return a.where(a.notna() & (a <= b), b)
+
+def _latest(a, b):
+    b = b.fillna(a)
+    return a.where(a.notna() & (a >= b), b)
+
+def replay_archive(run=None, parse_workers=PARSE_WORKERS, status_placeholder=None):
+    # Rebuilds LISTINGS_FILE from the raw pages in ARCHIVE_DIR (every run, or
+    # only `run`) with the current parser and no network at all. Fields and
+    # row_hash come from the newest archived copy of each listing and
+    # first/last_seen from the runs it was archived in; active/gone_at/area
+    # carry over from the store, coordinates come from the geocode cache
+    # (store value when the cache has none). Store rows without an archived
+    # page are kept as they are.
+    os.makedirs(DATA_DIR, exist_ok=True)
+    metrics = Metrics('replay')
+    archive = ResponseArchive(ARCHIVE_DIR)
+    if status_placeholder: status_placeholder.info(f"🔁 Re-parsing archived pages ({archive.stats()['unique_pages']} unique)...")
+    with metrics.phase('parse'):
+        rows = replay_rows(archive, run, parse_workers, metrics)
+    archive.close()
+    existing = load_listings()
+    if not rows:
+        metrics.write(METRICS_DIR, {'pages': metrics.count('pages_parsed'), 'rows': 0})
+        return existing
+
+    with metrics.phase('merge'):
+        df = pd.DataFrame(list(rows.values()))
+        df['active'] = df['last_seen'] == df['last_seen'].max()
+        df['gone_at'] = None
+        rest = pd.DataFrame()
+        if not existing.empty:
+            old = existing.set_index('link').astype(object)
+            hit = df['link'].isin(old.index).to_numpy()
+            prev = old.loc[df.loc[hit, 'link']]
+            for col in ('active', 'gone_at', 'area'):
+                if col in prev.columns: df.loc[hit, col] = prev[col].to_numpy()
+            for col, pick in (('first_seen', _earliest), ('last_seen', _latest)):
+                if col in prev.columns:
+                    df.loc[hit, col] = pick(df.loc[hit, col], pd.Series(prev[col].to_numpy(), index=df.index[hit]))
+            rest = existing[~existing['link'].isin(df['link'])]
+
+    with metrics.phase('join'):
+        cache = load_cache()
+        coords = cache.lookup_many(df['address'])
+        cache.close()
+        for col, key in (('lat', 'lat'), ('lon', 'lon'), ('geo_source', 'source')):
+            df[col] = df['address'].map(lambda x: coords.get(x, {}).get(key, None))
+            if not existing.empty and col in existing.columns:
+                df[col] = df[col].fillna(df['link'].map(existing.set_index('link')[col].astype(object)))
+
+    df = pd.concat([df, rest], ignore_index=True)
+    with metrics.phase('dedup'):
+        metrics.inc('duplicates', n=mark_duplicates(df))
+    with metrics.phase('save'):
+        df = storage.save_listings(df, LISTINGS_FILE)
+    metrics.write(METRICS_DIR, {'pages': metrics.count('pages_parsed'), 'rows': len(rows),
+                                'parse_failures': metrics.count('parse_failures'), 'seconds': metrics.phase_seconds('parse')})
+    if status_placeholder: status_placeholder.info(f"🔁 Replayed {len(rows)} listings from the archive.")
+    return df
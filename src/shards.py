@@ -0,0 +1,158 @@
+from concurrent.futures import as_completed
+import os
+from fetcher import fetch_page, fetch_pages, make_session, SharedRateBudget, REQUESTS_PER_SECOND
+from parsing import parse_page_counted, parse_page_count, row_hash, page_is_known, page_state
+from pipeline import record_parse, process_pool
+from metrics import Metrics, NULL_METRICS
+from archive import ResponseArchive
+from areas import search_url
+
+# --- SHARD CONFIG ---
+SHARD_WORKERS = min(4, os.cpu_count() or 1)  # Crawler processes, all under one rate budget
+PAGES_PER_SHARD = 5
+
+def plan_shards(index, area, url, last_page, incremental, pages_per_shard=PAGES_PER_SHARD, skip=()):
+    """
+    Pages 2..last_page of one area (page 1 is the probe), minus the pages in
+    `skip`. Full crawls split them into page ranges; incremental crawls keep
+    one sequential shard per area, since everything past the catch-up point
+    is skipped anyway.
+    """
+    pages = [p for p in range(2, last_page + 1) if p not in skip]
+    if not pages: return []
+    if incremental: return [(index, area, url, pages, True)]
+    return [(index, area, url, pages[i:i + pages_per_shard], False) for i in range(0, len(pages), pages_per_shard)]
+
+# --- WORKER PROCESS SIDE ---
+_session = _budget = _archive = None
+_known = {}
+
+def _init_worker(budget, known_hashes, archive_root=None, run=None):
+    global _session, _budget, _known, _archive
+    _session, _budget, _known = make_session(1), budget, known_hashes
+    if archive_root: _archive = ResponseArchive(archive_root, run)
+
+def _tag(rows, area):
+    for r in rows:
+        r['row_hash'] = row_hash(r)
+        r['area'] = area
+    return rows
+
+def crawl_shard(index, area, url, pages, stop_when_known):
+    """Fetches and parses one shard's pages in order; stops at the end of the results."""
+    metrics = Metrics('miner')
+    out, failed, reached_end, stopped = {}, [], False, False
+    for page in pages:
+        html = fetch_page(_session, f"{url}&page={page}", _budget, metrics=metrics, archive=_archive)
+        if html is None:
+            failed.append(page)
+            continue
+        try:
+            rows = _tag(record_parse(metrics, parse_page_counted(html)), area)
+        except Exception as e:
+            metrics.inc('pages_failed', {'stage': 'parse'})
+            print(f"Error {area} page {page}: {e}")
+            failed.append(page)
+            continue
+        out[page] = rows
+        if not rows:
+            reached_end = True
+            break
+        if stop_when_known and page_is_known(rows, _known):
+            stopped = True
+            break
+    return {'index': index, 'area': area, 'pages': out, 'failed': failed,
+            'reached_end': reached_end, 'stopped': stopped, 'metrics': metrics.snapshot()}
+
+# --- COORDINATOR ---
+def crawl_shards(areas, max_pages, incremental=False, known_hashes=None, workers=SHARD_WORKERS,
+                 rate=REQUESTS_PER_SECOND, sort="", metrics=NULL_METRICS, on_page=None, completed=None, archive=None):
+    """
+    Crawls up to `max_pages` result pages of every area in `areas` (codes
+    or search URLs) with a pool of crawler processes that share one
+    `rate` requests/sec budget. Page 1 of each area is fetched first to
+    read its page count, the remaining pages run as shards.
+    on_page(area_index, page, rows, count) is called in this thread as
+    results arrive (rows is None for failed pages, count is the area's page
+    count on page 1). `completed` ({(area_index, page): {'state', 'count'}}
+    from a CrawlJournal) resumes an interrupted crawl: those pages are not
+    fetched again. Every process archives its raw pages into `archive`
+    (a ResponseArchive) when given. Returns the set of areas that were walked to the end
+    without failures, i.e. whose listings not seen in this crawl are gone.
+    """
+    urls = [search_url(a) + sort for a in areas]
+    budget = SharedRateBudget(rate)
+    known_hashes = known_hashes if incremental and known_hashes else {}
+    on_page = on_page or (lambda i, page, rows, count: None)
+    completed = completed or {}
+    ended, failed, stopped, shards = set(), set(), set(), []
+
+    def plan(i, state, count):
+        area = areas[i]
+        if state is None:
+            failed.add(area)
+            count = max_pages
+        elif state == 'empty':
+            ended.add(area)
+            return
+        elif state == 'known':
+            return
+        elif count is not None and count <= max_pages:
+            ended.add(area)
+        last_page = min(count or max_pages, max_pages)
+
+        # Resumed pages: not refetched, and an earlier end/catch-up still holds
+        done = {p: c['state'] for (j, p), c in completed.items() if j == i}
+        empty = [p for p, st in done.items() if st == 'empty']
+        if empty:
+            ended.add(area)
+            last_page = min(last_page, min(empty) - 1)
+        if incremental and 'known' in done.values():
+            stopped.add(area)
+            return
+        shards.extend(plan_shards(i, area, urls[i], last_page, incremental, skip=done))
+
+    # 1. PROBE: page 1 of every area not already done, concurrently
+    probe = []
+    for i in range(len(areas)):
+        first = completed.get((i, 1))
+        if first is None: probe.append(i)
+        else: plan(i, first['state'], first['count'])
+
+    session = make_session(workers)
+    try:
+        fetched = fetch_pages([urls[i] + "&page=1" for i in probe], workers=max(1, min(workers, len(probe))),
+                              session=session, budget=budget, metrics=metrics, archive=archive) if probe else []
+        for j, url, html in fetched:
+            i = probe[j]
+            area = areas[i]
+            try:
+                rows = _tag(record_parse(metrics, parse_page_counted(html)), area) if html is not None else None
+            except Exception as e:
+                metrics.inc('pages_failed', {'stage': 'parse'})
+                print(f"Error {area} page 1: {e}")
+                rows = None
+            count = parse_page_count(html) if rows else None
+            on_page(i, 1, rows, count)
+            plan(i, page_state(rows, known_hashes) if rows is not None else None, count)
+    finally:
+        session.close()
+
+    # 2. SHARDS: one task per area x page range
+    if shards:
+        pool = process_pool(min(workers, len(shards)), initializer=_init_worker,
+                            initargs=(budget, known_hashes, archive and archive.root, archive and archive.run))
+        try:
+            for future in as_completed([pool.submit(crawl_shard, *shard) for shard in shards]):
+                result = future.result()
+                metrics.merge(result['metrics'])
+                for page in result['failed']: on_page(result['index'], page, None, None)
+                for page, rows in sorted(result['pages'].items()): on_page(result['index'], page, rows, None)
+                if result['failed']: failed.add(result['area'])
+                if result['reached_end']: ended.add(result['area'])
+                if result['stopped']: stopped.add(result['area'])
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # An early stop says nothing about the pages after it
+    return ended - failed - stopped
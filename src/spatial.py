@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import warnings
+import os
+from metrics import NULL_METRICS
+
+# --- SPATIAL CONFIG ---
+K_NEIGHBORS = 10          # Comparables behind nbr_rent_m2 and nbr_density
+MIN_RADIUS_M = 50         # Geocodes are chome centroids; closer than this is "same spot"
+N_COMPARABLES = 5         # Rows in a card's comparables list
+LOCATION_FEATURES = ['nbr_rent_m2', 'nbr_density']
+
+# Equirectangular projection around Osaka: metres, accurate to <1% across the prefecture
+ORIGIN_LAT = 34.69
+M_PER_DEG_LAT = 110_574.0
+M_PER_DEG_LON = 111_320.0 * np.cos(np.radians(ORIGIN_LAT))
+
+def project(lat, lon):
+    return np.column_stack([np.asarray(lon, dtype='float64') * M_PER_DEG_LON,
+                            np.asarray(lat, dtype='float64') * M_PER_DEG_LAT])
+
+class SpatialIndex:
+    """
+    KD-tree over the geocoded rows of one dataset version, built once and
+    cached like ListingIndex. Row positions are positions in the frame it
+    was built from; rows without lat/lon are simply not in the tree.
+    Neighborhood features for all rows are one batched k-NN query,
+    O(n log n).
+    """
+    def __init__(self, df):
+        self.n = len(df)
+        lat, lon = df['lat'].to_numpy(dtype='float64', na_value=np.nan), df['lon'].to_numpy(dtype='float64', na_value=np.nan)
+        self.rows = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+        self.points = project(lat[self.rows], lon[self.rows])
+        from scipy.spatial import cKDTree  # Ships with xgboost; imported here to keep app start light
+        self.tree = cKDTree(self.points) if len(self.rows) else None
+        size = df['size_m2'].to_numpy(dtype='float64', na_value=np.nan)[self.rows]
+        rent = df['total_rent'].to_numpy(dtype='float64', na_value=np.nan)[self.rows]
+        self.rent_m2 = np.where(size > 0, rent / np.where(size > 0, size, 1), np.nan)
+        self.slot = np.full(self.n, -1)  # row position -> tree index
+        self.slot[self.rows] = np.arange(len(self.rows))
+
+    def _neighbors(self, slots, k):
+        """k nearest tree indices (and metres) of the points `slots`, the point itself excluded."""
+        kk = min(k + 1, len(self.rows))
+        dist, idx = self.tree.query(self.points[slots], k=kk)
+        dist, idx = dist.reshape(len(slots), kk), idx.reshape(len(slots), kk)
+        own = idx == slots[:, None]
+        # With more than k exact duplicates the point itself may not come back; drop the farthest instead
+        own[~own.any(axis=1), -1] = True
+        return dist[~own].reshape(len(slots), kk - 1), idx[~own].reshape(len(slots), kk - 1)
+
+    def neighborhood_features(self, k=K_NEIGHBORS):
+        """
+        Per row: nbr_rent_m2, the median ¥/m² of its k nearest other
+        listings (never its own rent, so it can feed the rent model), and
+        nbr_density, listings per km² estimated from the distance to the
+        k-th of them (a fixed-radius count would cost O(n * density)).
+        NaN off-map.
+        """
+        return self.neighborhoods(k)[0]
+
+    def neighborhoods(self, k=K_NEIGHBORS, n_comparables=N_COMPARABLES):
+        """
+        neighborhood_features() plus every row's comparables from the same
+        batched query: (features, rows, metres), the last two n x
+        n_comparables arrays padded with -1 / NaN.
+        """
+        out = pd.DataFrame({f: np.full(self.n, np.nan) for f in LOCATION_FEATURES})
+        comp_rows, comp_dist = np.full((self.n, n_comparables), -1), np.full((self.n, n_comparables), np.nan)
+        if self.tree is None or len(self.rows) < 2: return out, comp_rows, comp_dist
+        slots = np.arange(len(self.rows))
+        dist, idx = self._neighbors(slots, max(k, n_comparables))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN neighborhoods stay NaN
+            out.loc[self.rows, 'nbr_rent_m2'] = np.nanmedian(self.rent_m2[idx[:, :k]], axis=1)
+        radius_km = np.maximum(dist[:, :k][:, -1], MIN_RADIUS_M) / 1000
+        out.loc[self.rows, 'nbr_density'] = dist[:, :k].shape[1] / (np.pi * radius_km ** 2)
+        m = min(n_comparables, dist.shape[1])
+        comp_rows[self.rows, :m], comp_dist[self.rows, :m] = self.rows[idx[:, :m]], dist[:, :m]
+        return out, comp_rows, comp_dist
+
+    def comparables(self, position, k=N_COMPARABLES):
+        """(row positions, metres) of the k listings nearest to row `position`; empty if it is off-map."""
+        slot = self.slot[position] if 0 <= position < self.n else -1
+        if slot < 0 or len(self.rows) < 2: return np.array([], dtype=int), np.array([])
+        dist, idx = self._neighbors(np.array([slot]), k)
+        return self.rows[idx[0]], dist[0]
+
+class Neighborhoods:
+    """
+    What the dashboard needs from a SpatialIndex, precomputed for every row:
+    LOCATION_FEATURES and the N_COMPARABLES nearest rows. Saved per dataset
+    version by load_neighborhoods(), so a restart on an unchanged store
+    reads three arrays and never builds the tree (or imports scipy).
+    """
+    def __init__(self, features, comp_rows, comp_dist):
+        self.features, self.comp_rows, self.comp_dist = features, comp_rows, comp_dist
+
+    def neighborhood_features(self):
+        return self.features
+
+    def comparables(self, position):
+        """Same as SpatialIndex.comparables() with the default k."""
+        if not 0 <= position < len(self.comp_rows): return np.array([], dtype=int), np.array([])
+        keep = self.comp_rows[position] >= 0
+        return self.comp_rows[position][keep], self.comp_dist[position][keep]
+
+def load_neighborhoods(df, version, cache_dir, metrics=NULL_METRICS):
+    """Neighborhoods of `df` (the store at `version`), read from `cache_dir` or built and saved there."""
+    path = os.path.join(cache_dir, f"nbr_{version}_{K_NEIGHBORS}_{N_COMPARABLES}.npz")
+    if os.path.exists(path):
+        with np.load(path) as saved:
+            if len(saved['features']) == len(df):
+                return Neighborhoods(pd.DataFrame(saved['features'], columns=LOCATION_FEATURES),
+                                     saved['comp_rows'], saved['comp_dist'])
+    with metrics.phase('spatial_build'):
+        features, comp_rows, comp_dist = SpatialIndex(df).neighborhoods()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, features=features[LOCATION_FEATURES].to_numpy(), comp_rows=comp_rows.astype('int32'),
+             comp_dist=comp_dist.astype('float32'))
+    os.replace(tmp, path)
+    # One dataset version at a time, like the model files
+    for name in os.listdir(cache_dir):
+        if name.startswith("nbr_") and name != os.path.basename(path): os.remove(os.path.join(cache_dir, name))
+    return Neighborhoods(features, comp_rows, comp_dist)
+
+def add_neighborhood_features(df, spatial):
+    """Adds LOCATION_FEATURES from `spatial` (built on this same frame) in place."""
+    features = spatial.neighborhood_features()
+    for col in LOCATION_FEATURES: df[col] = features[col].to_numpy()
+    return df
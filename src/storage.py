@@ -0,0 +1,101 @@
+import pandas as pd
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, the store falls back to CSV
+    pa = None
+
+# --- LISTINGS SCHEMA ---
+# Compact in-memory dtypes; columns not listed here are kept as they come
+SCHEMA = {
+    'name': 'string',
+    'address': 'category',
+    'layout': 'category',
+    'age': 'int16',
+    'floor': 'int16',
+    'size_m2': 'float64',  # Shown and snapshotted as is: float32 would print 34.18 as 34.18000030517578
+    'total_rent': 'int32',
+    'key_money': 'int32',
+    'deposit': 'int32',
+    'image_url': 'string',
+    'link': 'string',
+    'row_hash': 'string',
+    'first_seen': 'string',
+    'last_seen': 'string',
+    'active': 'bool',
+    'gone_at': 'string',
+    'lat': 'float32',
+    'lon': 'float32',
+    'geo_source': 'category',
+    'area': 'category',
+    'dup_of': 'string',
+}
+
+def apply_schema(df):
+    """Coerces known columns to SCHEMA dtypes (CSV round-trips, merged frames...)."""
+    df = df.copy()
+    for col, dtype in SCHEMA.items():
+        if col not in df.columns: continue
+        if dtype.startswith('int'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(dtype)
+        elif dtype.startswith('float'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+            # Floor areas are quoted to 0.01 m²; also repairs stores written as float32
+            if col == 'size_m2': df[col] = df[col].round(2)
+        elif dtype == 'bool':
+            df[col] = df[col].map(lambda v: str(v).lower() in ('true', '1')).astype(bool)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def store_path(data_dir, stem="osaka_listings"):
+    """Default listings store: Arrow when pyarrow is installed, CSV otherwise."""
+    return os.path.join(data_dir, stem + (".arrow" if pa is not None else ".csv"))
+
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if pa is None or ext == '.csv': return 'csv'
+    return 'parquet' if ext == '.parquet' else 'arrow'
+
+def save_listings(df, path):
+    """
+    Writes the typed listings table. `.arrow` (default store) is an
+    uncompressed Arrow IPC file so it can be memory-mapped on load;
+    `.parquet` is the compact archival variant. Writes are atomic.
+    Returns the typed frame that was written.
+    """
+    df = apply_schema(df)
+    tmp = path + ".tmp"
+    fmt = _format(path)
+    if fmt == 'arrow': feather.write_feather(df, tmp, compression='uncompressed')
+    elif fmt == 'parquet': df.to_parquet(tmp, index=False)
+    else: df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return df
+
+def load_listings(path, columns=None):
+    """Reads the store; Arrow files are memory-mapped (zero-copy for numeric columns)."""
+    if not os.path.exists(path): return pd.DataFrame()
+    fmt = _format(path)
+    if fmt == 'arrow':
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return _upgrade(table.to_pandas())
+    if fmt == 'parquet': return _upgrade(pd.read_parquet(path, columns=columns))
+    return apply_schema(pd.read_csv(path, usecols=columns))
+
+def _upgrade(df):
+    # Stores written while size_m2 was float32; the next save rewrites them
+    if 'size_m2' in df.columns and df['size_m2'].dtype == 'float32': df['size_m2'] = df['size_m2'].astype('float64').round(2)
+    return df
+
+def import_csv(csv_path, path):
+    """One-off migration of a legacy osaka_listings.csv into the typed store."""
+    df = apply_schema(pd.read_csv(csv_path))
+    save_listings(df, path)
+    return df
+
+def export_csv(df, csv_path=None):
+    """CSV export for compatibility; returns the text when no path is given."""
+    return df.to_csv(csv_path, index=False) if csv_path else df.to_csv(index=False)
@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+import threading
+import hashlib
+import time
+import io
+import os
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, without it cards keep hot-linking
+    Image = None
+
+# --- THUMBNAIL CONFIG ---
+THUMB_HEIGHT = 180              # Matches the card's `img { height: 180px }`
+THUMB_MAX_WIDTH = 320           # Wider images are center-cropped (cards use object-fit: cover)
+IMAGE_WORKERS = 4
+IMAGES_PER_SECOND = 4.0         # Image CDN budget, separate from the listing pages
+MAX_CACHE_BYTES = 256 * 2**20   # LRU-evicted beyond this
+NEGATIVE_TTL = 24 * 3600        # Failed image URLs are retried after a day
+
+def make_thumbnail(raw):
+    img = Image.open(io.BytesIO(raw))
+    img = img.convert('RGB')
+    width = max(1, round(img.width * THUMB_HEIGHT / img.height))
+    img = img.resize((width, THUMB_HEIGHT), Image.LANCZOS)
+    if width > THUMB_MAX_WIDTH:
+        left = (width - THUMB_MAX_WIDTH) // 2
+        img = img.crop((left, 0, left + THUMB_MAX_WIDTH, THUMB_HEIGHT))
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=80, optimize=True)
+    return out.getvalue()
+
+class ThumbnailCache:
+    """
+    Content-addressed thumbnail store: files are named by the SHA-1 of the
+    thumbnail bytes (units of one building usually share a photo), and a
+    small SQLite index maps image URLs to digests. Reads bump the digest's
+    access time; once the directory exceeds `max_bytes` the least recently
+    used thumbnails are evicted. Failed downloads are remembered for
+    NEGATIVE_TTL, and every download through one instance shares its
+    `rate` budget, across prefetch calls and Streamlit reruns alike.
+    """
+    def __init__(self, root, max_bytes=MAX_CACHE_BYTES, rate=IMAGES_PER_SECOND):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.rate = rate
+        self.budget = None  # Created with the first download: fetcher loads requests
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS failures (url TEXT PRIMARY KEY, failed_at REAL NOT NULL)")
+        self.inflight = set()
+        self.prefetcher = ThreadPoolExecutor(max_workers=2)
+        self.session = None
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + ".jpg")
+
+    def path_for(self, url):
+        """Local thumbnail path for `url`, or None if it is not cached."""
+        if not url: return None
+        with self.lock:
+            row = self.conn.execute("SELECT digest FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None: return None
+            self.conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), row[0]))
+        path = self._blob_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def has(self, url):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def failed_recently(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT failed_at FROM failures WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() - row[0] < NEGATIVE_TTL
+
+    def put_failure(self, url):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO failures VALUES (?, ?)", (url, time.time()))
+
+    def put(self, url, raw):
+        thumb = make_thumbnail(raw)
+        digest = hashlib.sha1(thumb).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f: f.write(thumb)
+            os.replace(tmp, path)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (digest, len(thumb), time.time()))
+            self.conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?)", (url, digest))
+            self.conn.execute("DELETE FROM failures WHERE url = ?", (url,))
+        return path
+
+    def evict(self):
+        """Drops least recently used thumbnails until the cache fits in max_bytes."""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes: return 0
+            dropped = []
+            for digest, size in self.conn.execute("SELECT digest, size FROM blobs ORDER BY last_access"):
+                if total <= self.max_bytes: break
+                dropped.append(digest)
+                total -= size
+            for digest in dropped:
+                self.conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                self.conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        for digest in dropped:
+            try: os.remove(self._blob_path(digest))
+            except FileNotFoundError: pass
+        return len(dropped)
+
+    def _network(self):
+        # Only a cache miss pays for the HTTP stack; cached cards never import it
+        import fetcher
+        with self.lock:
+            if self.budget is None: self.budget = fetcher.RateBudget(self.rate)
+        return fetcher
+
+    def _download(self, url, session):
+        from fetcher import get_header, TIMEOUT
+        try:
+            self.budget.wait()
+            res = session.get(url, headers=get_header(), timeout=TIMEOUT)
+            if res.status_code != 200:
+                self.put_failure(url)
+                return False
+            self.put(url, res.content)
+            return True
+        except Exception as e:
+            print(f"Thumbnail error {url}: {e}")
+            self.put_failure(url)
+            return False
+        finally:
+            with self.lock: self.inflight.discard(url)
+
+    def _claim(self, urls):
+        # Skip cached, empty, recently failed and already-downloading URLs
+        todo = []
+        for url in dict.fromkeys(u for u in urls if isinstance(u, str) and u.startswith("http")):
+            if self.has(url) or self.failed_recently(url): continue
+            with self.lock:
+                if url in self.inflight: continue
+                self.inflight.add(url)
+            todo.append(url)
+        return todo
+
+    def fetch_many(self, urls, workers=IMAGE_WORKERS):
+        """Miner image stage: downloads every uncached URL once with a bounded pool."""
+        if Image is None: return 0
+        todo = self._claim(urls)
+        if not todo: return 0
+        session = self._network().make_session(workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fetched = sum(pool.map(lambda u: self._download(u, session), todo))
+        finally:
+            session.close()
+        self.evict()
+        return fetched
+
+    def prefetch(self, urls):
+        """Fire-and-forget background download (e.g. the next list page)."""
+        if Image is None: return
+        todo = self._claim(urls)
+        if not todo: return
+        if self.session is None: self.session = self._network().make_session(IMAGE_WORKERS)
+        remaining = [len(todo)]
+
+        def batch_done(_):
+            # Evict once the whole batch is in, as fetch_many does
+            with self.lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last: self.evict()
+
+        for url in todo: self.prefetcher.submit(self._download, url, self.session).add_done_callback(batch_done)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import os
+from metrics import NULL_METRICS
+from spatial import LOCATION_FEATURES
+
+# --- MODEL CONFIG ---
+BASE_FEATURES = ['size_m2', 'age', 'floor']
+# Location features (spatial.add_neighborhood_features) are NaN for ungeocoded
+# rows, which XGBoost treats as missing
+FEATURES = BASE_FEATURES + ['layout_code'] + LOCATION_FEATURES
+# Saved models are only reused with the feature set they were trained on
+FEATURES_TAG = hashlib.sha1(json.dumps(FEATURES).encode('utf-8')).hexdigest()[:8]
+TARGET = 'total_rent'
+MIN_TRAIN_ROWS = 6
+DEAL_THRESHOLD = 5000  # Residual (¥) beyond which a unit is Undervalued/Overpriced
+
+def dataset_version(path):
+    """Content hash of the listings store; one trained model per version."""
+    if not os.path.exists(path): return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def layout_codes(layouts, categories):
+    # Stable codes from the training vocabulary (unseen layouts -> -1)
+    return pd.Categorical(layouts, categories=categories).codes
+
+def feature_frame(df, layouts):
+    X = df[BASE_FEATURES].copy()
+    X['layout_code'] = layout_codes(df['layout'], layouts)
+    for col in LOCATION_FEATURES: X[col] = df[col].astype('float64') if col in df.columns else np.nan
+    return X
+
+class RentModel:
+    """
+    XGBoost rent regressor plus the layout vocabulary it was trained with.
+    xgboost is imported on first train/load only (~2s), not with the module.
+    """
+    def __init__(self, booster, layouts):
+        self.booster = booster
+        self.layouts = layouts
+
+    @classmethod
+    def train(cls, df):
+        ml_df = df.dropna(subset=BASE_FEATURES + ['layout', TARGET])
+        if len(ml_df) < MIN_TRAIN_ROWS: return None
+        layouts = sorted(ml_df['layout'].astype(str).unique())
+        import xgboost as xgb
+        booster = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100)
+        booster.fit(feature_frame(ml_df, layouts), ml_df[TARGET])
+        return cls(booster, layouts)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.booster.get_booster().set_attr(layouts=json.dumps(self.layouts, ensure_ascii=False))
+        tmp = path + ".tmp.json"
+        self.booster.save_model(tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        import xgboost as xgb
+        booster = xgb.XGBRegressor()
+        booster.load_model(path)
+        return cls(booster, json.loads(booster.get_booster().attr('layouts')))
+
+    def predict(self, df):
+        X = feature_frame(df, self.layouts)
+        X[BASE_FEATURES] = X[BASE_FEATURES].fillna(0)
+        return self.booster.predict(X)
+
+def load_or_train(df, version, model_dir, metrics=NULL_METRICS):
+    """Loads the model persisted for `version`, training (and saving) it on first use."""
+    path = os.path.join(model_dir, f"rent_{version}_{FEATURES_TAG}.json")
+    if os.path.exists(path):
+        with metrics.phase('model_load'): return RentModel.load(path)
+    with metrics.phase('model_fit'): model = RentModel.train(df)
+    if model is None: return None
+    model.save(path)
+    # Models of older dataset versions are never loaded again
+    for name in os.listdir(model_dir):
+        if name.startswith("rent_") and name != os.path.basename(path): os.remove(os.path.join(model_dir, name))
+    return model
+
+def load_predictions(df, version, model_dir, metrics=NULL_METRICS):
+    """
+    predicted_rent for every row of `df` (the store at `version`), or None
+    if there is too little data to train. Saved next to the model, so a
+    restart on an unchanged store reads one array and never loads xgboost.
+    """
+    path = os.path.join(model_dir, f"rent_{version}_{FEATURES_TAG}.pred.npy")
+    if os.path.exists(path):
+        with metrics.phase('predictions_load'): predicted = np.load(path)
+        if len(predicted) == len(df): return predicted
+    model = load_or_train(df, version, model_dir, metrics)
+    if model is None: return None
+    with metrics.phase('model_predict'): predicted = model.predict(df)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, predicted)
+    os.replace(tmp, path)
+    return predicted
+
+def add_valuation(df, model, metrics=NULL_METRICS):
+    """Vectorized predicted_rent / residual / status columns (in place)."""
+    with metrics.phase('model_predict'): predicted = model.predict(df)
+    return apply_valuation(df, predicted)
+
+def apply_valuation(df, predicted):
+    """residual / status from a predicted_rent array (in place)."""
+    df['predicted_rent'] = predicted
+    df['residual'] = df['total_rent'] - df['predicted_rent']
+    df['status'] = np.select(
+        [df['residual'] < -DEAL_THRESHOLD, df['residual'] > DEAL_THRESHOLD],
+        ["Undervalued", "Overpriced"], default="Fair Value")
+    return df
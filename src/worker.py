@@ -0,0 +1,163 @@
+"""
+Headless miner. Runs crawl jobs from the local job queue so the dashboard
+only enqueues and polls; a browser refresh no longer kills a crawl.
+
+    python src/worker.py run                        # serve the queue until stopped
+    python src/worker.py run --idle-exit 300        # exit after 5 idle minutes
+    python src/worker.py enqueue --pages 20 [--full] [--areas 27127 27128 ...]
+    python src/worker.py schedule nightly --every 6h --pages 10
+    python src/worker.py unschedule nightly
+    python src/worker.py cancel 12
+    python src/worker.py status
+    python src/worker.py replay [--run 2026-01-31T09:00:00]  # re-parse archived pages, no network
+
+A job whose worker dies (crash, reboot, SIGKILL) stops heartbeating and is
+put back in the queue by the next worker; SIGTERM/Ctrl-C requeue it at once.
+"""
+import argparse
+import threading
+import traceback
+import signal
+import time
+import sys
+import os
+from datetime import datetime
+from jobs import JobQueue, JobProgress, JobCancelled
+from metrics import load_report
+from scraper import run_osaka_miner, replay_archive, DATA_DIR, METRICS_DIR
+from pipeline import PARSE_WORKERS
+
+# --- WORKER CONFIG ---
+JOBS_DB = os.path.join(DATA_DIR, "jobs.sqlite")
+POLL_SECONDS = 2
+HEARTBEAT_SECONDS = 10
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_interval(text):
+    """'90', '30m', '6h', '1d' -> seconds."""
+    text = text.strip().lower()
+    if text[-1:] in UNITS: return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+def job_params(args):
+    params = {'max_pages': args.pages, 'incremental': not args.full}
+    if args.areas: params['areas'] = args.areas
+    return params
+
+def run_job(queue, job):
+    stop = threading.Event()
+
+    def heartbeat():
+        # Geocoding/image phases can go a while without a progress update
+        while not stop.wait(HEARTBEAT_SECONDS):
+            queue.touch(job['id'])
+            queue.worker_heartbeat(os.getpid())
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    progress = JobProgress(queue, job['id'])
+    print(f"[-] Job {job['id']} started (attempt {job['attempts']}): {job['params']}", flush=True)
+    try:
+        df = run_osaka_miner(status_placeholder=progress, progress_bar=progress, **job['params'])
+        report = load_report(METRICS_DIR, 'miner')
+        queue.finish(job['id'], 'done', f"Ingested {len(df)} units.",
+                     {'rows': len(df), 'summary': report.get('summary') if report else None})
+        print(f"[-] Job {job['id']} done: {len(df)} units", flush=True)
+    except JobCancelled:
+        queue.finish(job['id'], 'cancelled', "Cancelled")
+        print(f"[-] Job {job['id']} cancelled", flush=True)
+    except KeyboardInterrupt:
+        queue.release(job['id'], "Interrupted, will resume")
+        print(f"[!] Job {job['id']} interrupted, requeued", flush=True)
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        queue.finish(job['id'], 'failed', f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+def serve(queue, poll=POLL_SECONDS, idle_exit=None, once=False):
+    pid = os.getpid()
+    signal.signal(signal.SIGTERM, _terminate)
+    idle_since = time.monotonic()
+    print(f"[-] Worker {pid} serving {queue.path}", flush=True)
+    try:
+        while True:
+            queue.worker_heartbeat(pid)
+            resumed = queue.requeue_stale()
+            if resumed: print(f"[-] Requeued {resumed} job(s) from lost workers", flush=True)
+            queue.enqueue_due()
+
+            job = queue.claim()
+            if job is not None:
+                run_job(queue, job)
+                if once: break
+                idle_since = time.monotonic()
+                continue
+
+            if idle_exit and time.monotonic() - idle_since > idle_exit: break
+            time.sleep(poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.worker_exit(pid)
+        print(f"[-] Worker {pid} stopped", flush=True)
+
+def print_status(queue):
+    def ts(t): return datetime.fromtimestamp(t).isoformat(timespec='seconds') if t else "-"
+    print("Worker alive:", queue.worker_alive())
+    print("\nJobs:")
+    for j in queue.recent():
+        print(f"  #{j['id']:<5} {j['status']:<10} {j['progress']:>5.0%}  created {ts(j['created_at'])}  "
+              f"{j['source'] or ''}  {j['params']}  {j['message'] or ''}")
+    print("\nSchedules:")
+    for s in queue.schedules():
+        print(f"  {s['name']:<16} every {s['every_s'] / 3600:g}h  next {ts(s['next_run'])}  {s['params']}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default=JOBS_DB)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="serve the job queue")
+    run.add_argument("--once", action="store_true", help="exit after one job")
+    run.add_argument("--idle-exit", type=float, help="exit after this many idle seconds")
+    run.add_argument("--poll", type=float, default=POLL_SECONDS)
+
+    for name in ("enqueue", "schedule"):
+        p = sub.add_parser(name)
+        if name == "schedule":
+            p.add_argument("name")
+            p.add_argument("--every", required=True, help="interval, e.g. 30m, 6h, 1d")
+        p.add_argument("--pages", type=int, default=5)
+        p.add_argument("--full", action="store_true", help="full crawl instead of incremental")
+        p.add_argument("--areas", nargs="+", help="area codes (areas.AREAS) or search URLs; sharded crawl")
+
+    sub.add_parser("unschedule").add_argument("name")
+    sub.add_parser("cancel").add_argument("job_id", type=int)
+    sub.add_parser("status")
+    replay = sub.add_parser("replay", help="rebuild the listings store from the raw-page archive")
+    replay.add_argument("--run", help="only this miner run's pages (timestamp), default all")
+    replay.add_argument("--workers", type=int, default=PARSE_WORKERS)
+    args = ap.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == "run": serve(queue, args.poll, args.idle_exit, args.once)
+    elif args.command == "enqueue": print(f"Job {queue.enqueue(job_params(args), source='cli')} queued")
+    elif args.command == "schedule":
+        queue.schedule(args.name, job_params(args), parse_interval(args.every))
+        print(f"Scheduled {args.name} every {args.every}")
+    elif args.command == "unschedule": print("Removed" if queue.unschedule(args.name) else "No such schedule")
+    elif args.command == "cancel": queue.cancel(args.job_id)
+    elif args.command == "replay":
+        start = time.perf_counter()
+        df = replay_archive(args.run, args.workers)
+        print(f"Replayed {len(df)} units in {time.perf_counter() - start:.1f}s")
+    else: print_status(queue)
+    queue.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
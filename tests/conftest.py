@@ -0,0 +1,34 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fetcher
+import scraper
+import storage
+from standin import FakeGeocoder
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Points every scraper path at a scratch directory, geocoding offline."""
+    geocoder = FakeGeocoder()
+    patched = {
+        'DATA_DIR': str(tmp_path),
+        'LISTINGS_FILE': storage.store_path(str(tmp_path)),
+        'OUTPUT_FILE': str(tmp_path / "osaka_listings.csv"),
+        'GEOCODE_DB': str(tmp_path / "geocode_cache.sqlite"),
+        'CACHE_FILE': str(tmp_path / "address_cache.csv"),
+        'GAZETTEER_FILE': str(tmp_path / "gazetteer.csv"),
+        'THUMB_DIR': str(tmp_path / "thumbs"),
+        'METRICS_DIR': str(tmp_path / "metrics"),
+        'JOURNAL_DIR': str(tmp_path / "journal"),
+        'HISTORY_DB': str(tmp_path / "history.sqlite"),
+        'ARCHIVE_DIR': str(tmp_path / "archive"),
+        'make_geocoder': lambda: geocoder,
+    }
+    for name, value in patched.items(): monkeypatch.setattr(scraper, name, value)
+    monkeypatch.setattr(fetcher, 'BACKOFF_BASE', 0.01)
+    return tmp_path
@@ -0,0 +1,45 @@
+import pandas as pd
+from dedup import find_duplicates, mark_duplicates, collapse_duplicates, normalize_name, names_match
+
+def unit(link, name, rent=80000, floor=5, size=25.52, layout="1K", address="大阪府大阪市中央区島之内1-2-3", active=True):
+    return dict(link=link, name=name, total_rent=rent, floor=floor, size_m2=size, layout=layout, address=address, active=active)
+
+def frame(*rows):
+    return pd.DataFrame(list(rows))
+
+def test_width_and_decoration_variants_normalize_alike():
+    assert normalize_name("ＬＵＸＥ心斎橋ＥＡＳＴ　(5階)") == normalize_name("LUXE 心斎橋 EAST") == "luxe心斎橋east"
+    assert normalize_name("ﾌﾟﾚｻﾝｽ難波ｸﾚｽﾄ") == normalize_name("プレサンス難波クレスト")
+    assert not names_match(normalize_name("第2メゾン梅田"), normalize_name("第3メゾン梅田"))
+
+def test_full_and_half_width_listings_of_one_unit_merge():
+    df = frame(unit("a", "ＬＵＸＥ心斎橋ＥＡＳＴ", address="大阪府大阪市中央区島之内１丁目"),
+               unit("b", "LUXE心斎橋EAST 5階", address="大阪府大阪市中央区島之内1-2-3", rent=79000),
+               unit("c", "ﾙｸｾ心斎橋", address="大阪府大阪市中央区島之内1"))  # Different building
+    assert list(find_duplicates(df)) == ["b", "b", "c"]
+
+def test_floor_or_size_mismatch_does_not_merge():
+    df = frame(unit("a", "LUXE心斎橋EAST"),
+               unit("b", "LUXE心斎橋EAST", floor=12),     # Same building, another floor
+               unit("c", "LUXE心斎橋EAST", size=40.08),   # Another room type
+               unit("d", "LUXE心斎橋EAST", size=25.6))    # Rounding of the same room: merges
+    assert list(find_duplicates(df)) == ["a", "b", "c", "a"]
+
+def test_collapse_keeps_the_cheapest_first_listed_representative():
+    df = frame(unit("a", "LUXE心斎橋EAST", rent=82000),
+               unit("b", "ＬＵＸＥ心斎橋ＥＡＳＴ", rent=79000),
+               unit("c", "LUXE 心斎橋 EAST", rent=79000),  # Ties with b: b was listed first
+               unit("d", "プレサンス難波", address="大阪府大阪市中央区日本橋2"),
+               unit("e", "LUXE心斎橋EAST", rent=70000, active=False))  # Gone: not a candidate
+    assert mark_duplicates(df) == 2
+    out = collapse_duplicates(df[df['active']]).set_index('link')
+    assert list(out.index) == ["b", "d"]
+    assert out.loc["b", 'variant_links'] == "b a c" and out.loc["b", 'n_variants'] == 3
+    assert out.loc["d", 'variant_links'] == "d" and out.loc["d", 'n_variants'] == 1
+
+def test_variants_of_an_inactive_canonical_stand_alone():
+    df = frame(unit("a", "LUXE心斎橋EAST", rent=70000), unit("b", "LUXE心斎橋EAST", rent=80000))
+    mark_duplicates(df)
+    df.loc[0, 'active'] = False  # The canonical listing went since dup_of was stored
+    out = collapse_duplicates(df[df['active']])
+    assert list(out['link']) == ["b"] and out['n_variants'].tolist() == [1]
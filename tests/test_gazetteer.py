@@ -0,0 +1,60 @@
+import scraper
+from gazetteer import Gazetteer, load_gazetteer
+from geocache import GeocodeCache
+from pipeline import GeocodeStage
+from standin import FakeGeocoder, SuumoStandIn, synthetic_page
+
+CSV = """address,lat,lon
+大阪府大阪市北区梅田1丁目,34.700,135.500
+大阪府大阪市北区梅田3丁目,34.704,135.496
+大阪府大阪市東成区本庄,34.670,135.540
+"""
+
+def gazetteer(tmp_path):
+    path = tmp_path / "gazetteer.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return load_gazetteer(str(path))
+
+def test_exact_chome(tmp_path):
+    assert gazetteer(tmp_path).lookup("大阪府大阪市北区梅田１丁目２番３号") == (34.700, 135.500)
+
+def test_unknown_chome_falls_back_to_the_town(tmp_path):
+    # Town centroid: mean of its chome
+    lat, lon = gazetteer(tmp_path).lookup("大阪府大阪市北区梅田2丁目")
+    assert abs(lat - 34.702) < 1e-9 and abs(lon - 135.498) < 1e-9
+
+def test_prefixes_only_match_whole_tokens(tmp_path):
+    g = gazetteer(tmp_path)
+    assert g.lookup("大阪府大阪市東成区本庄東1丁目") is None  # 本庄 is not 本庄東
+    assert g.lookup("大阪府大阪市北区梅田12丁目") == g.get_exact("大阪府大阪市北区梅田")  # 梅田1 is not 梅田12
+    assert g.lookup("大阪府大阪市北区中津1丁目") is None
+
+def test_mlit_shift_jis_export(tmp_path):
+    path = tmp_path / "27_2023.csv"
+    rows = ["都道府県名,市区町村名,大字_町丁目名,緯度,経度", "大阪府,大阪市北区,梅田一丁目,34.700,135.500"]
+    path.write_bytes("\n".join(rows).encode("cp932"))
+    assert Gazetteer.from_csv(str(path)).lookup("大阪府大阪市北区梅田1") == (34.700, 135.500)
+
+def test_geo_source_records_the_resolving_tier(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    geocoder = FakeGeocoder()
+    stage = GeocodeStage(cache, geocoder, gazetteer(tmp_path))
+    stage.start()
+    for addr in ("大阪府大阪市北区梅田1丁目", "大阪府大阪市北区中津1丁目"): stage.submit(addr)
+    stage.finish()
+    stage.join()
+    assert cache.get("大阪府大阪市北区梅田1丁目")['source'] == 'gazetteer'
+    assert cache.get("大阪府大阪市北区中津1丁目")['source'] == 'nominatim'
+    assert geocoder.calls == 1 and dict(stage.resolved) == {'gazetteer': 1, 'nominatim': 1}
+    cache.close()
+
+def test_miner_rows_carry_their_geo_source(monkeypatch, data_dir):
+    (data_dir / "gazetteer.csv").write_text("address,lat,lon\n" + "".join(
+        f"大阪府大阪市北区梅田{n}丁目,34.70{n},135.50{n}\n" for n in (1, 2, 3)), encoding="utf-8")
+    with SuumoStandIn([synthetic_page(1)]) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        df = scraper.run_osaka_miner(max_pages=2, fetch_images=False, workers=1, rate_limit=1000, parse_workers=1)
+    umeda = df['address'].astype(str).str.contains("梅田")
+    assert umeda.any() and (~umeda).any()
+    assert set(df.loc[umeda, 'geo_source'].astype(str)) == {'gazetteer'}
+    assert set(df.loc[~umeda, 'geo_source'].astype(str)) == {'nominatim'}
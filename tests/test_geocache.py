@@ -0,0 +1,61 @@
+import time
+import pytest
+import geocache
+from geocache import GeocodeCache, normalize_address
+from pipeline import GeocodeStage
+from standin import FakeGeocoder
+
+@pytest.mark.parametrize("addr", [
+    "大阪府大阪市北区梅田１丁目",       # Full-width digit
+    "大阪府大阪市北区梅田1丁目",        # Half-width digit
+    "大阪府大阪市北区梅田一丁目",       # Kanji chome
+    "大阪府 大阪市北区　梅田1",         # Half- and full-width spaces
+    "大阪府大阪市北区梅田１丁目２番３号",  # 番地/号 trimmed
+    "大阪府大阪市北区梅田1丁目2-3",
+    "大阪府大阪市北区梅田1-2-3",
+])
+def test_addresses_share_one_chome_key(addr):
+    assert normalize_address(addr) == "大阪府大阪市北区梅田1"
+
+def test_different_chome_and_towns_stay_apart():
+    keys = {normalize_address(a) for a in ("大阪府大阪市北区梅田1丁目", "大阪府大阪市北区梅田3丁目", "大阪府大阪市北区中津1丁目")}
+    assert len(keys) == 3
+    assert normalize_address("大阪府大阪市西区北堀江二十一丁目") == "大阪府大阪市西区北堀江21"
+    assert normalize_address("大阪府大阪市中央区十二軒町") == "大阪府大阪市中央区十二軒町"  # Kanji numerals in a town name
+
+def test_lookups_hit_across_spellings(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    cache.put("大阪府大阪市北区梅田１丁目２番", 34.70, 135.50, 'nominatim')
+    assert cache.get("大阪府大阪市北区梅田一丁目") == {'lat': 34.70, 'lon': 135.50, 'source': 'nominatim'}
+    assert cache.size() == 1
+    cache.close()
+
+def geocode(cache, geocoder, addr):
+    stage = GeocodeStage(cache, geocoder)
+    stage.start()
+    stage.submit(addr)
+    stage.finish()
+    stage.join()
+
+def test_expired_failure_is_fetched_again(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    addr = "大阪府大阪市北区梅田1丁目"
+    cache.put_failure(addr, 'nominatim')
+    geocoder = FakeGeocoder()
+
+    geocode(cache, geocoder, addr)  # Still within NEGATIVE_TTL: not retried
+    assert geocoder.calls == 0 and cache.is_known(addr) and cache.get(addr) is None
+
+    with cache.lock:
+        cache.conn.execute("UPDATE geocode SET updated_at = ?", (time.time() - geocache.NEGATIVE_TTL - 1,))
+    assert not cache.is_known(addr)
+    geocode(cache, geocoder, addr)
+    assert geocoder.calls == 1 and cache.get(addr)['source'] == 'nominatim'
+    cache.close()
+
+def test_hits_do_not_expire(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"))
+    cache.put("大阪府大阪市北区梅田1", 34.70, 135.50, 'gazetteer')
+    with cache.lock: cache.conn.execute("UPDATE geocode SET updated_at = 0")
+    assert cache.is_known("大阪府大阪市北区梅田1丁目")
+    cache.close()
@@ -0,0 +1,71 @@
+import pandas as pd
+import parsing
+import scraper
+from history import ListingHistory
+from standin import SuumoStandIn, synthetic_page
+
+def listings(links, active=True, area=None):
+    return pd.DataFrame({'link': links, 'row_hash': [f"h-{l}" for l in links], 'active': active, 'area': area,
+                         'total_rent': 50000, 'key_money': 0, 'deposit': 0,
+                         'name': None, 'address': None, 'layout': None, 'size_m2': None, 'floor': None})
+
+def statuses(path):
+    history = ListingHistory(path)
+    out = dict(history.conn.execute("SELECT link, status FROM listings"))
+    history.close()
+    return out
+
+def test_partial_crawl_keeps_missing_links_listed(tmp_path):
+    history = ListingHistory(str(tmp_path / "history.sqlite"))
+    history.record_crawl(listings(['a', 'b', 'c']), "2026-01-01T00:00:00", complete=True)
+    history.record_crawl(listings(['a', 'c'], active=[True, False]), "2026-01-02T00:00:00")
+    history.close()
+    # Only the store's own verdict counts: c is gone, b was merely not crawled
+    assert statuses(str(tmp_path / "history.sqlite")) == {'a': 'listed', 'b': 'listed', 'c': 'gone'}
+
+def test_complete_crawl_marks_missing_links_gone(tmp_path):
+    history = ListingHistory(str(tmp_path / "history.sqlite"))
+    history.record_crawl(listings(['a', 'b']), "2026-01-01T00:00:00", complete=True)
+    assert history.record_crawl(listings(['a']), "2026-01-02T00:00:00", complete=True) == 1
+    history.close()
+    assert statuses(str(tmp_path / "history.sqlite")) == {'a': 'listed', 'b': 'gone'}
+
+def test_complete_areas_only_drop_their_own_links(tmp_path):
+    history = ListingHistory(str(tmp_path / "history.sqlite"))
+    history.record_crawl(listings(['a1', 'a2', 'b1'], area=['A', 'A', 'B']), "2026-01-01T00:00:00", complete={'A', 'B'})
+    history.record_crawl(listings(['a1'], area='A'), "2026-01-02T00:00:00", complete={'A'})
+    history.close()
+    assert statuses(str(tmp_path / "history.sqlite")) == {'a1': 'listed', 'a2': 'gone', 'b1': 'listed'}
+
+def full_crawl(monkeypatch, pages, **kw):
+    with SuumoStandIn(pages, **kw) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        return scraper.run_osaka_miner(max_pages=5, fetch_images=False, workers=2, rate_limit=1000)
+
+def test_full_crawl_with_a_failed_page_keeps_its_links_listed(monkeypatch, data_dir):
+    old = [synthetic_page(seed) for seed in (1, 2, 3)]
+    full_crawl(monkeypatch, old)
+    on_page_2 = [r['link'] for r in parsing.parse_page(old[1])]
+
+    full_crawl(monkeypatch, old, fail_pages={2})
+    status = statuses(scraper.HISTORY_DB)
+    assert {status[link] for link in on_page_2} == {'listed'}
+
+def test_full_crawl_to_the_end_marks_dropped_links_gone(monkeypatch, data_dir):
+    old = [synthetic_page(seed) for seed in (1, 2, 3)]
+    full_crawl(monkeypatch, old)
+    on_page_2 = [r['link'] for r in parsing.parse_page(old[1])]
+
+    full_crawl(monkeypatch, [old[0], old[2]])
+    status = statuses(scraper.HISTORY_DB)
+    assert {status[link] for link in on_page_2} == {'gone'}
+
+def test_full_crawl_of_some_areas_keeps_the_others_listed(monkeypatch, data_dir):
+    with SuumoStandIn([synthetic_page(1), synthetic_page(2)]) as a, SuumoStandIn([synthetic_page(3)]) as b:
+        crawl = lambda areas: scraper.run_osaka_miner(max_pages=5, fetch_images=False, workers=2, rate_limit=1000,
+                                                      areas=areas, shard_workers=2)
+        crawl([a.base_url, b.base_url])
+        in_b = [r['link'] for r in parsing.parse_page(synthetic_page(3))]
+        crawl([a.base_url])
+    status = statuses(scraper.HISTORY_DB)
+    assert {status[link] for link in in_b} == {'listed'}
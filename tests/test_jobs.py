@@ -0,0 +1,13 @@
+import warnings
+import gc
+import jobs
+
+def test_spawn_worker_closes_its_log_handle(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'WORKER_SCRIPT', "-c")  # `python -c --db ...`: exits at once
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        proc = jobs.spawn_worker(str(tmp_path / "jobs.sqlite"), str(tmp_path / "worker.log"))
+        proc.wait()
+        del proc
+        gc.collect()
+    assert not [w for w in caught if "worker.log" in str(w.message)]
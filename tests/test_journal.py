@@ -0,0 +1,48 @@
+import os
+import parsing
+import pytest
+import scraper
+from journal import CrawlJournal
+from standin import SuumoStandIn, synthetic_page
+
+PARAMS = {'search': "test", 'max_pages': 5, 'incremental': False}
+
+def rows(page):
+    return [{'link': f"https://suumo.jp/chintai/jnc_{page:09d}{i}/", 'name': f"{page}-{i}"} for i in range(3)]
+
+def test_checkpoint_is_written_once_and_pages_resume(tmp_path):
+    journal = CrawlJournal(str(tmp_path), PARAMS)
+    checkpoint = os.stat(journal.checkpoint_file)
+    for page in (1, 2, 4): journal.record(0, page, rows(page), 'new')
+    assert os.stat(journal.checkpoint_file).st_mtime_ns == checkpoint.st_mtime_ns  # No per-page rewrite
+    journal.close()
+    with open(journal.pages_file, "a", encoding="utf-8") as f: f.write('{"key": [0, 3], "sta')  # Torn by a crash
+
+    resumed = CrawlJournal(str(tmp_path), PARAMS)
+    assert resumed.resumed and resumed.now == journal.now
+    assert sorted(resumed.completed()) == [(0, 1), (0, 2), (0, 4)]
+    assert resumed.last_pages() == {0: 2} and resumed.rows == 9
+    assert resumed.state(0, 3) is None
+    resumed.discard()
+
+def test_interrupted_crawl_resumes_without_refetching(monkeypatch, data_dir):
+    pages = [synthetic_page(seed) for seed in (1, 2, 3, 4)]
+    real_state, calls = parsing.page_state, []
+    def crash_on_third_page(rows, known):
+        calls.append(1)
+        if len(calls) == 3: raise RuntimeError("worker killed")
+        return real_state(rows, known)
+
+    with SuumoStandIn(pages) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        run = lambda: scraper.run_osaka_miner(max_pages=6, fetch_images=False, workers=1, rate_limit=1000, parse_workers=1)
+        monkeypatch.setattr(scraper, 'page_state', crash_on_third_page)
+        with pytest.raises(RuntimeError): run()
+        monkeypatch.setattr(scraper, 'page_state', real_state)
+        site.served.clear()
+        df = run()
+
+    # Pages 1 and 2 were on disk; 5 and 6 are past the end of the results
+    assert sorted(site.served) == [3, 4, 5, 6]
+    expected = [r['link'] for html in pages for r in parsing.parse_page(html)]
+    assert df['link'].is_unique and sorted(df['link']) == sorted(expected)
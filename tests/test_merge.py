@@ -0,0 +1,75 @@
+import threading
+import pytest
+import pandas as pd
+import parsing
+import scraper
+from standin import SuumoStandIn, synthetic_page
+
+NOW = "2026-01-02T00:00:00"
+
+def listings(links, area=None, active=True):
+    df = pd.DataFrame({'link': links, 'first_seen': "2026-01-01T00:00:00", 'active': active, 'gone_at': None})
+    if area is not None: df['area'] = area
+    return df
+
+def test_early_stop_keeps_unseen_listings():
+    out = scraper.merge_listings(listings(['a', 'b']), listings(['a']), NOW, reached_end=False)
+    assert out.set_index('link')['active'].to_dict() == {'a': True, 'b': True}
+
+def test_reaching_the_end_marks_unseen_gone():
+    out = scraper.merge_listings(listings(['a', 'b']), listings(['a']), NOW, reached_end=True).set_index('link')
+    assert not out.loc['b', 'active'] and out.loc['b', 'gone_at'] == NOW
+    assert out.loc['a', 'first_seen'] == "2026-01-01T00:00:00"
+
+def test_sharded_end_only_covers_its_areas():
+    existing = listings(['a', 'b', 'c'], area=['1', '1', '2'])
+    out = scraper.merge_listings(existing, listings(['a'], area='1'), NOW, reached_end={'1'}).set_index('link')
+    assert out['active'].to_dict() == {'a': True, 'b': False, 'c': True}
+
+def crawl(monkeypatch, pages, **kw):
+    with SuumoStandIn(pages, **kw) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        return scraper.run_osaka_miner(max_pages=5, incremental=True, fetch_images=False, workers=2, rate_limit=1000)
+
+def test_failed_page_does_not_mark_its_listings_gone(monkeypatch, data_dir):
+    old = [synthetic_page(seed) for seed in (1, 2, 3)]
+    crawl(monkeypatch, old)
+    on_page_2 = [r['link'] for r in parsing.parse_page(old[1])]
+
+    # Pages 1 and 3 have new listings, page 2 fails and page 4 is the (empty) end
+    df = crawl(monkeypatch, [synthetic_page(11), old[1], synthetic_page(13)], fail_pages={2})
+    active = df.set_index('link')['active'].astype(bool)
+    assert len(df) > len(on_page_2) and active.loc[on_page_2].all()
+
+def test_crash_stops_the_fetch_threads_before_returning(monkeypatch, data_dir):
+    def crash(rows, known): raise RuntimeError("crash")
+    monkeypatch.setattr(scraper, 'page_state', crash)
+    before = set(threading.enumerate())
+    with SuumoStandIn([synthetic_page(seed) for seed in range(1, 9)], latency=0.2) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        with pytest.raises(RuntimeError) as crashed:  # Holds the traceback, so nothing is collected early
+            scraper.run_osaka_miner(max_pages=8, fetch_images=False, workers=4, rate_limit=1000, parse_workers=1)
+        assert crashed.traceback and not [t for t in set(threading.enumerate()) - before
+                                          if t.name.startswith("ThreadPoolExecutor")]
+
+def test_sharded_full_crawl_only_replaces_its_own_areas(monkeypatch, data_dir):
+    with SuumoStandIn([synthetic_page(1), synthetic_page(2)]) as a, SuumoStandIn([synthetic_page(3)]) as b:
+        crawl = lambda areas: scraper.run_osaka_miner(max_pages=5, fetch_images=False, workers=2, rate_limit=1000,
+                                                      areas=areas, shard_workers=2)
+        both = crawl([a.base_url, b.base_url])
+        df = crawl([a.base_url])
+    assert sorted(df['link']) == sorted(both['link'])
+    assert set(df.loc[df['area'] == b.base_url, 'link']) == {r['link'] for r in parsing.parse_page(synthetic_page(3))}
+
+def test_relisted_units_do_not_count_as_caught_up(monkeypatch, data_dir):
+    relisted, old = synthetic_page(1), synthetic_page(2)
+    crawl(monkeypatch, [relisted, old])
+    df = scraper.load_listings()
+    df.loc[df['link'].isin([r['link'] for r in parsing.parse_page(relisted)]), 'active'] = False
+    scraper.storage.save_listings(df, scraper.LISTINGS_FILE)
+
+    # Newest first: the relisted units come back unchanged on page 1, new ones follow on page 2
+    with SuumoStandIn([relisted, synthetic_page(3), old]) as site:
+        monkeypatch.setattr(scraper, 'BASE_URL', site.base_url)
+        df = scraper.run_osaka_miner(max_pages=5, incremental=True, fetch_images=False, workers=1, rate_limit=1000)
+    assert set(r['link'] for r in parsing.parse_page(synthetic_page(3))) <= set(df['link'])
@@ -0,0 +1,51 @@
+from collections import Counter
+import os
+import pytest
+import parsing
+from standin import SuumoStandIn, synthetic_page, load_fixtures, EMPTY_PAGE
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "suumo_results_page.html")
+
+def saved_pages():
+    # The checked-in page, plus any recorded with standin.record_fixtures()
+    with open(FIXTURE, encoding="utf-8") as f: pages = [("suumo_results_page.html", f.read())]
+    return pages + load_fixtures()
+
+@pytest.mark.skipif(parsing.etree is None, reason="lxml not installed")
+@pytest.mark.parametrize("seed", range(1, 11))
+def test_lxml_matches_bs4_row_for_row(seed):
+    with SuumoStandIn([synthetic_page(seed)], n_pages=3) as site: html = site.page(1)  # With the pager, as served
+    bs4_failures, lxml_failures = Counter(), Counter()
+    rows = parsing.parse_page(html, "bs4", bs4_failures)
+    assert rows
+    assert parsing.parse_page(html, "lxml", lxml_failures) == rows
+    assert lxml_failures == bs4_failures
+
+@pytest.mark.skipif(parsing.etree is None, reason="lxml not installed")
+def test_engines_agree_on_an_empty_page():
+    assert parsing.parse_page(EMPTY_PAGE, "bs4") == parsing.parse_page(EMPTY_PAGE, "lxml") == []
+
+@pytest.mark.skipif(parsing.etree is None, reason="lxml not installed")
+@pytest.mark.parametrize("name, html", saved_pages(), ids=[name for name, _ in saved_pages()])
+def test_lxml_matches_bs4_on_saved_pages(name, html):
+    bs4_failures, lxml_failures = Counter(), Counter()
+    rows = parsing.parse_page(html, "bs4", bs4_failures)
+    assert rows
+    assert parsing.parse_page(html, "lxml", lxml_failures) == rows
+    assert lxml_failures == bs4_failures
+
+def test_saved_page_fields():
+    with open(FIXTURE, encoding="utf-8") as f: html = f.read()
+    failures = Counter()
+    rows = parsing.parse_page(html, failures=failures)
+    # The room without a floor area is dropped, the PR block has no room table
+    assert failures == {'size': 1, 'table': 1}
+    assert [r['link'].split('?')[0] for r in rows] == [
+        "https://suumo.jp/chintai/jnc_000093120581/", "https://suumo.jp/chintai/jnc_000093120590/",
+        "https://suumo.jp/chintai/jnc_000093877702/", "https://suumo.jp/chintai/jnc_000092990114/"]
+    first, tanimachi = rows[0], rows[2]
+    assert (first['name'], first['address'], first['age'], first['floor']) == ("LUXE心斎橋EAST", "大阪府大阪市中央区島之内1", 4, 5)
+    assert (first['total_rent'], first['key_money'], first['deposit'], first['size_m2']) == (82000, 74000, 0, 25.52)
+    assert first['image_url'].endswith("77123001_0002.jpg")  # The lazy-load `rel`, not the blank.gif `src`
+    assert (tanimachi['age'], tanimachi['layout'], tanimachi['size_m2'], tanimachi['total_rent']) == (0, "2DK", 45.0, 98000)
+    assert parsing.parse_page_count(html) == 148
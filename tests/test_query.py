@@ -0,0 +1,60 @@
+import itertools
+import numpy as np
+import pytest
+import storage
+from query import ListingIndex, SORTS
+from bench_storage import synthetic_listings
+
+def listings():
+    df = storage.apply_schema(synthetic_listings(3000, seed=3))
+    rng = np.random.default_rng(3)
+    df['residual'] = rng.normal(0, 8000, len(df)).round(-2)  # Rounded: plenty of ties for the stable sorts
+    df.loc[rng.choice(len(df), 50, replace=False), 'residual'] = np.nan
+    df.loc[rng.choice(len(df), 20, replace=False), 'size_m2'] = np.nan
+    return df
+
+DF = listings()
+INDEX = ListingIndex(DF)
+
+def pandas_mask(df, rent_range, size_range, max_age, min_floor, layouts, zero_key):
+    # The mask the app ran on every rerun before ListingIndex
+    mask = (
+        (df['total_rent'].between(rent_range[0], rent_range[1])) &
+        (df['size_m2'].between(size_range[0], size_range[1])) &
+        (df['age'] <= max_age) &
+        (df['floor'] >= min_floor) &
+        (df['layout'].isin(layouts))
+    )
+    if zero_key: mask &= (df['key_money'] == 0) & (df['deposit'] == 0)
+    return mask.to_numpy()
+
+QUERIES = list(itertools.product(
+    [(40000, 300000), (80000, 120000), (500000, 600000)],  # The last matches nothing
+    [(15, 90), (25.5, 40.25)],
+    [0, 35],
+    [1, 20],
+    [['1K', '1LDK'], list(DF['layout'].unique()), []],
+    [False, True],
+))
+
+@pytest.mark.parametrize("q", QUERIES)
+def test_bitmaps_match_the_pandas_mask(q):
+    result = INDEX.query(*q)
+    expected = pandas_mask(DF, *q)
+    assert np.array_equal(result.mask, expected)
+    assert len(result) == expected.sum()
+    assert result.frame()['link'].tolist() == DF.loc[expected, 'link'].tolist()
+
+def test_empty_results():
+    result = INDEX.query((500000, 600000), (15, 90), 35, 1, ['1K'])
+    assert len(result) == 0 and result.frame().empty and result.page('residual', 0, 12).empty
+    assert len(INDEX.query((40000, 300000), (15, 90), 35, 1, [])) == 0
+
+@pytest.mark.parametrize("sort_key", SORTS)
+def test_pages_follow_the_pandas_sort(sort_key):
+    q = ((50000, 150000), (20, 100), 35, 2, ['1K', '1DK', '1LDK', '2DK', '2LDK'], False)
+    col, ascending = SORTS[sort_key]
+    expected = DF[pandas_mask(DF, *q)].sort_values(col, ascending=ascending, kind='stable')
+    result = INDEX.query(*q)
+    for page in (0, 1, 7, len(expected) // 12):
+        assert result.page(sort_key, page, 12)['link'].tolist() == expected['link'].iloc[page * 12:(page + 1) * 12].tolist()
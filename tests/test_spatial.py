@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import spatial
+from spatial import SpatialIndex, load_neighborhoods, LOCATION_FEATURES
+
+pytest.importorskip("scipy.spatial")
+
+def listings(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    lat, lon = 34.69 + rng.normal(0, 0.01, n), 135.50 + rng.normal(0, 0.01, n)
+    lat[:3] = np.nan  # Not geocoded
+    return pd.DataFrame({'lat': lat, 'lon': lon, 'size_m2': rng.uniform(15, 60, n),
+                         'total_rent': rng.integers(40, 150, n) * 1000})
+
+def test_saved_neighborhoods_match_the_index_without_rebuilding(tmp_path, monkeypatch):
+    df = listings()
+    index = SpatialIndex(df)
+    built = load_neighborhoods(df, "v1", str(tmp_path))
+    def no_rebuild(_): raise AssertionError("rebuilt the KD-tree")
+    monkeypatch.setattr(spatial, 'SpatialIndex', no_rebuild)
+    saved = load_neighborhoods(df, "v1", str(tmp_path))
+
+    expected = index.neighborhood_features()
+    for nbrs in (built, saved):
+        assert np.allclose(nbrs.neighborhood_features()[LOCATION_FEATURES].to_numpy(), expected.to_numpy(), equal_nan=True)
+        for position in range(len(df)):
+            rows, dist = index.comparables(position)
+            got_rows, got_dist = nbrs.comparables(position)
+            assert list(got_rows) == list(rows) and np.allclose(got_dist, dist, rtol=1e-6)
+
+def brute_force(df, k=spatial.K_NEIGHBORS):
+    """nbr_rent_m2 / nbr_density straight from the definition, O(n²)."""
+    xy = spatial.project(df['lat'], df['lon'])
+    rent_m2 = (df['total_rent'] / df['size_m2']).to_numpy()
+    on_map = ~np.isnan(xy).any(axis=1)
+    out = np.full((len(df), 2), np.nan)
+    for i in np.flatnonzero(on_map):
+        others = np.flatnonzero(on_map & (np.arange(len(df)) != i))
+        dist = np.hypot(*(xy[others] - xy[i]).T)
+        nearest = np.argsort(dist)[:k]
+        radius_km = max(dist[nearest[-1]], spatial.MIN_RADIUS_M) / 1000
+        out[i] = np.median(rent_m2[others[nearest]]), k / (np.pi * radius_km ** 2)
+    return out
+
+def test_features_match_brute_force():
+    df = listings()
+    features = SpatialIndex(df).neighborhood_features()[LOCATION_FEATURES].to_numpy()
+    assert np.allclose(features, brute_force(df), equal_nan=True)
+    assert np.isnan(features[:3]).all() and not np.isnan(features[3:]).any()
+
+def test_a_listing_is_never_its_own_neighbour():
+    df = listings(40)
+    df.loc[10:19, ['lat', 'lon']] = (34.70, 135.50)  # Ten units geocoded to one chome centroid
+    df.loc[10, 'total_rent'] = 10_000_000  # Would dominate its own nbr_rent_m2
+    index = SpatialIndex(df)
+    for position in range(3, len(df)):
+        rows, dist = index.comparables(position)
+        assert position not in rows and len(rows) == spatial.N_COMPARABLES
+    rows, dist = index.comparables(10)
+    assert set(rows) <= set(range(11, 20)) and (dist == 0).all()
+    others = df.loc[11:19]
+    assert index.neighborhood_features().loc[10, 'nbr_rent_m2'] <= (others['total_rent'] / others['size_m2']).max()
+    assert len(index.comparables(0)[0]) == 0  # Not geocoded
@@ -0,0 +1,26 @@
+import pandas as pd
+import storage
+from history import ListingHistory
+
+def listing(size):
+    return pd.DataFrame({'link': ["https://suumo.jp/chintai/jnc_000000000001/"], 'row_hash': ["h"], 'size_m2': [size],
+                         'total_rent': [80000], 'key_money': [0], 'deposit': [0], 'active': [True],
+                         'name': ["LUXE心斎橋EAST"], 'address': ["大阪府大阪市中央区島之内1"], 'layout': ["1K"], 'floor': [5]})
+
+def test_size_round_trips_exactly(tmp_path):
+    path = storage.store_path(str(tmp_path))
+    storage.save_listings(listing(34.18), path)
+    size = storage.load_listings(path)['size_m2'].iloc[0].item()  # As a card row or history sees it
+    assert size == 34.18 and f"{size}m²" == "34.18m²"
+
+def test_float32_store_reads_back_rounded(tmp_path):
+    path = storage.store_path(str(tmp_path))
+    old = listing(34.18).astype({'size_m2': 'float32'})
+    (old.to_csv(path, index=False) if path.endswith(".csv") else old.to_feather(path))
+    assert storage.load_listings(path)['size_m2'].iloc[0].item() == 34.18
+
+def test_history_records_the_quoted_size(tmp_path):
+    history = ListingHistory(str(tmp_path / "history.sqlite"))
+    history.record_crawl(storage.apply_schema(listing(34.18).astype({'size_m2': 'float32'})), "2026-01-01T00:00:00")
+    assert history.conn.execute("SELECT size_m2 FROM listings").fetchone()[0] == 34.18
+    history.close()
@@ -0,0 +1,80 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import time
+import io
+import pytest
+import thumbnails
+from thumbnails import ThumbnailCache
+
+Image = pytest.importorskip("PIL.Image")
+
+class ImageServer:
+    """Serves /ok/<n>.jpg as distinct JPEGs and 404s everything else, counting requests."""
+    def __init__(self):
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                if not self.path.startswith("/ok/"):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                out = io.BytesIO()
+                Image.new("RGB", (400, 300), (len(server.requests) * 40 % 256, 0, 0)).save(out, format="JPEG")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(out.getvalue())))
+                self.end_headers()
+                self.wfile.write(out.getvalue())
+
+            def log_message(self, *args): pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    s = ImageServer()
+    yield s
+    s.close()
+
+def drain(cache):
+    cache.prefetcher.shutdown(wait=True)
+    cache.prefetcher = thumbnails.ThreadPoolExecutor(max_workers=2)
+
+def test_failed_downloads_are_not_retried_within_ttl(tmp_path, server, monkeypatch):
+    cache = ThumbnailCache(str(tmp_path), rate=1000)
+    missing = server.url("/missing.jpg")
+    cache.prefetch([missing])
+    drain(cache)
+    cache.prefetch([missing])
+    drain(cache)
+    assert server.requests == ["/missing.jpg"]
+
+    monkeypatch.setattr(thumbnails, 'NEGATIVE_TTL', 0)
+    cache.prefetch([missing])
+    drain(cache)
+    assert len(server.requests) == 2
+
+def test_prefetch_evicts_past_max_bytes(tmp_path, server):
+    cache = ThumbnailCache(str(tmp_path), max_bytes=1, rate=1000)
+    cache.prefetch([server.url(f"/ok/{n}.jpg") for n in range(3)])
+    drain(cache)
+    with cache.lock:
+        assert cache.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+
+def test_rate_budget_spans_prefetch_calls(tmp_path, server):
+    cache = ThumbnailCache(str(tmp_path), rate=10)
+    start = time.monotonic()
+    for n in range(4): cache.prefetch([server.url(f"/ok/{n}.jpg")])
+    drain(cache)
+    # One budget: 4 downloads at 10/s take >= 0.3s; a budget per call would not wait at all
+    assert time.monotonic() - start >= 0.3